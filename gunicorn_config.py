@@ -1,5 +1,7 @@
 # Sample Gunicorn configuration file.
 
+import os
+
 #
 # Server socket
 #
@@ -123,8 +125,8 @@ spew = False
 daemon = False
 pidfile = None
 umask = 0
-user = 'ec2-user'
-group = 'ec2-user'
+user = os.environ.get('GUNICORN_USER', 'ec2-user')
+group = os.environ.get('GUNICORN_GROUP', 'ec2-user')
 tmp_upload_dir = None
 
 #
@@ -142,7 +144,7 @@ tmp_upload_dir = None
 errorlog = '-'
 loglevel = 'info'
 accesslog = '-'
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)sus'
 
 #
 # Process naming
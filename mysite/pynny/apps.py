@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PynnyConfig(AppConfig):
     name = 'pynny'
+
+    def ready(self):
+        from . import signals
+        signals.connect(self)
@@ -1,9 +1,18 @@
 
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+
+from .utils import notifications as notices
+
+
+def undismissed(request):
+    # The version is only known once the view looked it up, and
+    # otherwise isn't worth a query of its own
+    version = getattr(request, 'pynny_version', None)
+    return notices.undismissed(request.user, version[0] if version else None)
 
 
 def notifications(request):
+    # Lazy, so pages that never show notifications don't look them up
     if request.user.is_authenticated():
-        return {'notifications': Notification.objects.filter(user=request.user, dismissed=False)}
+        return {'notifications': SimpleLazyObject(lambda: undismissed(request))}
     return {}
-
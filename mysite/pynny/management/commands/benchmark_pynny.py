@@ -0,0 +1,62 @@
+'''
+File: benchmark_pynny.py
+Author: Zachary King
+
+Management command that times every Pynny page and counts its queries
+at several data sizes, in a throwaway test database, and fails if any
+page regressed past the stored baseline. Run it with --save-baseline
+to record a new baseline after an intended change.
+'''
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from ...utils import benchmark
+
+BASELINE = os.path.join(settings.BASE_DIR, 'pynny', 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = 'Times every Pynny page at several data sizes and compares them with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000,100000',
+                            help='Comma separated Transaction counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per page')
+        parser.add_argument('--baseline', default=BASELINE, help='Baseline JSON file')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=2.0,
+                            help='How many times slower than the baseline a page may get')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('Invalid --scales "{}"'.format(options['scales']))
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = benchmark.run(scales, options['repeat'], log=self.stdout.write)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            benchmark.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS('Saved the baseline to {}'.format(options['baseline'])))
+            return
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(self.style.WARNING('No baseline at {}; run with --save-baseline'.format(
+                options['baseline'])))
+            return
+
+        regressions = benchmark.compare(results, benchmark.load_baseline(options['baseline']), options['tolerance'])
+        if regressions:
+            raise CommandError('Pages regressed past the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,42 @@
+'''
+File: detect_anomalies.py
+Author: Zachary King
+
+Management command that scans the Transactions added since its last
+run for unusual spending and budget overruns, and notifies their
+users. Run it on a schedule, e.g. nightly.
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import anomalies, jobs
+
+
+class Command(BaseCommand):
+    help = 'Notifies users of unusual spending and budget overruns since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            help='How many users to scan in parallel (default: the number of CPUs)')
+        parser.add_argument('--lookback-days', type=int, default=anomalies.LOOKBACK_DAYS,
+                            help='How many days of history to compare each Transaction with')
+        parser.add_argument('--threshold', type=float, default=anomalies.THRESHOLD,
+                            help='How many standard deviations above the mean is unusual')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the scan for the run_jobs worker instead of running it now')
+
+    def handle(self, *args, **options):
+        if options['processes'] is not None and options['processes'] < 1:
+            raise CommandError('--processes must be at least 1')
+        if options['lookback_days'] < 1:
+            raise CommandError('--lookback-days must be at least 1')
+
+        if options['background']:
+            job = jobs.enqueue('detect_anomalies', processes=options['processes'],
+                               lookback_days=options['lookback_days'], threshold=options['threshold'])
+            self.stdout.write(self.style.SUCCESS('Queued {}'.format(job)))
+            return
+
+        scan = anomalies.run(options['processes'], options['lookback_days'], options['threshold'])
+        self.stdout.write(self.style.SUCCESS('Scanned {} users up to Transaction {}, created {} notifications'.format(
+            scan.users, scan.last_transaction_id, scan.notifications)))
@@ -0,0 +1,48 @@
+'''
+File: import_transactions.py
+Author: Zachary King
+
+Management command for bulk importing a user's Transactions
+from a CSV or OFX file. See `pynny.utils.importer` for the formats.
+'''
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import importer
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports Transactions for a user from a CSV or OFX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to import the Transactions for')
+        parser.add_argument('path', help='CSV or OFX file to import')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--wallet', help='Wallet for OFX transactions')
+        parser.add_argument('--category', default='Uncategorized', help='Category for OFX debits')
+        parser.add_argument('--income-category', default='Income', help='Category for OFX credits')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE,
+                            help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('No user named "{}"'.format(options['username']))
+
+        file_format = options['format'] or importer.guess_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as f:
+                count = importer.import_transactions(
+                    user, f, file_format,
+                    wallet=options['wallet'],
+                    category=options['category'],
+                    income_category=options['income_category'],
+                    chunk_size=options['chunk_size'],
+                )
+        except (IOError, importer.ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS('Imported {} transactions for {}'.format(count, user.username)))
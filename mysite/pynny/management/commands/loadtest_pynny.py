@@ -0,0 +1,60 @@
+'''
+File: loadtest_pynny.py
+Author: Zachary King
+
+Management command that boots Pynny under the shipped gunicorn config
+on a fresh, seeded SQLite database and drives it with concurrent
+logged in clients, reporting latency percentiles, throughput and error
+rates. Compare --workers and --worker-class settings to size a deploy.
+'''
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import loadtest, seeding
+
+
+class Command(BaseCommand):
+    help = 'Load tests Pynny under gunicorn with concurrent logged in clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to generate load for')
+        parser.add_argument('--mix', default='default', choices=sorted(loadtest.MIXES),
+                            help='Traffic mix to send')
+        parser.add_argument('--workers', type=int, help='Override the configured gunicorn workers')
+        parser.add_argument('--worker-class', help='Override the configured gunicorn worker class')
+        parser.add_argument('--bind', default='127.0.0.1:8765', help='Address to run gunicorn on')
+        parser.add_argument('--users', type=int, default=10, help='Seeded users the clients log in as')
+        parser.add_argument('--transactions', type=int, default=1000, help='Seeded Transactions per user')
+        parser.add_argument('--url', help='Load test a running server instead, whose users were seeded '
+                                          'with seed_pynny --prefix load')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError('--clients, --users and --duration must be positive')
+
+        if options['url']:
+            usernames = ['load{}'.format(i) for i in range(1, options['users'] + 1)]
+            report = self.run(options['url'], usernames, options)
+        else:
+            server = loadtest.GunicornServer(options['bind'], options['workers'], options['worker_class'],
+                                             options['users'], options['transactions'])
+            try:
+                with server:
+                    report = self.run(server.base_url, server.usernames, options)
+            except (OSError, RuntimeError) as e:
+                raise CommandError('Could not run gunicorn: {}'.format(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report.summary(), indent=2, sort_keys=True))
+        else:
+            self.stdout.write(report.format())
+
+    def run(self, base_url, usernames, options):
+        self.stderr.write('Sending the {} mix from {} clients to {} for {}s'.format(
+            options['mix'], options['clients'], base_url, options['duration']))
+        return loadtest.run_clients(base_url, usernames, options['clients'], options['duration'], options['mix'],
+                                    seeding.PASSWORD)
@@ -0,0 +1,30 @@
+'''
+File: rebuild_rollups.py
+Author: Zachary King
+
+Management command that recomputes the MonthlyCategoryTotal
+rollups from the Transactions table.
+'''
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the monthly per-category Transaction rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollups of this username')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError('No user named "{}"'.format(options['user']))
+
+        count = rollups.rebuild(user)
+        self.stdout.write(self.style.SUCCESS('Wrote {} monthly rollups'.format(count)))
@@ -0,0 +1,21 @@
+'''
+File: rebuild_search_index.py
+Author: Zachary King
+
+Management command that (re)creates the full-text index over
+Transaction descriptions and, on SQLite, rebuilds its contents.
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...utils import search
+
+
+class Command(BaseCommand):
+    help = 'Recreates the full-text index over Transaction descriptions'
+
+    def handle(self, *args, **options):
+        if not search.install(connection, rebuild=True):
+            raise CommandError('The {} database has no supported full-text index'.format(connection.vendor))
+        self.stdout.write(self.style.SUCCESS('Rebuilt the Transaction search index'))
@@ -0,0 +1,31 @@
+'''
+File: rebuild_wallet_history.py
+Author: Zachary King
+
+Management command that recomputes every Wallet's daily
+balance history from the Transactions table.
+'''
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import wallet_history
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily Wallet balance history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the history of this username')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per INSERT')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError('No user named "{}"'.format(options['user']))
+
+        count = wallet_history.rebuild(user, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Wrote {} daily wallet balances'.format(count)))
@@ -0,0 +1,51 @@
+'''
+File: renew_budgets.py
+Author: Zachary King
+
+Management command that renews last month's Budgets into the
+current month for every user. Safe to run more than once; run
+it at the start of each month.
+'''
+
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import jobs, renewal
+
+
+class Command(BaseCommand):
+    help = "Renews last month's Budgets into this month for every user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to renew into, as YYYY-MM (default: this month)')
+        parser.add_argument('--user', help='Only renew the Budgets of this username')
+        parser.add_argument('--chunk-size', type=int, default=renewal.CHUNK_SIZE,
+                            help='How many users to renew per query')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the renewal for the run_jobs worker instead of running it now')
+
+    def handle(self, *args, **options):
+        month = None
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Invalid month "{}", expected YYYY-MM'.format(options['month']))
+
+        users = None
+        if options['user']:
+            try:
+                users = [get_user_model().objects.get(username=options['user'])]
+            except get_user_model().DoesNotExist:
+                raise CommandError('No user named "{}"'.format(options['user']))
+
+        if options['background']:
+            job = jobs.enqueue('renew_budgets', users[0] if users else None,
+                               month=month.isoformat() if month else None, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS('Queued {}'.format(job)))
+            return
+
+        count = renewal.renew_budgets(month, users, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('Renewed {} budgets'.format(count)))
@@ -0,0 +1,38 @@
+'''
+File: run_jobs.py
+Author: Zachary King
+
+Management command that works through the background Job queue (see
+`utils/jobs.py`). Run one or more of these alongside the web server;
+with --burst it stops once the queue is empty, for running from cron.
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background Jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Stop once the queue is empty instead of waiting for more Jobs')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='How many seconds to wait between checks of an empty queue')
+        parser.add_argument('--max-jobs', type=int,
+                            help='Stop after running this many Jobs')
+        parser.add_argument('--stale-after', type=int, default=jobs.STALE_SECONDS,
+                            help='Queue running Jobs again after this many seconds without progress')
+
+    def handle(self, *args, **options):
+        if options['sleep'] <= 0:
+            raise CommandError('--sleep must be positive')
+        if options['max_jobs'] is not None and options['max_jobs'] < 1:
+            raise CommandError('--max-jobs must be at least 1')
+        if options['stale_after'] < 1:
+            raise CommandError('--stale-after must be at least 1')
+
+        count = jobs.work(options['burst'], options['sleep'], options['max_jobs'], options['stale_after'],
+                          log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Ran {} jobs'.format(count)))
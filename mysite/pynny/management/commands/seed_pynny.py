@@ -0,0 +1,39 @@
+'''
+File: seed_pynny.py
+Author: Zachary King
+
+Management command that fills the database with synthetic users,
+wallets, categories, monthly budgets, savings and Transactions,
+for benchmarks and demos. Seeded users log in with the password
+"pynny-seed".
+'''
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import seeding
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic users with wallets, categories, budgets and Transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='How many users to create')
+        parser.add_argument('--transactions', type=int, default=10000, help='Transactions per user')
+        parser.add_argument('--months', type=int, default=12, help='Months of history per user')
+        parser.add_argument('--prefix', default='seed', help='Usernames are the prefix followed by a number')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data')
+        parser.add_argument('--batch-size', type=int, default=seeding.BATCH_SIZE, help='Rows written per INSERT')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['transactions'] < 0 or options['months'] < 1:
+            raise CommandError('--users and --months must be positive and --transactions not negative')
+        usernames = ['{}{}'.format(options['prefix'], i) for i in range(1, options['users'] + 1)]
+        taken = list(get_user_model().objects.filter(username__in=usernames).values_list('username', flat=True))
+        if taken:
+            raise CommandError('Users already exist: {}'.format(', '.join(sorted(taken))))
+
+        users = seeding.seed(options['users'], options['transactions'], options['months'], options['prefix'],
+                             options['seed'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Created {} users with {} Transactions each'.format(
+            len(users), options['transactions'])))
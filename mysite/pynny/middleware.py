@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+'''
+File: middleware.py
+Author: Zachary King
+
+Middleware for the Pynny web app.
+'''
+
+import time
+
+from django.db import connection
+
+from .utils import metrics
+
+
+class MetricsMiddleware(object):
+    '''Records each request's wall time, queries and template time
+    in `utils.metrics`, keyed by the URL name the request resolved to.
+
+    Queries are captured the way `CaptureQueriesContext` does, by
+    forcing the connection's debug cursor for the request.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.start_request()
+        force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        first_query = len(connection.queries_log)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            connection.force_debug_cursor = force_debug_cursor
+        wall = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+        queries = list(connection.queries_log)[first_query:]
+        metrics.record(view, request.method, request.path, response.status_code, wall, queries)
+        return response
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:44
+from __future__ import unicode_literals
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('budget_id', models.PositiveIntegerField()),
+                ('goal', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('month', models.DateField(blank=True, default=datetime.date.today)),
+                ('balance', models.DecimalField(blank=True, decimal_places=2, default=0.0, max_digits=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BudgetCategory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60)),
+                ('is_income', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=40)),
+                ('title', models.CharField(max_length=100)),
+                ('body', models.TextField()),
+                ('created_time', models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False)),
+                ('alert', models.CharField(blank=True, max_length=10)),
+                ('dismissed', models.BooleanField(default=False)),
+                ('dismissed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Savings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('goal', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('balance', models.DecimalField(decimal_places=2, default=0.0, max_digits=20)),
+                ('delete_on_completion', models.BooleanField(default=True)),
+                ('name', models.CharField(max_length=100)),
+                ('created_time', models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False)),
+                ('due_date', models.DateField(blank=True)),
+                ('notify_on_completion', models.BooleanField(default=False)),
+                ('completed', models.BooleanField(default=False)),
+                ('hidden', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('description', models.CharField(blank=True, default='', max_length=150)),
+                ('created_time', models.DateField(blank=True, default=datetime.date.today)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pynny.BudgetCategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Wallet',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60)),
+                ('balance', models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=20)),
+                ('created_time', models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pynny.Wallet'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pynny.BudgetCategory'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pynny.Wallet'),
+        ),
+    ]
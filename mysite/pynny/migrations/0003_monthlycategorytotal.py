@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:50
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    '''Computes the rollups of the Transactions that already exist'''
+    Transaction = apps.get_model('pynny', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('pynny', 'MonthlyCategoryTotal')
+    rows = (Transaction.objects.annotate(month=TruncMonth('created_time'))
+            .order_by()
+            .values('user_id', 'category_id', 'wallet_id', 'month')
+            .annotate(total=Sum('amount'), count=Count('id')))
+    MonthlyCategoryTotal.objects.bulk_create([MonthlyCategoryTotal(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pynny', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to='pynny.BudgetCategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to='pynny.Wallet')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='monthlycategorytotal',
+            index=models.Index(fields=['user', 'month'], name='monthlytotal_user_month_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlycategorytotal',
+            unique_together=set([('user', 'category', 'wallet', 'month')]),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:57
+from __future__ import unicode_literals
+
+import logging
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Min
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_budgets(apps, schema_editor):
+    '''Deletes Budgets that were renewed more than once on the same day,
+    keeping the oldest copy, so the unique constraint can be added.
+    Every deleted row is logged so it can be restored by hand.'''
+    Budget = apps.get_model('pynny', 'Budget')
+    duplicates = (Budget.objects.order_by()
+                  .values('user_id', 'budget_id', 'month')
+                  .annotate(keep=Min('id'), copies=Count('id'))
+                  .filter(copies__gt=1))
+    for row in duplicates:
+        copies = (Budget.objects.filter(user_id=row['user_id'], budget_id=row['budget_id'], month=row['month'])
+                  .exclude(id=row['keep']))
+        for budget in copies.values('id', 'user_id', 'budget_id', 'month', 'goal', 'balance', 'wallet_id'):
+            logger.warning('Deleting duplicate of Budget %s: %s', row['keep'], budget)
+        copies.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pynny', '0003_monthlycategorytotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_budgets, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='budget',
+            unique_together=set([('user', 'budget_id', 'month')]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:00
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+
+def backfill_sequences(apps, schema_editor):
+    '''Starts each user's sequence after the highest budget_id they have'''
+    Budget = apps.get_model('pynny', 'Budget')
+    BudgetSequence = apps.get_model('pynny', 'BudgetSequence')
+    rows = Budget.objects.order_by().values('user_id').annotate(last_id=Max('budget_id'))
+    BudgetSequence.objects.bulk_create([BudgetSequence(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0008_alter_user_username_max_length'),
+        ('pynny', '0004_budget_renewal_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_id', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:08
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Sum, When
+import django.db.models.deletion
+
+
+def backfill_daily_balances(apps, schema_editor):
+    '''Computes the daily balance changes of the Transactions that already exist'''
+    Transaction = apps.get_model('pynny', 'Transaction')
+    DailyWalletBalance = apps.get_model('pynny', 'DailyWalletBalance')
+    change = Case(When(category__is_income=True, then=F('amount')), default=F('amount') * -1,
+                  output_field=DecimalField(max_digits=20, decimal_places=2))
+    rows = (Transaction.objects.order_by()
+            .values('user_id', 'wallet_id', 'created_time')
+            .annotate(change=Sum(change)))
+    DailyWalletBalance.objects.bulk_create([
+        DailyWalletBalance(user_id=row['user_id'], wallet_id=row['wallet_id'], day=row['created_time'],
+                           change=row['change']) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pynny', '0005_budgetsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyWalletBalance',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('change', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='pynny.Wallet')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailywalletbalance',
+            unique_together=set([('wallet', 'day')]),
+        ),
+        migrations.RunPython(backfill_daily_balances, migrations.RunPython.noop),
+    ]
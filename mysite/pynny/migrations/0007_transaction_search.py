@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    '''Creates the full-text index over Transaction descriptions'''
+    from pynny.utils import search
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from pynny.utils import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pynny', '0006_dailywalletbalance'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 22:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pynny', '0010_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anomalyscan',
+            name='since_transaction_id',
+            field=models.PositiveIntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -10,11 +10,15 @@ the necessary tables in the database.
 '''
 
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import date
 from django.contrib import auth
 from django.utils.encoding import python_2_unicode_compatible
 
+from .utils.dates import month_bounds
+
 @python_2_unicode_compatible
 class Wallet(models.Model):
     '''A source/destination for income and spending.
@@ -33,6 +37,28 @@ class Wallet(models.Model):
         return self.name
 
 
+class BudgetCategoryQuerySet(models.QuerySet):
+    '''QuerySet for BudgetCategories'''
+
+    def with_transaction_totals(self, start, end):
+        '''Annotates each category with `transaction_count`, its number of
+        Transactions overall, and `period_total`, the sum of its Transaction
+        amounts in the months from `start` up to (not including) `end`.
+        Reads the MonthlyCategoryTotal rollups in one grouped query, so the
+        cost doesn't depend on how many Transactions there are.'''
+        in_period = models.Q(monthly_totals__month__gte=start, monthly_totals__month__lt=end)
+        return self.annotate(
+            transaction_count=Coalesce(models.Sum('monthly_totals__count'), Value(0)),
+            period_total=Coalesce(
+                models.Sum(models.Case(
+                    models.When(in_period, then='monthly_totals__total'),
+                    output_field=models.DecimalField(max_digits=20, decimal_places=2),
+                )),
+                Value(0),
+            ),
+        )
+
+
 @python_2_unicode_compatible
 class BudgetCategory(models.Model):
     '''A category to tag transactions and budgets with.
@@ -43,11 +69,60 @@ class BudgetCategory(models.Model):
     is_income = models.BooleanField(default=False)
     user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
 
+    objects = BudgetCategoryQuerySet.as_manager()
+
     def __str__(self):
         '''Returns the string representation (`name`)'''
         return self.name
 
 
+class TransactionQuerySet(models.QuerySet):
+    '''QuerySet for Transactions with helpers for the common view filters'''
+
+    def for_user(self, user):
+        '''Transactions recorded by `user`'''
+        return self.filter(user=user)
+
+    def for_month(self, day):
+        '''Transactions recorded in the month containing `day`. Uses a
+        date range rather than `__month` so the created_time indexes apply.'''
+        first, next_first = month_bounds(day)
+        return self.filter(created_time__gte=first, created_time__lt=next_first)
+
+
+class TransactionManager(models.Manager.from_queryset(TransactionQuerySet)):
+    '''Default Transaction manager. Every Transaction is displayed with
+    its wallet and category, so they are always joined in up front
+    instead of costing a query per row.'''
+
+    def get_queryset(self):
+        return super(TransactionManager, self).get_queryset().select_related('wallet', 'category')
+
+
+class BudgetQuerySet(models.QuerySet):
+    '''QuerySet for Budgets with helpers for the common view filters'''
+
+    def for_user(self, user):
+        '''Budgets owned by `user`'''
+        return self.filter(user=user)
+
+    def for_month(self, day):
+        '''Budgets for the month containing `day`. Uses a date
+        range rather than matching the month as a string, so the
+        `(user, month)` index applies.'''
+        first, next_first = month_bounds(day)
+        return self.filter(month__gte=first, month__lt=next_first)
+
+
+class BudgetManager(models.Manager.from_queryset(BudgetQuerySet)):
+    '''Default Budget manager. Budgets are displayed (and classed by
+    `budget_class`) with their category and wallet, so those are always
+    joined in up front.'''
+
+    def get_queryset(self):
+        return super(BudgetManager, self).get_queryset().select_related('category', 'wallet')
+
+
 @python_2_unicode_compatible
 class Transaction(models.Model):
     '''A record of income or an expense. `amount`
@@ -65,6 +140,15 @@ class Transaction(models.Model):
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE)
     user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
 
+    objects = TransactionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_time'], name='transaction_user_created_idx'),
+            models.Index(fields=['wallet', 'created_time'], name='transaction_wallet_created_idx'),
+            models.Index(fields=['category', 'created_time'], name='transaction_cat_created_idx'),
+        ]
+
     def __str__(self):
         '''Returns the string representation (`name`)'''
         return self.category.name
@@ -87,6 +171,15 @@ class Budget(models.Model):
     balance = models.DecimalField(max_digits=20, decimal_places=2, blank=True, default=0.0)
     user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
 
+    objects = BudgetManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month'], name='budget_user_month_idx'),
+        ]
+        # A Budget is renewed at most once into each month
+        unique_together = ('user', 'budget_id', 'month')
+
     def __str__(self):
         '''Returns the string representation (`name`)'''
         return self.category.name
@@ -122,6 +215,114 @@ class Notification(models.Model):
     dismissed_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'dismissed'], name='notification_user_dismiss_idx'),
+        ]
+
     def __str__(self):
         """Returns the title of the notification"""
         return self.title
+
+
+class MonthlyCategoryTotal(models.Model):
+    """Rollup of the Transactions recorded by a user in one category and
+    wallet during one month. `month` is the first day of the month, `total`
+    the sum of the Transaction amounts and `count` how many there are.
+    Kept up to date by `pynny.utils.rollups` as Transactions are written."""
+    user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
+    category = models.ForeignKey(BudgetCategory, on_delete=models.CASCADE, related_name='monthly_totals')
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='monthly_totals')
+    month = models.DateField()
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'category', 'wallet', 'month')
+        indexes = [
+            models.Index(fields=['user', 'month'], name='monthlytotal_user_month_idx'),
+        ]
+
+
+class BudgetSequence(models.Model):
+    """The last `budget_id` handed out to a user. New ids are
+    allocated by `pynny.utils.sequences` with an `F()` increment,
+    so concurrent requests never receive the same id."""
+    user = models.OneToOneField(auth.get_user_model(), on_delete=models.CASCADE, primary_key=True)
+    last_id = models.PositiveIntegerField(default=0)
+
+
+class DataVersion(models.Model):
+    """A counter bumped whenever one of a user's Transactions, Budgets,
+    Wallets, BudgetCategories, Savings or Notifications changes, and
+    when that last happened. Kept in the database rather than the cache
+    so every server process sees the same version (see
+    `pynny.utils.versions`)."""
+    user = models.OneToOneField(auth.get_user_model(), on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+
+class DailyWalletBalance(models.Model):
+    """The net change in a Wallet's balance from the Transactions dated
+    `day`. A wallet's balance at the end of any day is its current
+    balance less the changes of all later days, so these rows give
+    a balance history with one point per day of activity. Kept up
+    to date by `pynny.utils.wallet_history` as Transactions are written."""
+    user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='daily_balances')
+    day = models.DateField()
+    change = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('wallet', 'day')
+
+
+class AnomalyScan(models.Model):
+    """One run of the spending anomaly detector (`pynny.utils.anomalies`).
+    Each run looks at the Transactions with ids above the previous run's
+    `last_transaction_id`, up to and including its own."""
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # The previous run's last_transaction_id; unique, so only one run
+    # can claim the Transactions that follow it
+    since_transaction_id = models.PositiveIntegerField(null=True, blank=True, unique=True)
+    last_transaction_id = models.PositiveIntegerField(default=0)
+    users = models.PositiveIntegerField(default=0)
+    notifications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        get_latest_by = 'last_transaction_id'
+
+
+class Job(models.Model):
+    """A unit of background work, queued by a request and run by the
+    `run_jobs` worker (see `pynny.utils.jobs`). `arguments` is a JSON
+    object passed to the job's handler and `payload` holds any file it
+    needs, such as an uploaded import. Handlers report `progress` out
+    of `total`, which the page that queued the job polls for."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    kind = models.CharField(max_length=40)
+    arguments = models.TextField(default='{}')
+    payload = models.BinaryField(null=True, blank=True)
+    user = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    created_time = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return '{} #{} ({})'.format(self.kind, self.id, self.status)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+'''
+File: signals.py
+Author: Zachary King
+
+Signal handlers for the Pynny app. These are connected in
+`PynnyConfig.ready()`.
+'''
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import post_migrate, post_save
+
+from .models import Transaction, Budget, BudgetCategory, Wallet, Savings, Notification
+from .utils import search, versions
+
+# Models whose changes bump their user's data version
+VERSIONED_MODELS = (Transaction, Budget, BudgetCategory, Wallet, Savings, Notification)
+
+
+def bump_version(sender, instance, **kwargs):
+    '''Records that the user who owns `instance` changed their data,
+    which also drops their cached dashboard. Deletes bump the version
+    themselves, once per operation: a post_delete receiver would stop
+    Django from deleting cascades in bulk.'''
+    versions.bump(instance.user_id)
+
+
+def start_version(sender, instance, created, raw=False, **kwargs):
+    '''Starts the data version of a new user'''
+    if created and not raw:
+        versions.start(instance.pk)
+
+
+def install_search(sender, using, **kwargs):
+    '''Recreates the search index after migrations. SQLite drops its
+    triggers whenever a migration rebuilds the Transaction table.'''
+    connection = connections[using]
+    if Transaction._meta.db_table in connection.introspection.table_names():
+        search.install(connection)
+
+
+def connect(app_config):
+    for model in VERSIONED_MODELS:
+        post_save.connect(bump_version, sender=model, dispatch_uid='pynny_version_save')
+    post_save.connect(start_version, sender=get_user_model(), dispatch_uid='pynny_version_start')
+    post_migrate.connect(install_search, sender=app_config, dispatch_uid='pynny_install_search')
@@ -2,7 +2,71 @@
 
 // Put the class .tr-link on any <tr> tag to make it a clickable row link
 $(document).ready(function() {
-    $(".tr-link").click(function() {
+    $(document).on("click", ".tr-link", function() {
         window.location = $(this).data("href");
     });
-});
\ No newline at end of file
+});
+
+// Infinite scrolling for Transaction ledgers. A .ledger-more button
+// holds the URL of the next page; its rows are appended to the table
+// named by data-table, and the X-Next-Cursor header gives the page after.
+// data-query holds the ledger's search filters, kept on every page.
+$(document).ready(function() {
+    var loading = false;
+
+    function loadMore(button) {
+        if (loading || !button.data("next")) {
+            return;
+        }
+        loading = true;
+        $.get(button.data("next"), function(rows, status, xhr) {
+            $(button.data("table")).find("tbody").append(rows);
+            var cursor = xhr.getResponseHeader("X-Next-Cursor");
+            if (cursor) {
+                var query = button.data("query");
+                button.data("next", "?" + (query ? query + "&" : "") + "cursor=" + encodeURIComponent(cursor));
+            } else {
+                button.remove();
+            }
+        }).always(function() {
+            loading = false;
+        });
+    }
+
+    $(".ledger-more").click(function() {
+        loadMore($(this));
+    });
+
+    $(window).scroll(function() {
+        var button = $(".ledger-more").first();
+        if (button.length && $(window).scrollTop() + $(window).height() >= button.offset().top - 200) {
+            loadMore(button);
+        }
+    });
+});
+
+// Progress of background jobs. A .job-progress bar holds the URL of its
+// Job's status; it is polled until the Job is done or has failed, then
+// replaced by the Job's message.
+$(document).ready(function() {
+    function poll(bar) {
+        $.getJSON(bar.data("url"), function(job) {
+            var percent = job.total ? Math.round(100 * job.progress / job.total) : 0;
+            if (job.status === "done" || job.status === "failed") {
+                var alert = bar.closest(".alert");
+                if (job.status === "failed") {
+                    alert.removeClass("alert-info").addClass("alert-danger");
+                }
+                bar.replaceWith($("<p>").text(job.message + " ").append(
+                    $("<a>").attr("href", window.location.pathname).text("Refresh")));
+                return;
+            }
+            bar.find(".progress-bar").css("width", percent + "%").text(job.total ? percent + "%" : "");
+            setTimeout(function() { poll(bar); }, 2000);
+        });
+    }
+
+    $(".job-progress[data-url]").each(function() {
+        poll($(this));
+    });
+});
@@ -12,6 +12,8 @@ from datetime import date, datetime
 
 from decimal import Decimal
 
+from ..utils import forecasts
+
 
 @register.simple_tag
 def saving_class(saving):
@@ -53,20 +55,12 @@ def category_class(is_income):
 
 @register.simple_tag
 def budget_class(budget):
-    goal = budget.goal
-    bal = budget.balance
-    if budget.category.is_income:
-        if bal >= goal:
-            return 'success'
-        elif bal >= (goal * Decimal(0.8)):
-            return 'warning'
-        return 'danger'
+    return forecasts.status(budget.category.is_income, budget.balance, budget.goal)
 
-    if bal >= goal:
-        return 'danger'
-    elif bal >= (goal * Decimal(0.8)):
-        return 'warning'
-    return 'success'
+@register.simple_tag
+def forecast_class(forecast):
+    '''Returns the Bootstrap class of a Budget's month-end forecast'''
+    return forecast['status'] if forecast else 'default'
 
 @register.simple_tag
 def get_month(d):
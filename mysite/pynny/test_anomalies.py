@@ -0,0 +1,127 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+import datetime
+import decimal
+import io
+from unittest import mock
+
+from .models import AnomalyScan, Budget, BudgetCategory, Notification, Transaction, Wallet
+from .utils import anomalies, balances, notifications, versions
+
+
+class AnomalyDetectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='tester123')
+        self.wallet = Wallet.objects.create(user=self.user, name='checking', balance=1000)
+        self.groceries = BudgetCategory.objects.create(user=self.user, name='Groceries', is_income=False)
+        self.salary = BudgetCategory.objects.create(user=self.user, name='Salary', is_income=True)
+        self.today = datetime.date.today()
+        for i, amount in enumerate((40, 45, 50, 55, 60, 42, 48, 52)):
+            self.post(self.groceries, amount, self.today - datetime.timedelta(days=i + 1))
+        # The first run only records where the next one starts
+        anomalies.run(processes=1)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def post(self, category, amount, day=None):
+        return balances.post_transaction(amount=decimal.Decimal(amount), category=category, wallet=self.wallet,
+                                         user=self.user, created_time=day or self.today, description='Shop')
+
+    def notices(self, kind):
+        return Notification.objects.filter(user=self.user, type=kind)
+
+    def test_first_run_creates_nothing(self):
+        scan = AnomalyScan.objects.latest()
+        self.assertEqual(scan.notifications, 0)
+        self.assertEqual(scan.last_transaction_id, Transaction.objects.latest('id').id)
+        self.assertIsNotNone(scan.finished_at)
+
+    def test_flags_outlier(self):
+        self.post(self.groceries, 49)
+        self.post(self.groceries, 400)
+        scan = anomalies.run(processes=1)
+        self.assertEqual(scan.users, 1)
+        notice = self.notices('spending_anomaly').get()
+        self.assertIn('400', notice.body)
+        self.assertEqual(notice.alert, 'warning')
+
+    def test_escapes_user_text(self):
+        self.groceries.name = '<b>Food</b>'
+        self.groceries.save()
+        trans = self.post(self.groceries, 400)
+        Transaction.objects.filter(id=trans.id).update(description='<script>x</script>')
+        anomalies.run(processes=1)
+        body = self.notices('spending_anomaly').get().body
+        self.assertNotIn('<script>', body)
+        self.assertIn('&lt;b&gt;Food&lt;/b&gt;', body)
+
+    def test_ignores_income_and_short_history(self):
+        for _ in range(3):
+            self.post(self.salary, 5000)
+        other = BudgetCategory.objects.create(user=self.user, name='Travel', is_income=False)
+        self.post(other, 10)
+        self.post(other, 900)
+        anomalies.run(processes=1)
+        self.assertFalse(self.notices('spending_anomaly').exists())
+
+    def test_only_scans_new_transactions(self):
+        self.post(self.groceries, 400)
+        anomalies.run(processes=1)
+        scan = anomalies.run(processes=1)
+        self.assertEqual(scan.users, 0)
+        self.assertEqual(self.notices('spending_anomaly').count(), 1)
+
+    def test_flags_budget_overrun_once(self):
+        Budget.objects.create(budget_id=1, user=self.user, category=self.groceries, wallet=self.wallet,
+                              goal=450, month=self.today, balance=392)
+        self.post(self.groceries, 30)
+        anomalies.run(processes=1)
+        self.assertFalse(self.notices('budget_overrun').exists())
+        self.post(self.groceries, 30)
+        anomalies.run(processes=1)
+        self.post(self.groceries, 30)
+        anomalies.run(processes=1)
+        notice = self.notices('budget_overrun').get()
+        self.assertEqual(notice.alert, 'danger')
+
+    def test_only_one_run_claims_new_transactions(self):
+        self.post(self.groceries, 400)
+        since_id = AnomalyScan.objects.latest().last_transaction_id
+        # Another run has claimed the same Transactions and is still scanning
+        other = AnomalyScan.objects.create(since_transaction_id=since_id)
+        scan = anomalies.run(processes=1)
+        self.assertIsNone(scan.id)
+        self.assertFalse(self.notices('spending_anomaly').exists())
+
+        # Until it's taken to have died
+        AnomalyScan.objects.filter(id=other.id).update(
+            started_at=timezone.now() - anomalies.CLAIM_TIMEOUT - datetime.timedelta(minutes=1))
+        scan = anomalies.run(processes=1)
+        self.assertEqual(scan.id, other.id)
+        self.assertIsNotNone(scan.finished_at)
+        self.assertEqual(self.notices('spending_anomaly').count(), 1)
+
+    def test_failed_run_gives_back_its_claim(self):
+        self.post(self.groceries, 400)
+        with mock.patch.object(anomalies, '_scan_all', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                anomalies.run(processes=1)
+        self.assertEqual(AnomalyScan.objects.count(), 1)
+        anomalies.run(processes=1)
+        self.assertEqual(self.notices('spending_anomaly').count(), 1)
+
+    def test_bulk_create_refreshes_cached_notifications(self):
+        self.assertEqual(len(notifications.undismissed(self.user, versions.current(self.user.id))), 0)
+        self.post(self.groceries, 400)
+        anomalies.run(processes=1)
+        self.assertEqual(len(notifications.undismissed(self.user, versions.current(self.user.id))), 1)
+
+    def test_command(self):
+        self.post(self.groceries, 400)
+        out = io.StringIO()
+        call_command('detect_anomalies', processes=1, stdout=out)
+        self.assertIn('created 1 notifications', out.getvalue())
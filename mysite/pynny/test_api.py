@@ -0,0 +1,148 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+import decimal
+import json
+
+from .models import Budget, BudgetCategory, Wallet, Transaction, Notification
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.other_user = User.objects.create_user(id=2, username='test_user2', password='123tester')
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.other_wallet = Wallet.objects.create(id=2, user=self.other_user, name='savings', balance=5)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+        self.other_user.delete()
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def test_requires_login(self):
+        self.client.logout()
+        resp = self.client.get(reverse('api_list', kwargs={'resource': 'wallets'}))
+        self.assertEqual(resp.status_code, 401)
+
+    def test_list_with_sparse_fields(self):
+        resp = self.client.get(reverse('api_list', kwargs={'resource': 'wallets'}), {'fields': 'name'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {'results': [{'name': 'checking'}], 'next_cursor': None})
+
+        resp = self.client.get(reverse('api_list', kwargs={'resource': 'wallets'}), {'fields': 'name,secret'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_cursor_pagination(self):
+        for i in range(4):
+            Wallet.objects.create(user=self.user, name='wallet{}'.format(i))
+        url = reverse('api_list', kwargs={'resource': 'wallets'})
+        names, cursor = [], ''
+        for page in range(3):
+            body = self.client.get(url, {'fields': 'name', 'limit': 2, 'cursor': cursor}).json()
+            names += [row['name'] for row in body['results']]
+            cursor = body['next_cursor']
+        self.assertIsNone(cursor)
+        self.assertEqual(names, ['checking', 'wallet0', 'wallet1', 'wallet2', 'wallet3'])
+
+    def test_create_transaction_posts_balances(self):
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'transactions'}),
+                         {'amount': '12.34', 'category': 1, 'wallet': 1, 'created_time': '2017-09-01'})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()['amount'], '12.34')
+        self.assertEqual(Wallet.objects.get(id=1).balance, decimal.Decimal('87.66'))
+
+    def test_create_rejects_other_users_rows(self):
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'transactions'}),
+                         {'amount': '1', 'category': 1, 'wallet': 2})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_rejects_oversized_amounts(self):
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'transactions'}),
+                         {'amount': '1e24', 'category': 1, 'wallet': 1})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rejects_null_dates(self):
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'transactions'}),
+                         {'amount': '1', 'category': 1, 'wallet': 1, 'created_time': None})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'budgets'}),
+                         {'category': 1, 'wallet': 1, 'goal': '50', 'month': None})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Transaction.objects.exists() or Budget.objects.exists())
+
+    def test_detail_update_and_delete(self):
+        url = reverse('api_detail', kwargs={'resource': 'wallets', 'pk': 1})
+        resp = self.send('patch', url, {'name': 'main'})
+        self.assertEqual(resp.json()['name'], 'main')
+        self.assertEqual(self.client.get(url, {'fields': 'id,name'}).json(), {'id': 1, 'name': 'main'})
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        self.assertFalse(Wallet.objects.filter(id=1).exists())
+
+    def test_other_users_rows_are_not_found(self):
+        url = reverse('api_detail', kwargs={'resource': 'wallets', 'pk': 2})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+
+    def test_create_budget_allocates_budget_id(self):
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'budgets'}),
+                         {'category': 1, 'wallet': 1, 'goal': '50', 'month': '2017-09-01'})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()['budget_id'], 1)
+        self.assertEqual(Budget.objects.get().month, datetime.date(2017, 9, 1))
+
+    def test_budget_category_change_recomputes_balance(self):
+        rent = BudgetCategory.objects.create(user=self.user, name='rent', is_income=False)
+        self.send('post', reverse('api_list', kwargs={'resource': 'transactions'}),
+                  {'amount': '30', 'category': rent.id, 'wallet': 1})
+        budget = self.send('post', reverse('api_list', kwargs={'resource': 'budgets'}),
+                           {'category': 1, 'wallet': 1, 'goal': '50'}).json()
+        self.assertEqual(budget['balance'], '0.00')
+        url = reverse('api_detail', kwargs={'resource': 'budgets', 'pk': budget['id']})
+        resp = self.send('patch', url, {'category': rent.id})
+        self.assertEqual(resp.json()['balance'], '30.00')
+        # Other edits leave the balance alone
+        resp = self.send('patch', url, {'goal': '60'})
+        self.assertEqual(resp.json()['balance'], '30.00')
+
+    def test_dismiss_notification(self):
+        notice = Notification.objects.create(type='t', title='Hi', body='b', user=self.user)
+        url = reverse('api_detail', kwargs={'resource': 'notifications', 'pk': notice.id})
+        self.assertTrue(self.send('patch', url, {'dismissed': True}).json()['dismissed'])
+        resp = self.send('patch', url, {'title': 'changed'})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.send('post', reverse('api_list', kwargs={'resource': 'notifications'}), {})
+        self.assertEqual(resp.status_code, 405)
+
+    def test_batch(self):
+        trans = Transaction.objects.create(amount=5, category=self.category, wallet=self.wallet, user=self.user)
+        resp = self.send('post', reverse('api_batch'), {'operations': [
+            {'method': 'create', 'resource': 'categories', 'data': {'name': 'paycheck', 'is_income': True}},
+            {'method': 'update', 'resource': 'wallets', 'id': 1, 'data': {'name': 'main'}},
+            {'method': 'delete', 'resource': 'transactions', 'id': trans.id},
+        ]})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()['results']
+        self.assertEqual(results[0]['name'], 'paycheck')
+        self.assertEqual(results[2], {'id': trans.id, 'deleted': True})
+        self.assertEqual(Wallet.objects.get(id=1).name, 'main')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_batch_is_atomic(self):
+        resp = self.send('post', reverse('api_batch'), {'operations': [
+            {'method': 'create', 'resource': 'categories', 'data': {'name': 'paycheck'}},
+            {'method': 'update', 'resource': 'wallets', 'id': 2, 'data': {'name': 'mine now'}},
+        ]})
+        self.assertEqual(resp.status_code, 404)
+        self.assertIn('Operation 1', resp.json()['error'])
+        self.assertFalse(BudgetCategory.objects.filter(name='paycheck').exists())
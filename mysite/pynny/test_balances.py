@@ -0,0 +1,133 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import datetime
+import decimal
+
+from .models import Budget, BudgetCategory, DailyWalletBalance, MonthlyCategoryTotal, Wallet, Transaction
+from .utils import balances
+
+
+class BalancePostingTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.income = BudgetCategory.objects.create(id=2, user=self.user, name='paycheck', is_income=True)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.other_wallet = Wallet.objects.create(id=2, user=self.user, name='savings', balance=0)
+
+        self.budget = Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100,
+                                            month=datetime.date.today(), wallet=self.wallet, balance=0)
+        self.income_budget = Budget.objects.create(budget_id=2, user=self.user, category=self.income, goal=100,
+                                                   month=datetime.date.today(), wallet=self.wallet, balance=0)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def post(self, amount, category=None, wallet=None):
+        return balances.post_transaction(category=category or self.category, wallet=wallet or self.wallet,
+                                         amount=decimal.Decimal(amount), description='foo',
+                                         created_time=datetime.date.today(), user=self.user)
+
+    def balance(self, obj):
+        return type(obj).objects.get(id=obj.id).balance
+
+    def test_parse_amount(self):
+        self.assertEqual(balances.parse_amount('10.1'), decimal.Decimal('10.10'))
+        self.assertEqual(balances.parse_amount(' 0.105 '), decimal.Decimal('0.11'))
+        for bad in ('', 'abc', 'NaN', 'Infinity', '1e30', '1e24', '-1e18'):
+            with self.assertRaises(ValueError):
+                balances.parse_amount(bad)
+
+    def test_post_expense(self):
+        self.post('10.10')
+        self.assertEqual(self.balance(self.wallet), decimal.Decimal('89.90'))
+        self.assertEqual(self.balance(self.budget), decimal.Decimal('10.10'))
+        self.assertEqual(self.balance(self.income_budget), 0)
+
+    def test_post_income(self):
+        self.post('0.30', category=self.income)
+        self.assertEqual(self.balance(self.wallet), decimal.Decimal('100.30'))
+        self.assertEqual(self.balance(self.income_budget), decimal.Decimal('0.30'))
+
+    def test_delete_reverts_balances(self):
+        trans = self.post('10.10')
+        balances.delete_transaction(trans)
+        self.assertEqual(self.balance(self.wallet), 100)
+        self.assertEqual(self.balance(self.budget), 0)
+        self.assertFalse(Transaction.objects.filter(id=trans.id).exists())
+
+    def test_update_moves_balances(self):
+        trans = self.post('10.10')
+        balances.update_transaction(trans, category=self.income, wallet=self.other_wallet, amount=decimal.Decimal('5'))
+        self.assertEqual(self.balance(self.wallet), 100)
+        self.assertEqual(self.balance(self.other_wallet), 5)
+        self.assertEqual(self.balance(self.budget), 0)
+        self.assertEqual(self.balance(self.income_budget), 5)
+
+    def writes(self, trans, **fields):
+        '''Updates `trans` and returns the tables written, in order'''
+        with CaptureQueriesContext(connection) as context:
+            balances.update_transaction(trans, **fields)
+        return [query['sql'].split('"')[1] for query in context.captured_queries
+                if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+
+    def test_description_edit_is_one_update(self):
+        trans = self.post('10.10')
+        self.assertEqual(self.writes(trans, description='bar', amount=decimal.Decimal('10.10')),
+                         ['pynny_transaction', 'pynny_dataversion'])
+        self.assertEqual(Transaction.objects.get(id=trans.id).description, 'bar')
+        self.assertEqual(self.writes(trans, description='bar'), [])
+
+    def test_amount_edit_applies_the_difference(self):
+        trans = self.post('10.10')
+        self.assertEqual(self.writes(trans, amount=decimal.Decimal('12')), [
+            'pynny_transaction', 'pynny_dataversion', 'pynny_wallet', 'pynny_budget', 'pynny_monthlycategorytotal',
+            'pynny_dailywalletbalance'])
+        self.assertEqual(self.balance(self.wallet), 88)
+        self.assertEqual(self.balance(self.budget), 12)
+        self.assertEqual(self.balance(self.income_budget), 0)
+        rollup = MonthlyCategoryTotal.objects.get(category=self.category)
+        self.assertEqual((rollup.total, rollup.count), (12, 1))
+
+    def test_date_edit_only_moves_history(self):
+        trans = self.post('10.10')
+        self.post('1')
+        day = datetime.date(2017, 3, 2)
+        # The rollups and balance history move to the new month and day
+        self.assertEqual(set(self.writes(trans, created_time=day)),
+                         {'pynny_transaction', 'pynny_dataversion', 'pynny_monthlycategorytotal',
+                          'pynny_dailywalletbalance'})
+        self.assertEqual(self.balance(self.wallet), decimal.Decimal('88.90'))
+        self.assertEqual(DailyWalletBalance.objects.get(wallet=self.wallet, day=day).change,
+                         decimal.Decimal('-10.10'))
+
+    def test_update_moves_rollups(self):
+        trans = self.post('10.10')
+        balances.update_transaction(trans, category=self.income, wallet=self.other_wallet, amount=decimal.Decimal('5'))
+        totals = dict(((r.category_id, r.wallet_id), (r.total, r.count)) for r in MonthlyCategoryTotal.objects.all())
+        self.assertEqual(totals, {(1, 1): (0, 0), (2, 2): (5, 1)})
+
+    def test_stale_instance_is_not_reverted_twice(self):
+        trans = self.post('10.10')
+        stale = Transaction.objects.get(id=trans.id)
+        balances.update_transaction(trans, amount=decimal.Decimal('20'))
+        balances.delete_transaction(stale)
+        self.assertEqual(self.balance(self.wallet), 100)
+        self.assertEqual(self.balance(self.budget), 0)
+
+    def test_budget_count_does_not_change_query_count(self):
+        # The first post creates this month's rollup and today's balance history rows
+        self.post('1')
+        with self.assertNumQueries(8):
+            self.post('1')
+        for i in range(10):
+            Budget.objects.create(budget_id=10 + i, user=self.user, category=self.category, goal=100,
+                                  wallet=self.wallet, balance=0)
+        with self.assertNumQueries(8):
+            self.post('1')
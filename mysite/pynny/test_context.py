@@ -0,0 +1,51 @@
+from django.test import TestCase, RequestFactory
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+
+from .models import Budget, BudgetCategory, Wallet
+from .utils.context import BUDGET_PAGES, user_data
+from .utils.testing import QueryCountTestMixin
+
+
+class UserDataTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.budget = Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100,
+                                            month=datetime.date.today(), wallet=self.wallet, balance=0)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return request
+
+    def test_datasets_are_built_once_per_request(self):
+        request = self.request()
+        data = user_data(request)
+        self.assertIs(user_data(request), data)
+        with self.assertNumQueries(1):
+            self.assertTrue(data.categories)
+            self.assertEqual(list(user_data(request).context(BUDGET_PAGES)['categories']), [self.category])
+        self.assertIsNot(user_data(self.request()), data)
+
+    def test_context_is_lazy(self):
+        with self.assertNumQueries(0):
+            data = user_data(self.request()).context(BUDGET_PAGES, alerts={})
+        self.assertEqual(sorted(data), ['alerts', 'budget_forecasts', 'budgets', 'categories', 'last_month_budgets', 'wallets'])
+
+    def test_new_budget_checks_and_lists_categories_once(self):
+        self.client.login(username='test_user', password='tester123')
+        with self.assertMaxQueries(10) as context:
+            resp = self.client.get(reverse('new_budget'))
+        self.assertEqual(resp.status_code, 200)
+        queries = [q['sql'] for q in context.captured_queries if 'pynny_budgetcategory' in q['sql']]
+        self.assertEqual(len(queries), 1)
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+import datetime
+import decimal
+import io
+import re
+
+from .models import Budget, BudgetCategory, Wallet
+from .utils import balances, dashboard, importer
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        dashboard.reset_stats()
+
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.budget = Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100,
+                                            month=datetime.date.today(), wallet=self.wallet, balance=0)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def load(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_load_is_a_cache_hit(self):
+        self.load()
+        self.assertEqual(dashboard.stats(), {'hits': 0, 'misses': 1})
+        # Only the data version is looked up
+        with self.assertNumQueries(1):
+            dashboard.dashboard_payload(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.load()
+        # Of Pynny's tables, only the data version is read
+        tables = set(re.findall(r'"(pynny_[a-z]+)"', ' '.join(query['sql'] for query in context.captured_queries)))
+        self.assertEqual(tables, {'pynny_dataversion'})
+        self.assertEqual(dashboard.stats(), {'hits': 2, 'misses': 1})
+        self.assertEqual(response.context['budget_categories'], ['groceries'])
+        self.assertEqual([budget.id for budget in response.context['budgets']], [self.budget.id])
+
+    def test_transaction_invalidates(self):
+        self.load()
+        balances.post_transaction(amount=decimal.Decimal(12), category=self.category, wallet=self.wallet,
+                                  user=self.user, created_time=datetime.date.today())
+        response = self.load()
+        self.assertEqual(dashboard.stats()['misses'], 2)
+        self.assertEqual(response.context['transactions_per_category_totals'], [12])
+        self.assertEqual(response.context['budget_balance_data'], [12])
+
+    def test_budget_and_category_invalidate(self):
+        self.load()
+        self.budget.goal = 250
+        self.budget.save()
+        self.assertEqual(self.load().context['budget_goal_data'], [250])
+
+        self.client.post(reverse('one_category', kwargs={'category_id': self.category.id}), {'action': 'delete'})
+        self.assertEqual(self.load().context['budget_categories'], [])
+        self.assertEqual(dashboard.stats(), {'hits': 0, 'misses': 3})
+
+    def test_import_invalidates(self):
+        self.load()
+        importer.import_transactions(self.user, io.StringIO(
+            'date,amount,category,wallet\n{},3,groceries,checking\n'.format(datetime.date.today())))
+        self.assertEqual(self.load().context['transactions_per_category_data'], [1])
+
+    def test_other_users_cache_is_kept(self):
+        other = User.objects.create_user(username='other_user', password='tester123')
+        dashboard.dashboard_payload(other)
+        BudgetCategory.objects.create(user=self.user, name='coffee')
+        dashboard.dashboard_payload(other)
+        self.assertEqual(dashboard.stats(), {'hits': 1, 'misses': 1})
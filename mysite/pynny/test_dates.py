@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase
+
+import datetime
+
+from .utils.dates import month_bounds, previous_month
+
+
+class DateUtilsTests(SimpleTestCase):
+    def test_month_bounds(self):
+        self.assertEqual(month_bounds(datetime.date(2017, 3, 15)),
+                         (datetime.date(2017, 3, 1), datetime.date(2017, 4, 1)))
+        self.assertEqual(month_bounds(datetime.date(2017, 12, 31)),
+                         (datetime.date(2017, 12, 1), datetime.date(2018, 1, 1)))
+
+    def test_previous_month(self):
+        self.assertEqual(previous_month(datetime.date(2017, 3, 31)), datetime.date(2017, 2, 1))
+        self.assertEqual(previous_month(datetime.date(2018, 1, 10)), datetime.date(2017, 12, 1))
@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+import json
+
+from .models import Budget, BudgetCategory, Wallet, Transaction
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.other_user = User.objects.create_user(id=2, username='test_user2', email='test_user2@gmail.com',
+                                                   password='123tester')
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.other_wallet = Wallet.objects.create(id=2, user=self.user, name='cash', balance=0)
+        Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100,
+                              month=datetime.date(2017, 9, 1), wallet=self.wallet, balance=0)
+        for day, wallet in ((1, self.wallet), (15, self.wallet), (30, self.other_wallet)):
+            Transaction.objects.create(amount=day, category=self.category, description='day {}'.format(day),
+                                       created_time=datetime.date(2017, 9, day), wallet=wallet, user=self.user)
+
+        other_category = BudgetCategory.objects.create(user=self.other_user, name='rent')
+        other_wallet = Wallet.objects.create(user=self.other_user, name='checking')
+        Transaction.objects.create(amount=500, category=other_category, wallet=other_wallet, user=self.other_user)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+        self.other_user.delete()
+
+    def content(self, resp):
+        return b''.join(resp.streaming_content).decode('utf-8')
+
+    def test_export_csv(self):
+        resp = self.client.get(reverse('export_transactions'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        lines = self.content(resp).splitlines()
+        self.assertEqual(lines[0], 'id,created_time,amount,category_name,category_is_income,wallet_name,description')
+        self.assertEqual(len(lines), 4)
+
+    def test_export_ndjson_with_filters(self):
+        resp = self.client.get(reverse('export_transactions'),
+                               {'format': 'ndjson', 'start': '2017-09-10', 'end': '2017-09-30', 'wallet': 1})
+        self.assertEqual(resp.status_code, 200)
+        rows = [json.loads(line) for line in self.content(resp).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['description'], 'day 15')
+        self.assertEqual(rows[0]['amount'], '15.00')
+
+    def test_export_budgets(self):
+        resp = self.client.get(reverse('export_transactions'), {'data': 'budgets', 'format': 'ndjson'})
+        rows = [json.loads(line) for line in self.content(resp).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['category_name'], 'groceries')
+
+    def test_export_rejects_bad_filters(self):
+        self.assertEqual(self.client.get(reverse('export_transactions'), {'data': 'users'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_transactions'), {'start': 'today'}).status_code, 400)
@@ -0,0 +1,78 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+import decimal
+
+from .models import Budget, BudgetCategory, Wallet
+from .utils import balances, forecasts
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='tester123')
+        self.wallet = Wallet.objects.create(user=self.user, name='checking', balance=1000)
+        self.groceries = BudgetCategory.objects.create(user=self.user, name='groceries', is_income=False)
+        self.gas = BudgetCategory.objects.create(user=self.user, name='gas', is_income=False)
+        self.day = datetime.date(2017, 3, 10)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def post(self, category, amount, day):
+        balances.post_transaction(amount=decimal.Decimal(amount), category=category, wallet=self.wallet,
+                                  user=self.user, created_time=day)
+
+    def budget(self, category, goal):
+        return Budget.objects.create(budget_id=category.id, user=self.user, category=category, wallet=self.wallet,
+                                     goal=goal, month=self.day, balance=0)
+
+    def project(self):
+        budgets = Budget.objects.for_user(self.user).for_month(self.day)
+        return forecasts.project(forecasts.with_forecast(budgets, self.day), self.day)
+
+    def test_projects_daily_rate_without_history(self):
+        budget = self.budget(self.groceries, 400)
+        self.post(self.groceries, 60, datetime.date(2017, 3, 2))
+        self.post(self.groceries, 40, datetime.date(2017, 3, 9))
+        forecast = self.project()[budget.id]
+        # $10 a day so far, 21 days to go
+        self.assertEqual(forecast['daily_rate'], decimal.Decimal('10.00'))
+        self.assertEqual(forecast['projected'], decimal.Decimal('310.00'))
+        self.assertEqual(forecast['status'], 'success')
+        self.assertEqual(forecast['over'], 0)
+
+    def test_blends_in_previous_months(self):
+        self.post(self.groceries, 50, datetime.date(2017, 2, 5))
+        self.post(self.groceries, 150, datetime.date(2017, 2, 20))
+        budget = self.budget(self.groceries, 250)
+        self.post(self.groceries, 100, datetime.date(2017, 3, 9))
+        forecast = self.project()[budget.id]
+        # Averages $210 more at the current rate with the $150
+        # usually spent after the 10th
+        self.assertEqual(forecast['projected'], decimal.Decimal('280.00'))
+        self.assertEqual(forecast['status'], 'danger')
+        self.assertEqual(forecast['over'], decimal.Decimal('30.00'))
+
+    def test_projects_every_budget_from_one_query(self):
+        self.budget(self.groceries, 100)
+        self.budget(self.gas, 100)
+        self.post(self.gas, 20, datetime.date(2017, 1, 25))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.project()), 2)
+
+    def test_sees_transactions_as_they_are_posted(self):
+        budget = self.budget(self.groceries, 100)
+        self.assertEqual(self.project()[budget.id]['projected'], 0)
+        self.post(self.groceries, 50, self.day)
+        forecast = self.project()[budget.id]
+        self.assertEqual(forecast['projected'], decimal.Decimal('155.00'))
+        self.assertEqual(forecast['status'], 'danger')
+
+    def test_budgets_page_shows_projection(self):
+        Budget.objects.create(budget_id=1, user=self.user, category=self.groceries, wallet=self.wallet,
+                              goal=100, month=datetime.date.today(), balance=0)
+        self.client.login(username='test_user', password='tester123')
+        self.assertContains(self.client.get(reverse('budgets')), 'Projected: $0.00')
+        self.assertContains(self.client.get(reverse('index')), 'budgetForecasts')
@@ -0,0 +1,133 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.shortcuts import reverse
+
+import datetime
+import decimal
+import io
+import os
+import tempfile
+
+from .models import Budget, BudgetCategory, Wallet, Transaction
+from .utils import importer
+
+CSV_DATA = '''date,amount,category,wallet,description
+2017-09-01,10.50,groceries,checking,food
+2017-09-02,100.00,paycheck,checking,work
+2017-09-03,4.25,coffee,cash,latte
+'''
+
+OFX_DATA = '''OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20170905120000<TRNAMT>-20.00<NAME>Grocery Store</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20170906
+<TRNAMT>50.00
+<MEMO>Refund
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+'''
+
+
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.income = BudgetCategory.objects.create(id=2, user=self.user, name='paycheck', is_income=True)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.budget = Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100,
+                                            month=datetime.date.today(), wallet=self.wallet, balance=0)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_import_csv(self):
+        count = importer.import_transactions(self.user, io.StringIO(CSV_DATA), 'csv')
+        self.assertEqual(count, 3)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Wallet.objects.get(id=1).balance, decimal.Decimal('189.50'))
+        self.assertEqual(Wallet.objects.get(name='cash').balance, decimal.Decimal('-4.25'))
+        self.assertEqual(Budget.objects.get(id=self.budget.id).balance, decimal.Decimal('10.50'))
+        self.assertFalse(BudgetCategory.objects.get(name='coffee').is_income)
+
+    def test_import_in_chunks(self):
+        rows = ''.join('2017-09-01,1,groceries,checking,row{}\n'.format(i) for i in range(5))
+        data = io.StringIO('date,amount,category,wallet,description\n' + rows)
+        # 2 lookups, 3 bulk inserts, 1 wallet and 1 budget update, creating
+        # 1 monthly rollup and 1 daily balance (update, savepoint, insert,
+        # release), the data version, plus the savepoint
+        with self.assertNumQueries(18):
+            count = importer.import_transactions(self.user, data, 'csv', chunk_size=2)
+        self.assertEqual(count, 5)
+        self.assertEqual(Wallet.objects.get(id=1).balance, 95)
+
+    def test_invalid_row_imports_nothing(self):
+        data = io.StringIO(CSV_DATA + '2017-09-04,lots,groceries,checking,bad\n')
+        with self.assertRaises(importer.ImportFormatError) as context:
+            importer.import_transactions(self.user, data, 'csv')
+        self.assertEqual(context.exception.line, 5)
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertEqual(Wallet.objects.get(id=1).balance, 100)
+
+    def test_missing_columns(self):
+        with self.assertRaises(importer.ImportFormatError):
+            importer.import_transactions(self.user, io.StringIO('date,amount\n2017-09-01,1\n'), 'csv')
+
+    def test_import_ofx(self):
+        count = importer.import_transactions(self.user, io.BytesIO(OFX_DATA.encode('utf-8')), 'ofx',
+                                             wallet='checking', category='groceries')
+        self.assertEqual(count, 2)
+        debit = Transaction.objects.get(description='Grocery Store')
+        self.assertEqual(debit.amount, 20)
+        self.assertEqual(debit.category, self.category)
+        self.assertEqual(debit.created_time, datetime.date(2017, 9, 5))
+        refund = Transaction.objects.get(description='Refund')
+        self.assertTrue(refund.category.is_income)
+        self.assertEqual(Wallet.objects.get(id=1).balance, 130)
+
+    def test_import_view(self):
+        upload = SimpleUploadedFile('history.csv', CSV_DATA.encode('utf-8'))
+        resp = self.client.post(reverse('import_transactions'), {'file': upload})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(resp.context['transactions']), 3)
+        self.assertTrue(len(resp.context['alerts']['success']) >= 1)
+
+    def test_import_view_reports_errors(self):
+        upload = SimpleUploadedFile('history.csv', b'date,amount,category,wallet\nyesterday,1,a,b\n')
+        resp = self.client.post(reverse('import_transactions'), {'file': upload})
+        self.assertEqual(resp.status_code, 400)
+        self.assertTrue(len(resp.context['alerts']['errors']) >= 1)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_import_view_escapes_errors(self):
+        upload = SimpleUploadedFile('history.csv', b'date,amount,category,wallet\n2017-09-01,<b>1</b>,a,b\n')
+        resp = self.client.post(reverse('import_transactions'), {'file': upload})
+        self.assertContains(resp, '&lt;b&gt;1&lt;/b&gt;', status_code=400)
+        self.assertNotContains(resp, '<b>1</b>', status_code=400)
+
+    def test_import_view_rejects_unreadable_files(self):
+        for content in (b'date,amount,category,wallet\n2017-09-01,1,\xff\xfe,b\n', b'date,amount\0\n'):
+            upload = SimpleUploadedFile('history.csv', content)
+            resp = self.client.post(reverse('import_transactions'), {'file': upload})
+            self.assertEqual(resp.status_code, 400)
+        upload = SimpleUploadedFile('history.csv', CSV_DATA.encode('utf-8'))
+        resp = self.client.post(reverse('import_transactions'), {'file': upload, 'wallet': 999})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_import_command(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(handle, 'w') as f:
+                f.write(CSV_DATA)
+            call_command('import_transactions', 'test_user', path, stdout=io.StringIO())
+        finally:
+            os.remove(path)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
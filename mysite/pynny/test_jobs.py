@@ -0,0 +1,186 @@
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import datetime
+import decimal
+import io
+import time
+from unittest import mock
+
+from .models import BudgetCategory, Job, Transaction, Wallet
+from .utils import balances, jobs
+
+CSV_DATA = '''date,amount,category,wallet,description
+2017-09-01,10.50,groceries,checking,food
+2017-09-02,100.00,paycheck,checking,work
+'''
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='tester123')
+        self.wallet = Wallet.objects.create(user=self.user, name='checking', balance=1000)
+        self.category = BudgetCategory.objects.create(user=self.user, name='groceries', is_income=False)
+        for i in range(5):
+            balances.post_transaction(amount=decimal.Decimal(10), category=self.category, wallet=self.wallet,
+                                      user=self.user, created_time=datetime.date(2017, 9, i + 1))
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_enqueue_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('nonsense')
+
+    def test_claims_oldest_job_once(self):
+        first = jobs.enqueue('delete_wallet', self.user, wallet_id=self.wallet.id)
+        second = jobs.enqueue('delete_category', self.user, category_id=self.category.id)
+        self.assertEqual(jobs.claim().id, first.id)
+        self.assertEqual(jobs.claim().id, second.id)
+        self.assertIsNone(jobs.claim())
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 2)
+
+    def test_deletes_in_chunks_with_progress(self):
+        job = jobs.enqueue('delete_wallet', self.user, wallet_id=self.wallet.id)
+        with mock.patch.object(jobs, 'CHUNK_SIZE', 2):
+            self.assertEqual(jobs.work(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual((job.progress, job.total), (5, 5))
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(Wallet.objects.filter(id=self.wallet.id).exists())
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_failed_job_keeps_its_error(self):
+        job = jobs.enqueue('import_transactions', self.user, payload=b'date,amount\nyesterday,1\n',
+                           file_format='csv')
+        with self.assertLogs('pynny.utils.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue(job.message)
+
+    def test_requeues_stale_jobs(self):
+        job = jobs.enqueue('delete_category', self.user, category_id=self.category.id)
+        jobs.claim()
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.filter(id=job.id).update(heartbeat=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim().id, job.id)
+
+    def take_over(self, job):
+        '''Claims `job`, then has it go stale and another run claim it.
+        Returns the first run's Job.'''
+        first = jobs.claim()
+        Job.objects.filter(id=job.id).update(heartbeat=timezone.now() - datetime.timedelta(hours=1))
+        jobs.requeue_stale()
+        self.assertNotEqual(jobs.claim().started_at, first.started_at)
+        return first
+
+    def test_late_run_does_not_overwrite_new_run(self):
+        job = jobs.enqueue('delete_category', self.user, category_id=self.category.id)
+        with self.assertLogs('pynny.utils.jobs', 'WARNING'):
+            jobs.run(self.take_over(job))
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.RUNNING)
+
+    def test_lost_import_commits_nothing(self):
+        job = jobs.enqueue('import_transactions', self.user, payload=CSV_DATA.encode('utf-8'), file_format='csv')
+        with self.assertLogs('pynny.utils.jobs', 'ERROR'):
+            jobs.run(self.take_over(job))
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_requeued_import_carries_on(self):
+        job = jobs.enqueue('import_transactions', self.user, payload=CSV_DATA.encode('utf-8'), file_format='csv')
+        # As if a run committed the first row before its worker died
+        Job.objects.filter(id=job.id).update(progress=1)
+        jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total), (Job.DONE, 2, 2))
+        self.assertEqual(list(Transaction.objects.filter(description='work').values_list('amount', flat=True)),
+                         [decimal.Decimal('100.00')])
+        self.assertFalse(Transaction.objects.filter(description='food').exists())
+
+    def test_heavy_wallet_delete_is_queued(self):
+        with mock.patch.object(jobs, 'BACKGROUND_ROWS', 3):
+            resp = self.client.post(reverse('one_wallet', kwargs={'wallet_id': self.wallet.id}), {'action': 'delete'})
+        self.assertEqual(resp.status_code, 202)
+        self.assertContains(resp, 'job-progress', status_code=202)
+        self.assertTrue(Wallet.objects.filter(id=self.wallet.id).exists())
+
+        job = Job.objects.get()
+        status = reverse('job_status', kwargs={'job_id': job.id})
+        self.assertEqual(self.client.get(status).json()['status'], Job.QUEUED)
+        jobs.work(burst=True)
+        self.assertEqual(self.client.get(status).json()['status'], Job.DONE)
+        self.assertFalse(Wallet.objects.filter(id=self.wallet.id).exists())
+
+    def test_light_category_delete_stays_inline(self):
+        resp = self.client.post(reverse('one_category', kwargs={'category_id': self.category.id}),
+                                {'action': 'delete'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(BudgetCategory.objects.filter(id=self.category.id).exists())
+
+    def delete_queries(self, transactions):
+        wallet = Wallet.objects.create(user=self.user, name='cash')
+        for i in range(transactions):
+            Transaction.objects.create(amount=1, category=self.category, wallet=wallet, user=self.user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(reverse('one_wallet', kwargs={'wallet_id': wallet.id}), {'action': 'delete'})
+        self.assertFalse(Wallet.objects.filter(id=wallet.id).exists())
+        return len(context.captured_queries)
+
+    def test_inline_delete_cascades_in_bulk(self):
+        self.assertEqual(self.delete_queries(50), self.delete_queries(1))
+
+    def test_large_import_is_queued(self):
+        upload = SimpleUploadedFile('history.csv', CSV_DATA.encode('utf-8'))
+        with mock.patch.object(jobs, 'BACKGROUND_IMPORT_BYTES', 10):
+            resp = self.client.post(reverse('import_transactions'), {'file': upload})
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(Transaction.objects.count(), 5)
+        jobs.work(burst=True)
+        job = Job.objects.get()
+        self.assertEqual(job.message, 'Imported 2 Transactions')
+        self.assertIsNone(job.payload)
+        self.assertEqual(Transaction.objects.count(), 7)
+
+    def test_status_is_only_shown_to_owner(self):
+        job = jobs.enqueue('delete_wallet', self.user, wallet_id=self.wallet.id)
+        User.objects.create_user(username='other_user', password='tester123')
+        self.client.login(username='other_user', password='tester123')
+        resp = self.client.get(reverse('job_status', kwargs={'job_id': job.id}))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_commands(self):
+        out = io.StringIO()
+        call_command('renew_budgets', background=True, stdout=out)
+        self.assertIn('Queued renew_budgets', out.getvalue())
+        call_command('run_jobs', burst=True, stdout=out)
+        self.assertIn('Ran 1 jobs', out.getvalue())
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    def test_heartbeat_keeps_a_silent_job_alive(self):
+        seen = []
+
+        def slow(job):
+            # Stands in for a handler that never reports progress
+            start = Job.objects.get(id=job.id).heartbeat
+            time.sleep(0.5)
+            seen.append(Job.objects.get(id=job.id).heartbeat > start)
+            return 'Slept'
+
+        with mock.patch.dict(jobs.HANDLERS, {'slow': slow}):
+            job = jobs.enqueue('slow')
+            jobs.run(jobs.claim(), heartbeat=0.1)
+        self.assertEqual(seen, [True])
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.DONE)
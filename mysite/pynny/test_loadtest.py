@@ -0,0 +1,52 @@
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+import random
+
+from .utils import loadtest, seeding
+
+
+class ReportTests(SimpleTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 95), 95)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 99), 7)
+        self.assertEqual(loadtest.percentile([], 50), 0.0)
+
+    def test_summary_counts_errors_and_throughput(self):
+        report = loadtest.Report()
+        for i in range(10):
+            report.add('dashboard', 0.01 * (i + 1), True)
+        report.add('post_transaction', 0.5, False)
+        report.elapsed = 2.0
+
+        summary = report.summary()
+        self.assertEqual(summary['dashboard']['requests'], 10)
+        self.assertEqual(summary['dashboard']['p50'], 0.05)
+        self.assertEqual(summary['post_transaction']['error_rate'], 1.0)
+        self.assertEqual(summary['all']['requests'], 11)
+        self.assertEqual(summary['all']['errors'], 1)
+        self.assertEqual(summary['all']['rps'], 5.5)
+        self.assertIn('post_transaction', report.format())
+
+
+@override_settings(SESSION_COOKIE_SECURE=False)
+class LoadTests(LiveServerTestCase):
+    def setUp(self):
+        self.user = seeding.seed(transactions=20, prefix='load')[0]
+
+    def test_every_action_succeeds(self):
+        client = loadtest.Client(self.live_server_url)
+        client.login(self.user.username, seeding.PASSWORD)
+        self.assertTrue(client.wallets)
+        self.assertTrue(client.categories)
+        for name, action in sorted(loadtest.ACTIONS.items()):
+            self.assertLess(action(client, random.Random(0)), 400, name)
+
+    def test_run_clients_reports_each_action(self):
+        report = loadtest.run_clients(self.live_server_url, [self.user.username], clients=1, duration=1)
+        summary = report.summary()
+        self.assertEqual(summary['login']['errors'], 0)
+        self.assertGreater(summary['all']['requests'], 1)
+        self.assertEqual(summary['all']['errors'], 0)
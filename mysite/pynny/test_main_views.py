@@ -4,8 +4,10 @@ from django.shortcuts import reverse
 from django.utils import timezone
 
 import datetime
+import decimal
 
 from .models import Budget, BudgetCategory, Wallet
+from .utils import balances
 
 
 class MainViewsTests(TestCase):
@@ -44,3 +46,20 @@ class MainViewsTests(TestCase):
     def test_unauthenticated_index_access(self):
         response = self.client.get(reverse('index'))
         self.assertEqual(response.status_code, 302)
+
+    def test_index_transactions_per_category(self):
+        today = datetime.date.today()
+        for amount, day in ((10, today), (5, today), (7, today - datetime.timedelta(days=400))):
+            balances.post_transaction(amount=decimal.Decimal(amount), category=self.category, wallet=self.wallet,
+                                      user=self.user, created_time=day)
+        BudgetCategory.objects.create(user=self.user, name='paycheck', is_income=True)
+
+        self.client.login(username='test_user', password='tester123')
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        counts = dict(zip(response.context['transactions_per_category_labels'],
+                          response.context['transactions_per_category_data']))
+        totals = dict(zip(response.context['transactions_per_category_labels'],
+                          response.context['transactions_per_category_totals']))
+        self.assertEqual(counts, {'groceries': 3, 'paycheck': 0})
+        self.assertEqual(totals, {'groceries': 15, 'paycheck': 0})
@@ -0,0 +1,83 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+from unittest import mock
+
+from .models import BudgetCategory, Wallet
+from .utils import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+        metrics.reset()
+
+    def histogram(self, metric, view):
+        return metrics._histograms[(metric, view)]
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.get(reverse('wallets'))
+        self.client.get(reverse('wallets'))
+        self.client.get(reverse('one_wallet', args=(1,)))
+
+        self.assertEqual(self.histogram('pynny_request_duration_seconds', 'wallets').count, 2)
+        self.assertEqual(self.histogram('pynny_request_duration_seconds', 'one_wallet').count, 1)
+        queries = self.histogram('pynny_request_queries', 'wallets')
+        self.assertGreater(queries.sum, 0)
+        self.assertGreater(self.histogram('pynny_request_db_seconds', 'wallets').count, 0)
+        self.assertGreater(self.histogram('pynny_request_template_seconds', 'wallets').sum, 0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5, 10))
+        for value in (0, 3, 7, 20):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 3])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 30)
+
+    def test_endpoint_is_staff_only(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+        self.client.logout()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_endpoint_renders_prometheus_text(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse('wallets'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode('utf-8')
+        self.assertIn('# TYPE pynny_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'pynny_request_duration_seconds_count\{view="wallets",worker="\d+"\} 1')
+        self.assertIn('le="+Inf"', body)
+        self.assertIn('pynny_dashboard_cache_hits_total', body)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        self.user.is_staff = True
+        self.user.save()
+        with mock.patch.object(metrics, 'SLOW_REQUEST_SECONDS', 0), \
+                self.assertLogs('pynny.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('wallets'))
+        self.assertIn('pynny_wallet', logs.output[0])
+
+        slow = metrics.slow_requests()
+        self.assertEqual(slow[0]['view'], 'wallets')
+        self.assertTrue(slow[0]['queries'])
+
+        response = self.client.get(reverse('slow_requests'))
+        self.assertIn('/pynny/wallets/', response.content.decode('utf-8'))
@@ -54,3 +54,27 @@ class ModelStrTests(TestCase):
 
     def test_savings_str(self):
         self.assertEqual(str(self.saving), 'TestSaving')
+
+
+class QuerySetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        for month in (datetime.date(2016, 12, 31), datetime.date(2017, 1, 1), datetime.date(2017, 1, 31),
+                      datetime.date(2017, 2, 1)):
+            Budget.objects.create(budget_id=1, user=self.user, category=self.category, goal=100, month=month,
+                                  wallet=self.wallet, balance=0)
+            Transaction.objects.create(amount=1, category=self.category, created_time=month,
+                                       wallet=self.wallet, user=self.user)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_budgets_for_month(self):
+        months = Budget.objects.for_user(self.user).for_month(datetime.date(2017, 1, 15)).values_list('month', flat=True)
+        self.assertEqual(sorted(months), [datetime.date(2017, 1, 1), datetime.date(2017, 1, 31)])
+
+    def test_transactions_for_month(self):
+        transactions = Transaction.objects.for_user(self.user).for_month(datetime.date(2016, 12, 1))
+        self.assertEqual([t.created_time for t in transactions], [datetime.date(2016, 12, 31)])
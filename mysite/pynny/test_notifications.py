@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+import datetime
+
+from .models import Notification, Savings
+from .utils import notifications, versions
+
+
+class NotificationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.saving = Savings.objects.create(user=self.user, name='car', goal=10, balance=10,
+                                             due_date=datetime.date.today())
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def notices(self):
+        response = self.client.get(reverse('wallets'))
+        self.assertEqual(response.status_code, 200)
+        return [notice.title for notice in response.context['notifications']]
+
+    def test_undismissed_is_cached(self):
+        version = versions.current(self.user.id)
+        self.assertEqual(notifications.undismissed(self.user, version), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.undismissed(self.user, version), [])
+        # Without a version there's nothing to key the cache on
+        with self.assertNumQueries(1):
+            self.assertEqual(notifications.undismissed(self.user), [])
+
+    def test_notify_invalidates(self):
+        self.assertEqual(self.notices(), [])
+        notifications.notify_saving_complete(self.saving)
+        self.assertEqual(self.notices(), ['Saving Complete!'])
+        self.assertEqual(len(notifications.undismissed(self.user)), 1)
+
+    def test_dismiss_invalidates(self):
+        notice = notifications.notify_saving_complete(self.saving)
+        self.assertEqual(self.notices(), ['Saving Complete!'])
+        response = self.client.post(reverse('dismiss_notice'), {'id': notice.id, 'action': 'dismiss'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Notification.objects.get(id=notice.id).dismissed)
+        self.assertEqual(self.notices(), [])
+
+    def test_lookup_is_lazy(self):
+        notifications.notify_saving_complete(self.saving)
+        cache.clear()
+        response = self.client.get(reverse('wallets'))
+        key = notifications._cache_key(1, versions.current(1))
+        # Rendering the notification bar filled the cache
+        self.assertEqual(len(cache.get(key)), 1)
+        cache.clear()
+        # The ledger rows fragment never shows notifications
+        self.client.get(reverse('transactions'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(len(response.context['notifications']), 1)
+
+    def bar_queries(self, name):
+        # The queries a page spends on the notification bar
+        self.client.get(reverse(name))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name))
+            self.assertEqual(len(response.context['notifications']), 1)
+        return [query['sql'] for query in queries.captured_queries
+                if 'pynny_notification' in query['sql'] or 'pynny_dataversion' in query['sql']]
+
+    def test_conditional_page_uses_cache(self):
+        notifications.notify_saving_complete(self.saving)
+        # The page's own version lookup keys the cached notifications
+        sql = self.bar_queries('wallets')
+        self.assertEqual(len(sql), 1)
+        self.assertIn('pynny_dataversion', sql[0])
+
+    def test_other_page_queries_once(self):
+        notifications.notify_saving_complete(self.saving)
+        # No version lookup just to key the cache
+        sql = self.bar_queries('categories')
+        self.assertEqual(len(sql), 1)
+        self.assertIn('pynny_notification', sql[0])
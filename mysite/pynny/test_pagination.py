@@ -0,0 +1,76 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+from django.utils import timezone
+
+import datetime
+
+from .models import BudgetCategory, Wallet, Transaction
+from .utils import pagination
+
+
+class LedgerPaginationTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user_id=1, user=self.user, name='groceries', is_income=False)
+        self.category.save()
+
+        self.wallet = Wallet.objects.create(id=1, user_id=1, name='checking', balance=100, created_time=timezone.now())
+        self.wallet.save()
+
+        # Two transactions per day, so pages have to break ties on id
+        today = datetime.date.today()
+        for i in range(7):
+            Transaction.objects.create(amount=i, category=self.category, description='t{}'.format(i),
+                                       created_time=today - datetime.timedelta(days=i // 2),
+                                       wallet=self.wallet, user=self.user)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.wallet.delete()
+        self.category.delete()
+        self.user.delete()
+
+    def test_pages_cover_ledger_in_order(self):
+        queryset = Transaction.objects.filter(user=self.user)
+        seen = []
+        cursor = None
+        while True:
+            transactions, cursor = pagination.ledger_page(queryset, cursor, page_size=3)
+            seen.extend(transactions)
+            if cursor is None:
+                break
+        expected = list(queryset.order_by('-created_time', '-id'))
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        transactions, cursor = pagination.ledger_page(Transaction.objects.all(), page_size=7)
+        self.assertEqual(len(transactions), 7)
+        self.assertIsNone(cursor)
+
+    def test_malformed_cursor_returns_first_page(self):
+        first, _ = pagination.ledger_page(Transaction.objects.all(), page_size=3)
+        page, _ = pagination.ledger_page(Transaction.objects.all(), 'garbage', page_size=3)
+        self.assertEqual(page, first)
+
+    def test_ajax_request_returns_rows_fragment(self):
+        transactions, cursor = pagination.ledger_page(Transaction.objects.all(), page_size=5)
+        resp = self.client.get(reverse('transactions'), {'cursor': cursor}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'pynny/transactions/transaction_rows.html')
+        self.assertTemplateNotUsed(resp, 'pynny/base/base.html')
+        self.assertEqual(len(resp.context['transactions']), 2)
+        self.assertFalse(resp.has_header('X-Next-Cursor'))
+
+    def test_wallet_ledger_sets_next_cursor(self):
+        pagination_size = pagination.PAGE_SIZE
+        pagination.PAGE_SIZE = 3
+        try:
+            resp = self.client.get('/pynny/wallets/1', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        finally:
+            pagination.PAGE_SIZE = pagination_size
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.has_header('X-Next-Cursor'))
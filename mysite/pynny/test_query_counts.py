@@ -0,0 +1,97 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.utils import timezone
+
+import datetime
+
+from .models import Budget, BudgetCategory, Wallet, Transaction, Savings
+from .utils.testing import QueryCountTestMixin
+
+
+class ListViewQueryCountTests(QueryCountTestMixin, TestCase):
+    '''Every list view should cost a fixed number of queries,
+    no matter how many rows it displays.'''
+
+    # Upper bound for any list view, including the session, user,
+    # data version and notification lookups every page makes
+    MAX_QUERIES = 11
+
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.income = BudgetCategory.objects.create(id=2, user=self.user, name='paycheck', is_income=True)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100, created_time=timezone.now())
+        self.budget = Budget.objects.create(id=1, budget_id=1, user=self.user, category=self.category, goal=100,
+                                            month=datetime.date.today(), wallet=self.wallet, balance=0)
+        self.add_rows(1)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def add_rows(self, count):
+        '''Adds `count` wallets, budgets, transactions and savings for the user'''
+        for i in range(count):
+            wallet = Wallet.objects.create(user=self.user, name='wallet{}'.format(i), balance=i)
+            Budget.objects.create(budget_id=100 + wallet.id, user=self.user, category=self.income, goal=10,
+                                  month=datetime.date.today(), wallet=wallet, balance=i)
+            Savings.objects.create(user=self.user, name='saving{}'.format(i), goal=10, balance=1,
+                                   due_date=datetime.date.today())
+            for category in (self.category, self.income):
+                Transaction.objects.create(amount=i, category=category, description='t{}'.format(i),
+                                           wallet=wallet, user=self.user)
+                Transaction.objects.create(amount=i, category=category, description='t{}'.format(i),
+                                           wallet=self.wallet, user=self.user)
+
+    def count_queries(self, url):
+        # Measure every request with cold caches
+        cache.clear()
+        with self.assertMaxQueries(self.MAX_QUERIES) as context:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url):
+        '''Asserts `url` runs the same bounded number of queries
+        after many more rows are added'''
+        before = self.count_queries(url)
+        self.add_rows(20)
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_index(self):
+        self.assertConstantQueries(reverse('index'))
+
+    def test_index_with_many_categories(self):
+        before = self.count_queries(reverse('index'))
+        for i in range(20):
+            BudgetCategory.objects.create(user=self.user, name='category{}'.format(i))
+        self.assertEqual(self.count_queries(reverse('index')), before)
+
+    def test_transactions(self):
+        self.assertConstantQueries(reverse('transactions'))
+
+    def test_wallets(self):
+        self.assertConstantQueries(reverse('wallets'))
+
+    def test_one_wallet(self):
+        self.assertConstantQueries(reverse('one_wallet', kwargs={'wallet_id': 1}))
+
+    def test_budgets(self):
+        self.assertConstantQueries(reverse('budgets'))
+
+    def test_one_budget(self):
+        self.assertConstantQueries(reverse('one_budget', kwargs={'budget_id': 1}))
+
+    def test_categories(self):
+        self.assertConstantQueries(reverse('categories'))
+
+    def test_one_category(self):
+        self.assertConstantQueries(reverse('one_category', kwargs={'category_id': 1}))
+
+    def test_savings(self):
+        self.assertConstantQueries(reverse('savings'))
@@ -0,0 +1,71 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+import datetime
+import decimal
+import io
+
+from .models import Budget, BudgetCategory, Wallet
+from .utils import balances, renewal
+
+
+class BudgetRenewalTests(TestCase):
+    def setUp(self):
+        # Create two users, each with a budget for February 2017
+        self.users = []
+        for i in (1, 2):
+            user = User.objects.create_user(id=i, username='test_user{}'.format(i), password='tester123')
+            category = BudgetCategory.objects.create(user=user, name='groceries', is_income=False)
+            wallet = Wallet.objects.create(user=user, name='checking', balance=100)
+            Budget.objects.create(budget_id=i, user=user, category=category, goal=100 * i,
+                                  month=datetime.date(2017, 2, 14), wallet=wallet, balance=40)
+            self.users.append(user)
+
+    def tearDown(self):
+        for user in self.users:
+            user.delete()
+
+    def march(self):
+        return Budget.objects.filter(month__gte=datetime.date(2017, 3, 1), month__lt=datetime.date(2017, 4, 1))
+
+    def test_renews_every_user(self):
+        # The 31st has no counterpart in February
+        count = renewal.renew_budgets(datetime.date(2017, 3, 31))
+        self.assertEqual(count, 2)
+        renewed = self.march().order_by('budget_id')
+        self.assertEqual([b.goal for b in renewed], [100, 200])
+        self.assertEqual([b.balance for b in renewed], [0, 0])
+        self.assertEqual(set(b.month for b in renewed), {datetime.date(2017, 3, 1)})
+
+    def test_is_idempotent(self):
+        renewal.renew_budgets(datetime.date(2017, 3, 5))
+        self.assertEqual(renewal.renew_budgets(datetime.date(2017, 3, 20)), 0)
+        self.assertEqual(self.march().count(), 2)
+
+    def test_one_bulk_insert_per_chunk(self):
+        # user ids, then per chunk: renewed, spent, previous and
+        # the insert, inside a savepoint, and the renewed users' versions
+        with self.assertNumQueries(8):
+            renewal.renew_budgets(datetime.date(2017, 3, 1), chunk_size=10)
+
+    def test_seeds_balance_from_this_months_transactions(self):
+        user = self.users[0]
+        budget = Budget.objects.get(user=user)
+        balances.post_transaction(amount=decimal.Decimal('12.50'), category=budget.category, wallet=budget.wallet,
+                                  user=user, created_time=datetime.date(2017, 3, 2))
+        renewal.renew_budgets(datetime.date(2017, 3, 1), users=[user])
+        self.assertEqual(self.march().get().balance, decimal.Decimal('12.50'))
+
+    def test_renews_each_budget_id_once(self):
+        first = Budget.objects.get(user=self.users[0])
+        Budget.objects.create(budget_id=first.budget_id, user=first.user, category=first.category, goal=5,
+                              month=datetime.date(2017, 2, 20), wallet=first.wallet)
+        renewal.renew_budgets(datetime.date(2017, 3, 1), users=[first.user])
+        self.assertEqual(self.march().get().goal, 100)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('renew_budgets', '--month', '2017-03', '--chunk-size', '1', stdout=out)
+        self.assertIn('Renewed 2 budgets', out.getvalue())
+        self.assertEqual(self.march().count(), 2)
@@ -0,0 +1,95 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+import decimal
+
+from .models import BudgetCategory, Wallet
+from .utils import balances, reports
+from .utils.testing import QueryCountTestMixin
+
+D = decimal.Decimal
+
+
+class SpendingReportTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.food = BudgetCategory.objects.create(id=1, user=self.user, name='food', is_income=False)
+        self.rent = BudgetCategory.objects.create(id=2, user=self.user, name='rent', is_income=False)
+        self.salary = BudgetCategory.objects.create(id=3, user=self.user, name='salary', is_income=True)
+        self.checking = Wallet.objects.create(id=1, user=self.user, name='checking', balance=0)
+        self.cash = Wallet.objects.create(id=2, user=self.user, name='cash', balance=0)
+        for category, wallet, amount, day in (
+                (self.food, self.cash, '20.00', datetime.date(2016, 7, 10)),
+                (self.food, self.checking, '10.00', datetime.date(2017, 6, 5)),
+                (self.food, self.cash, '30.00', datetime.date(2017, 7, 1)),
+                (self.food, self.cash, '5.00', datetime.date(2017, 7, 31)),
+                (self.rent, self.checking, '900.00', datetime.date(2017, 7, 2)),
+                (self.salary, self.checking, '2000.00', datetime.date(2017, 7, 15)),
+                (self.food, self.checking, '40.00', datetime.date(2017, 8, 20))):
+            balances.post_transaction(user=self.user, category=category, wallet=wallet, amount=D(amount),
+                                      description='', created_time=day)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_rows_mix_rollups_and_partial_months(self):
+        rows = reports.monthly_rows(self.user, datetime.date(2017, 6, 10), datetime.date(2017, 8, 19))
+        total = sum(row[3] for row in rows)
+        # Skips the 2017-06-05 and 2017-08-20 Transactions
+        self.assertEqual(total, D('2935.00'))
+
+        rows = reports.monthly_rows(self.user, datetime.date(2017, 7, 2), datetime.date(2017, 7, 30))
+        self.assertEqual(sum(row[3] for row in rows), D('2900.00'))
+
+    def test_totals_and_comparisons(self):
+        report = reports.SpendingReport(self.user, datetime.date(2017, 6, 1), datetime.date(2017, 8, 31))
+        totals = report.totals()
+        self.assertEqual(totals['spent'], D('985.00'))
+        self.assertEqual(totals['earned'], D('2000.00'))
+        self.assertEqual(totals['last_year_spent'], D('20.00'))
+
+        months = report.by_month()
+        self.assertEqual([row['month'] for row in months],
+                         [datetime.date(2017, 6, 1), datetime.date(2017, 7, 1), datetime.date(2017, 8, 1)])
+        self.assertEqual([row['spent'] for row in months], [D('10.00'), D('935.00'), D('40.00')])
+        self.assertIsNone(months[0]['month_change'])
+        self.assertEqual(months[2]['month_change'], D('-95.7'))
+        self.assertEqual(months[1]['last_year_spent'], D('20.00'))
+        self.assertEqual(months[1]['year_change'], D('4575.0'))
+
+        categories = report.by_category()
+        self.assertEqual([row['name'] for row in categories], ['rent', 'food', 'salary'])
+        self.assertEqual(categories[1]['last_year'], D('20.00'))
+
+        wallets = dict((row['name'], row) for row in report.by_wallet())
+        self.assertEqual(wallets['cash']['spent'], D('35.00'))
+        self.assertEqual(wallets['checking']['net'], D('1050.00'))
+
+    def test_long_reports_run_a_fixed_number_of_queries(self):
+        with self.assertMaxQueries(6):
+            report = reports.SpendingReport(self.user, datetime.date(2012, 8, 15), datetime.date(2017, 8, 14))
+            report.by_month()
+            report.by_category()
+
+    def test_report_page(self):
+        resp = self.client.get(reverse('reports'), {'start': '2017-06-01', 'end': '2017-08-31'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['totals']['spent'], D('985.00'))
+        self.assertContains(resp, 'July, 2017')
+
+    def test_report_page_with_bad_dates(self):
+        resp = self.client.get(reverse('reports'), {'start': 'last week'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('alerts', resp.context)
+
+    def test_report_page_with_out_of_range_dates(self):
+        for dates in ({'start': '0001-01-05'}, {'end': '9999-12-31'}, {'start': '2000-01-01', 'end': '2017-01-01'}):
+            resp = self.client.get(reverse('reports'), dates)
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn('alerts', resp.context)
+            self.assertLessEqual(len(resp.context['months']), 12)
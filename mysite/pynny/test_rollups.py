@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+import datetime
+import decimal
+import io
+
+from .models import BudgetCategory, Wallet, Transaction, MonthlyCategoryTotal
+from .utils import balances, importer, rollups
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.other_wallet = Wallet.objects.create(id=2, user=self.user, name='cash', balance=0)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def post(self, amount, day, wallet=None):
+        return balances.post_transaction(category=self.category, wallet=wallet or self.wallet,
+                                         amount=decimal.Decimal(amount), created_time=day, user=self.user)
+
+    def rollup_values(self):
+        return sorted(MonthlyCategoryTotal.objects.values_list('wallet_id', 'month', 'total', 'count'))
+
+    def test_writes_keep_rollups_current(self):
+        first = self.post('10', datetime.date(2017, 9, 3))
+        self.post('5', datetime.date(2017, 9, 20))
+        second = self.post('7', datetime.date(2017, 10, 1))
+        self.assertEqual(self.rollup_values(), [
+            (1, datetime.date(2017, 9, 1), 15, 2),
+            (1, datetime.date(2017, 10, 1), 7, 1),
+        ])
+
+        balances.update_transaction(first, wallet=self.other_wallet, amount=decimal.Decimal('2'))
+        balances.delete_transaction(second)
+        self.assertEqual(self.rollup_values(), [
+            (1, datetime.date(2017, 9, 1), 5, 1),
+            (1, datetime.date(2017, 10, 1), 0, 0),
+            (2, datetime.date(2017, 9, 1), 2, 1),
+        ])
+        self.assertEqual(rollups.category_total(self.category), 7)
+
+    def test_import_updates_rollups(self):
+        data = io.StringIO('date,amount,category,wallet\n2017-09-01,1,groceries,checking\n'
+                           '2017-09-02,2,groceries,checking\n2017-08-02,4,groceries,cash\n')
+        importer.import_transactions(self.user, data, 'csv')
+        self.assertEqual(self.rollup_values(), [
+            (1, datetime.date(2017, 9, 1), 3, 2),
+            (2, datetime.date(2017, 8, 1), 4, 1),
+        ])
+
+    def test_rebuild(self):
+        self.post('10', datetime.date(2017, 9, 3))
+        Transaction.objects.create(amount=3, category=self.category, wallet=self.wallet, user=self.user,
+                                   created_time=datetime.date(2017, 9, 4))
+        MonthlyCategoryTotal.objects.create(user=self.user, category=self.category, wallet=self.other_wallet,
+                                            month=datetime.date(2010, 1, 1), total=99, count=9)
+
+        call_command('rebuild_rollups', user='test_user', stdout=io.StringIO())
+        self.assertEqual(self.rollup_values(), [(1, datetime.date(2017, 9, 1), 13, 2)])
@@ -0,0 +1,104 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.shortcuts import reverse
+
+import datetime
+
+from .models import BudgetCategory, Wallet, Transaction
+from .utils import balances, search
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.other_user = User.objects.create_user(id=2, username='test_user2', password='123tester')
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='food', is_income=False)
+        self.checking = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.cash = Wallet.objects.create(id=2, user=self.user, name='cash', balance=100)
+        self.groceries = self.add('Grocery store run', 45, datetime.date(2015, 3, 2))
+        self.market = self.add('Farmers market groceries', 12, datetime.date(2017, 8, 1), self.cash)
+        self.rent = self.add('Rent for August', 900, datetime.date(2017, 8, 1))
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def add(self, description, amount, day, wallet=None, user=None):
+        return Transaction.objects.create(user=user or self.user, category=self.category, wallet=wallet or self.checking,
+                                          amount=amount, description=description, created_time=day)
+
+    def find(self, **params):
+        form, matches = search.search_transactions(self.user, params)
+        return set(matches)
+
+    def test_words_match_by_prefix_and_stem(self):
+        self.assertEqual(self.find(q='groceries'), {self.groceries, self.market})
+        self.assertEqual(self.find(q='groc'), {self.groceries, self.market})
+        self.assertEqual(self.find(q='MARKET groceries'), {self.market})
+        self.assertEqual(self.find(q='rent'), {self.rent})
+        self.assertEqual(self.find(q='"; DROP TABLE'), set())
+
+    def test_other_users_are_not_searched(self):
+        other_category = BudgetCategory.objects.create(user=self.other_user, name='food')
+        other_wallet = Wallet.objects.create(user=self.other_user, name='checking')
+        Transaction.objects.create(user=self.other_user, category=other_category, wallet=other_wallet, amount=1,
+                                   description='groceries')
+        self.assertEqual(self.find(q='groceries'), {self.groceries, self.market})
+
+    def test_filters_combine_with_search(self):
+        self.assertEqual(self.find(q='groceries', start='2016-01-01'), {self.market})
+        self.assertEqual(self.find(q='groceries', end='2016-01-01'), {self.groceries})
+        self.assertEqual(self.find(min='40', max='100'), {self.groceries})
+        self.assertEqual(self.find(wallet='2'), {self.market})
+
+    def test_index_follows_writes(self):
+        balances.update_transaction(self.rent, description='Mortgage payment')
+        self.assertEqual(self.find(q='rent'), set())
+        self.assertEqual(len(self.find(q='mortgage')), 1)
+
+        balances.delete_transaction(self.groceries)
+        self.assertEqual(self.find(q='groceries'), {self.market})
+
+        Transaction.objects.bulk_create([Transaction(user=self.user, category=self.category, wallet=self.checking,
+                                                     amount=3, description='Bakery bread')])
+        self.assertEqual(len(self.find(q='bakery')), 1)
+
+    def test_falls_back_to_like_without_an_index(self):
+        search.uninstall(connection)
+        try:
+            self.assertEqual(self.find(q='groceries'), {self.market})
+        finally:
+            search.install(connection, rebuild=True)
+        self.assertEqual(self.find(q='groceries'), {self.groceries, self.market})
+
+    def test_index_lookup_is_remembered(self):
+        if hasattr(connection, 'pynny_has_fts'):
+            del connection.pynny_has_fts
+        with self.assertNumQueries(2):
+            self.find(q='rent')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.find(q='rent'), {self.rent})
+
+    def test_ledger_page_searches(self):
+        resp = self.client.get(reverse('transactions'), {'q': 'groceries', 'wallet': '2'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['transactions'], [self.market])
+        self.assertEqual(resp.context['ledger_query'], 'q=groceries&wallet=2')
+
+    def test_ledger_page_reports_invalid_filters(self):
+        resp = self.client.get(reverse('transactions'), {'q': 'rent', 'start': 'yesterday'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['transactions'], [self.rent])
+        self.assertIn('start', resp.context['alerts']['errors'][0])
+
+    def test_ledger_page_reports_oversized_amounts(self):
+        resp = self.client.get(reverse('transactions'), {'min': '1e30'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('min', resp.context['alerts']['errors'][0])
+
+    def test_no_matches_message(self):
+        resp = self.client.get(reverse('transactions'), {'q': 'zzz'})
+        self.assertContains(resp, 'No Transactions match your search')
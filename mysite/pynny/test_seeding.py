@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.db.models import Count, Sum
+
+import datetime
+import io
+
+from .models import Wallet, Budget, BudgetSequence, Transaction, MonthlyCategoryTotal, DailyWalletBalance
+from .utils import benchmark, seeding
+
+
+class SeedingTests(TestCase):
+    def test_seeded_balances_match_the_transactions(self):
+        user = seeding.seed(transactions=300, months=3, today=datetime.date(2017, 8, 15))[0]
+
+        self.assertEqual(Transaction.objects.filter(user=user).count(), 300)
+        dates = Transaction.objects.filter(user=user).values_list('created_time', flat=True)
+        self.assertGreaterEqual(min(dates), datetime.date(2017, 6, 1))
+        self.assertLessEqual(max(dates), datetime.date(2017, 8, 15))
+
+        # Rollups and the daily history agree with the Transactions
+        totals = MonthlyCategoryTotal.objects.filter(user=user).aggregate(count=Sum('count'), total=Sum('total'))
+        self.assertEqual(totals['count'], 300)
+        self.assertEqual(totals['total'], Transaction.objects.filter(user=user).aggregate(t=Sum('amount'))['t'])
+        for wallet, (name, start) in zip(Wallet.objects.filter(user=user).order_by('id'), seeding.WALLETS):
+            history = DailyWalletBalance.objects.filter(wallet=wallet).aggregate(t=Sum('change'))['t'] or 0
+            self.assertEqual(wallet.balance, start + history)
+
+        # One budget per expense category per month, with ids from the sequence
+        per_month = Budget.objects.filter(user=user).values('month').annotate(n=Count('id'))
+        self.assertEqual(len(per_month), 3)
+        self.assertEqual(BudgetSequence.objects.get(user=user).last_id, Budget.objects.filter(user=user).count())
+
+    def test_same_seed_gives_same_data(self):
+        first = seeding.seed(transactions=50, prefix='a', today=datetime.date(2017, 8, 15))[0]
+        second = seeding.seed(transactions=50, prefix='b', today=datetime.date(2017, 8, 15))[0]
+        rows = lambda user: list(Transaction.objects.filter(user=user).order_by('id')
+                                 .values_list('amount', 'description', 'created_time', 'category__name'))
+        self.assertEqual(rows(first), rows(second))
+
+    def test_command_refuses_existing_users(self):
+        User.objects.create_user(username='seed1', password='tester123')
+        with self.assertRaises(CommandError):
+            call_command('seed_pynny', transactions=10, stdout=io.StringIO())
+
+    def test_command_creates_users(self):
+        call_command('seed_pynny', users=2, transactions=10, prefix='demo', stdout=io.StringIO())
+        self.assertEqual(Transaction.objects.filter(user__username__in=['demo1', 'demo2']).count(), 20)
+
+
+class BenchmarkTests(TestCase):
+    def test_every_page_renders_for_seeded_data(self):
+        results = benchmark.run([20], repeat=1)
+        self.assertIn('transactions', results['20'])
+        for name, measurement in results['20'].items():
+            self.assertLess(measurement['status'], 500, name)
+
+    def test_compare_reports_regressions(self):
+        baseline = {'1000': {'index': {'seconds': 0.1, 'queries': 4}, 'wallets': {'seconds': 0.01, 'queries': 5}}}
+        results = {'1000': {'index': {'seconds': 0.35, 'queries': 4}, 'wallets': {'seconds': 0.04, 'queries': 6},
+                            'budgets': {'seconds': 9, 'queries': 99}}}
+        regressions = benchmark.compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('index at 1000', regressions[0])
+        self.assertIn('wallets at 1000: 6 queries', regressions[1])
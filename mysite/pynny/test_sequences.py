@@ -0,0 +1,49 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+
+import datetime
+
+from .models import Budget, BudgetCategory, BudgetSequence, Wallet
+from .utils import sequences
+
+
+class BudgetSequenceTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.other_user = User.objects.create_user(id=2, username='test_user2', password='123tester')
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+
+    def tearDown(self):
+        self.user.delete()
+        self.other_user.delete()
+
+    def test_ids_are_sequential_per_user(self):
+        self.assertEqual([sequences.next_budget_id(self.user) for i in range(3)], [1, 2, 3])
+        self.assertEqual(sequences.next_budget_id(self.other_user), 1)
+        self.assertEqual(BudgetSequence.objects.get(user=self.user).last_id, 3)
+
+    def test_continues_after_existing_budgets(self):
+        Budget.objects.create(budget_id=41, user=self.user, category=self.category, goal=10,
+                              month=datetime.date(2017, 1, 1), wallet=self.wallet)
+        self.assertEqual(sequences.next_budget_id(self.user), 42)
+
+    def test_allocation_is_constant_time(self):
+        sequences.next_budget_id(self.user)
+        for i in range(20):
+            Budget.objects.create(budget_id=100 + i, user=self.user, category=self.category, goal=10,
+                                  month=datetime.date(2017, 1, 1), wallet=self.wallet)
+        # savepoint, increment, read, release; the Budget table isn't touched
+        with self.assertNumQueries(4):
+            self.assertEqual(sequences.next_budget_id(self.user), 2)
+
+    def test_create_budget_view(self):
+        self.client.login(username='test_user', password='tester123')
+        for category in ('1', str(BudgetCategory.objects.create(user=self.user, name='rent').id)):
+            resp = self.client.post(reverse('budgets'), {'category': category, 'goal': '50', 'wallet': '1'})
+            self.assertEqual(resp.status_code, 201)
+        self.assertEqual(sorted(Budget.objects.filter(user=self.user).values_list('budget_id', flat=True)), [1, 2])
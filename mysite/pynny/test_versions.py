@@ -0,0 +1,94 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.utils.http import http_date
+
+import datetime
+import time
+
+from .models import BudgetCategory, Wallet, Savings, Notification
+from .utils import versions
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_version_increases_on_every_change(self):
+        seen = [versions.current(self.user.id)]
+        for change in (lambda: Savings.objects.create(user=self.user, name='car', goal=10, due_date=datetime.date.today()),
+                       lambda: Notification.objects.create(type='t', title='Hi', body='b', user=self.user),
+                       lambda: self.client.post(reverse('one_wallet', kwargs={'wallet_id': 1}), {'action': 'delete'})):
+            change()
+            seen.append(versions.current(self.user.id))
+        self.assertEqual(seen, sorted(set(seen)))
+
+    def test_other_users_are_unaffected(self):
+        other = User.objects.create_user(username='other_user', password='tester123')
+        before = versions.current(other.id)
+        Wallet.objects.create(user=self.user, name='cash')
+        self.assertEqual(versions.current(other.id), before)
+
+    def test_version_is_not_kept_in_the_cache(self):
+        # Each server process has its own cache, so clearing it stands
+        # in for a request handled by another process
+        before = versions.current(self.user.id)
+        cache.clear()
+        self.assertEqual(versions.current(self.user.id), before)
+        Wallet.objects.create(user=self.user, name='cash')
+        cache.clear()
+        self.assertGreater(versions.current(self.user.id), before)
+
+    def assertNotModified(self, url, **headers):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('private', resp['Cache-Control'])
+        etag = resp['ETag']
+        with self.assertNumQueries(3):
+            # Only the session and user lookups every request makes,
+            # and the user's data version
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        return etag
+
+    def test_pages_not_modified(self):
+        for name in ('index', 'transactions', 'budgets', 'wallets'):
+            self.assertNotModified(reverse(name))
+
+    def test_api_not_modified(self):
+        self.assertNotModified(reverse('api_list', kwargs={'resource': 'wallets'}))
+        self.assertNotModified(reverse('api_detail', kwargs={'resource': 'wallets', 'pk': 1}))
+
+    def test_change_makes_page_stale(self):
+        url = reverse('wallets')
+        etag = self.assertNotModified(url)
+        Wallet.objects.create(user=self.user, name='cash')
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['wallets']), 2)
+
+    def test_new_session_makes_page_stale(self):
+        url = reverse('wallets')
+        etag = self.assertNotModified(url)
+        self.client.logout()
+        self.client.login(username='test_user', password='tester123')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse('budgets')
+        resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(resp.status_code, 304)
+        BudgetCategory.objects.create(user=self.user, name='rent')
+        resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() - 60))
+        self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.shortcuts import reverse
+
+import datetime
+import decimal
+import io
+
+from .models import BudgetCategory, Wallet, DailyWalletBalance
+from .utils import balances, wallet_history
+
+
+class WalletHistoryTests(TestCase):
+    def setUp(self):
+        # Create a user and give them some data to test with
+        self.user = User.objects.create_user(id=1, username='test_user', email='test_user@gmail.com', password='tester123')
+        self.user.save()
+
+        self.category = BudgetCategory.objects.create(id=1, user=self.user, name='groceries', is_income=False)
+        self.income = BudgetCategory.objects.create(id=2, user=self.user, name='paycheck', is_income=True)
+        self.wallet = Wallet.objects.create(id=1, user=self.user, name='checking', balance=100)
+        self.client.login(username='test_user', password='tester123')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def post(self, amount, day, category=None):
+        return balances.post_transaction(amount=decimal.Decimal(amount), category=category or self.category,
+                                         wallet=self.wallet, user=self.user, created_time=day)
+
+    def history(self):
+        return dict(DailyWalletBalance.objects.filter(wallet=self.wallet).values_list('day', 'change'))
+
+    def fresh_wallet(self):
+        return Wallet.objects.get(id=self.wallet.id)
+
+    def test_writes_keep_daily_changes(self):
+        first, second = datetime.date(2017, 1, 1), datetime.date(2017, 1, 2)
+        trans = self.post('10', first)
+        self.post('50', first, self.income)
+        self.post('5', second)
+        self.assertEqual(self.history(), {first: 40, second: -5})
+
+        balances.update_transaction(trans, created_time=second)
+        self.assertEqual(self.history(), {first: 50, second: -15})
+        balances.delete_transaction(trans)
+        self.assertEqual(self.history(), {first: 50, second: -5})
+
+    def test_balance_series(self):
+        self.post('10', datetime.date(2017, 1, 1))
+        self.post('20', datetime.date(2017, 3, 1), self.income)
+        self.assertEqual(wallet_history.balance_series(self.fresh_wallet()),
+                         [(datetime.date(2017, 1, 1), 90), (datetime.date(2017, 3, 1), 110)])
+
+    def test_balance_series_is_thinned(self):
+        start = datetime.date(2015, 1, 1)
+        DailyWalletBalance.objects.bulk_create(
+            DailyWalletBalance(user=self.user, wallet=self.wallet, day=start + datetime.timedelta(days=i), change=1)
+            for i in range(1000))
+        series = wallet_history.balance_series(self.fresh_wallet(), max_points=300)
+        self.assertTrue(len(series) <= 300)
+        self.assertEqual(series[-1], (start + datetime.timedelta(days=999), 100))
+
+    def test_running_balance(self):
+        for amount, day in (('10', datetime.date(2017, 1, 1)), ('20', datetime.date(2017, 1, 2)),
+                            ('5', datetime.date(2017, 1, 2))):
+            self.post(amount, day)
+        ledger = wallet_history.with_running_balance(self.fresh_wallet().transaction_set.all(), self.fresh_wallet())
+        rows = ledger.order_by('-created_time', '-id').values_list('amount', 'running_balance')
+        self.assertEqual([(a, b) for a, b in rows], [(5, 65), (20, 70), (10, 90)])
+
+    def test_one_wallet_shows_running_balance(self):
+        self.post('10', datetime.date(2017, 1, 1))
+        resp = self.client.get(reverse('one_wallet', kwargs={'wallet_id': 1}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['transactions'][0].running_balance, 90)
+        self.assertIn('"y": 90.0', resp.context['balance_history'])
+
+    def test_rebuild_command(self):
+        self.post('10', datetime.date(2017, 1, 1))
+        self.post('50', datetime.date(2017, 1, 1), self.income)
+        DailyWalletBalance.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_wallet_history', stdout=out)
+        self.assertIn('Wrote 1 daily wallet balances', out.getvalue())
+        self.assertEqual(self.history(), {datetime.date(2017, 1, 1): 40})
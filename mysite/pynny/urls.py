@@ -11,7 +11,7 @@ the Pynny web app.
 from django.conf.urls import url, include
 from django.contrib.auth import views as auth_views
 
-from .views import wallet_views, budget_views, category_views, transaction_views, main_views, savings_views, notification_views
+from .views import wallet_views, budget_views, category_views, transaction_views, main_views, savings_views, notification_views, api_views, metrics_views, report_views, job_views
 
 urlpatterns = [
     url(r'^$', main_views.index, name='index'), # /
@@ -30,8 +30,19 @@ urlpatterns = [
     url(r'^transactions/$', transaction_views.transactions, name='transactions'), # /transactions/
     url(r'^transactions/(?P<transaction_id>[0-9]+)$', transaction_views.one_transaction, name='one_transaction'), # /transactions/9
     url(r'^transactions/create/$', transaction_views.new_transaction, name='new_transaction'), # /transactions/create
+    url(r'^transactions/import/$', transaction_views.import_transactions, name='import_transactions'), # /transactions/import
+    url(r'^transactions/export/$', transaction_views.export_transactions, name='export_transactions'), # /transactions/export
     url(r'^budgets/renew/$', budget_views.renew_budgets, name='renew_budgets'),  # /budgets/renew
+    url(r'^reports/$', report_views.spending_report, name='reports'),  # /reports/
     url(r'^savings/$', savings_views.savings, name='savings'),  # /savings/
     url(r'^savings/(?P<savings_id>[0-9]+)$', savings_views.one_saving, name='one_saving'),  # /savings/5
     url(r'^notifications/dismiss/$', notification_views.dismiss_notice, name='dismiss_notice'),
+    url(r'^jobs/(?P<job_id>[0-9]+)$', job_views.job_status, name='job_status'),  # /jobs/12
+    url(r'^api/$', api_views.api_root, name='api_root'),  # /api/
+    url(r'^api/v1/$', api_views.api_root, name='api_v1_root'),  # /api/v1/
+    url(r'^api/v1/batch/$', api_views.batch, name='api_batch'),  # /api/v1/batch/
+    url(r'^api/v1/(?P<resource>[a-z]+)/$', api_views.resource_list, name='api_list'),  # /api/v1/wallets/
+    url(r'^api/v1/(?P<resource>[a-z]+)/(?P<pk>[0-9]+)$', api_views.resource_detail, name='api_detail'),  # /api/v1/wallets/3
+    url(r'^metrics/$', metrics_views.metrics_view, name='metrics'),  # /metrics/
+    url(r'^metrics/slow/$', metrics_views.slow_requests, name='slow_requests'),  # /metrics/slow/
 ]
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+'''
+File: anomalies.py
+Author: Zachary King
+
+Batch detection of unusual spending (see the `detect_anomalies`
+command). Each run looks only at the Transactions added since the
+previous run, recorded as an AnomalyScan, and notifies their users of:
+
+    spending_anomaly  an expense far above what the user usually
+                      spends in that category: more than `threshold`
+                      standard deviations over the category's mean in
+                      the `lookback_days` before it, and at least twice
+                      the mean
+    budget_overrun    a Budget whose balance crossed its goal because
+                      of the new Transactions
+
+Each user is scanned with a handful of grouped queries whatever their
+history holds: the per-category count, sum and sum of squares come from
+the database, and the mean and deviation are derived from those. Users
+are scanned in parallel by a pool of worker processes, which only read;
+the parent writes every Notification with a single `bulk_create`.
+
+The first run has nothing to compare against, so it only records where
+the next run starts. A run claims the Transactions since the previous
+one by recording its AnomalyScan up front, and `since_transaction_id` is
+unique, so when two runs start together only one scans them. A run that
+fails gives its claim back, and one that was killed loses it after
+`CLAIM_TIMEOUT`.
+'''
+
+import decimal
+import logging
+import multiprocessing
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.utils import timezone
+from django.utils.html import format_html
+
+from ..models import AnomalyScan, Budget, BudgetCategory, Notification, Transaction
+from . import notifications
+from .dates import month_bounds
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK_DAYS = 180
+THRESHOLD = 3
+# Categories with fewer past Transactions than this are never flagged
+MIN_HISTORY = 5
+# An unfinished run older than this is taken to have died
+CLAIM_TIMEOUT = timedelta(hours=6)
+
+ZERO = decimal.Decimal('0.00')
+CENTS = decimal.Decimal('0.01')
+
+
+def category_stats(user_id, category_ids, since_id, start):
+    '''Returns `{category_id: (count, mean, deviation)}` for the user's
+    Transactions up to `since_id` recorded on or after `start`'''
+    squares = Sum(F('amount') * F('amount'), output_field=DecimalField(max_digits=40, decimal_places=4))
+    rows = (Transaction.objects.select_related(None).order_by()
+            .filter(user_id=user_id, category_id__in=category_ids, id__lte=since_id, created_time__gte=start)
+            .values('category_id')
+            .annotate(count=Count('id'), total=Sum('amount'), squares=squares)
+            .values_list('category_id', 'count', 'total', 'squares'))
+    stats = {}
+    for category_id, count, total, sum_squares in rows:
+        total, sum_squares = decimal.Decimal(str(total)), decimal.Decimal(str(sum_squares))
+        mean = total / count
+        variance = max(sum_squares / count - mean * mean, ZERO)
+        stats[category_id] = (count, mean, variance.sqrt())
+    return stats
+
+
+def scan_user(job):
+    '''Returns the Notifications (as field dicts) for one user's
+    Transactions with ids in `(since_id, upto_id]`. `job` is the tuple
+    `(user_id, since_id, upto_id, lookback_days, threshold)` so it can be
+    sent to a worker process as is.'''
+    user_id, since_id, upto_id, lookback_days, threshold = job
+    new = list(Transaction.objects.select_related(None).order_by('id')
+               .filter(user_id=user_id, id__gt=since_id, id__lte=upto_id)
+               .values_list('category_id', 'amount', 'description', 'created_time'))
+    expense = dict(BudgetCategory.objects.filter(user_id=user_id, is_income=False).values_list('id', 'name'))
+    new = [row for row in new if row[0] in expense]
+    if not new:
+        return []
+
+    notices = []
+    start = min(row[3] for row in new) - timedelta(days=lookback_days)
+    stats = category_stats(user_id, set(row[0] for row in new), since_id, start)
+    for category_id, amount, description, created_time in new:
+        count, mean, deviation = stats.get(category_id, (0, ZERO, ZERO))
+        if count < MIN_HISTORY or amount < 2 * mean or amount <= mean + threshold * deviation:
+            continue
+        notices.append({
+            'user_id': user_id,
+            'type': 'spending_anomaly',
+            'title': 'Unusual {} spending'.format(expense[category_id]),
+            # Notification bodies are shown as HTML
+            'body': format_html('{} of ${} on {} is well above your usual ${} in {}',
+                description or 'A transaction', amount, created_time.strftime('%b %d, %Y'),
+                mean.quantize(CENTS), expense[category_id]),
+            'alert': 'warning',
+        })
+
+    # Every Budget in a category is charged each Transaction, so a
+    # Budget crossed its goal if it's over now but wasn't without them
+    added = defaultdict(lambda: ZERO)
+    latest = {}
+    for category_id, amount, description, created_time in new:
+        added[category_id] += abs(amount)
+        latest[category_id] = max(latest.get(category_id, created_time), created_time)
+    budgets = (Budget.objects.select_related(None).order_by()
+               .filter(user_id=user_id, category_id__in=list(added))
+               .values_list('category_id', 'goal', 'balance', 'month'))
+    for category_id, goal, balance, month in budgets:
+        if month_bounds(month)[0] != month_bounds(latest[category_id])[0]:
+            continue
+        if balance - added[category_id] < goal <= balance:
+            notices.append({
+                'user_id': user_id,
+                'type': 'budget_overrun',
+                'title': '{} budget exceeded'.format(expense[category_id]),
+                'body': format_html('You have spent ${} of your ${} {} budget for {}',
+                    balance, goal, expense[category_id], month.strftime('%B %Y')),
+                'alert': 'danger',
+            })
+    return notices
+
+
+def _scan_all(jobs, processes):
+    if processes <= 1 or len(jobs) <= 1:
+        return [scan_user(job) for job in jobs]
+    # Forked workers must open their own database connections
+    connections.close_all()
+    pool = multiprocessing.get_context('fork').Pool(processes)
+    try:
+        return list(pool.imap_unordered(scan_user, jobs, chunksize=max(len(jobs) // (processes * 4), 1)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _claim(since_id, upto_id):
+    '''Records a new AnomalyScan of the Transactions after `since_id`,
+    up to `upto_id`. Returns None if another run has claimed them.'''
+    try:
+        with transaction.atomic():
+            return AnomalyScan.objects.create(since_transaction_id=since_id, last_transaction_id=upto_id)
+    except IntegrityError:
+        pass
+    # Take the claim over if the run that holds it died
+    now = timezone.now()
+    taken = (AnomalyScan.objects
+             .filter(since_transaction_id=since_id, finished_at__isnull=True, started_at__lt=now - CLAIM_TIMEOUT)
+             .update(started_at=now, last_transaction_id=upto_id, users=0, notifications=0))
+    if taken:
+        return AnomalyScan.objects.get(since_transaction_id=since_id)
+    return None
+
+
+def run(processes=None, lookback_days=LOOKBACK_DAYS, threshold=THRESHOLD):
+    '''Scans the Transactions added since the last run and creates
+    their Notifications. `processes` defaults to the number of CPUs.
+    Returns the finished AnomalyScan, which is left unsaved if there was
+    nothing new or another run is already scanning it.'''
+    processes = processes or multiprocessing.cpu_count()
+    threshold = decimal.Decimal(str(threshold))
+    previous = AnomalyScan.objects.filter(finished_at__isnull=False).order_by('-last_transaction_id').first()
+    upto_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+
+    if previous is None:
+        scan = AnomalyScan.objects.create(last_transaction_id=upto_id)
+    else:
+        since_id = previous.last_transaction_id
+        scan = _claim(since_id, upto_id) if upto_id > since_id else None
+        if scan is None:
+            if upto_id > since_id:
+                logger.info('Transactions after #%s are already being scanned', since_id)
+            return AnomalyScan(since_transaction_id=since_id, last_transaction_id=since_id,
+                               finished_at=timezone.now())
+        try:
+            user_ids = (Transaction.objects.select_related(None).order_by()
+                        .filter(id__gt=since_id, id__lte=upto_id).values_list('user_id', flat=True).distinct())
+            jobs = [(user_id, since_id, upto_id, lookback_days, threshold) for user_id in user_ids]
+            created = notifications.create_many(
+                Notification(**fields) for notices in _scan_all(jobs, processes) for fields in notices)
+        except Exception:
+            # Let the next run scan these Transactions
+            scan.delete()
+            raise
+        scan.users = len(jobs)
+        scan.notifications = len(created)
+
+    scan.finished_at = timezone.now()
+    scan.save()
+    return scan
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+'''
+File: api.py
+Author: Zachary King
+
+Resource definitions for the Pynny JSON API (see `views/api_views.py`).
+
+Each Resource names the fields it exposes, how incoming values are
+parsed, and how rows are created, updated and deleted, so Transactions
+and Budgets keep going through the same balance, rollup and budget_id
+helpers as the HTML views. Lists are paged by id and read with
+`values()`, fetching only the columns in the requested `fields`.
+'''
+
+from datetime import datetime
+
+from django.db import transaction as db_transaction
+
+from ..models import Wallet, BudgetCategory, Budget, Transaction, Savings, Notification
+from . import balances, rollups, sequences, versions
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 500
+
+
+class ApiError(Exception):
+    '''An error reported to the API client with an HTTP `status`'''
+
+    def __init__(self, message, status=400):
+        super(ApiError, self).__init__(message)
+        self.status = status
+
+
+def parse_decimal(value, user):
+    try:
+        return balances.parse_amount(value)
+    except ValueError as e:
+        raise ApiError(str(e))
+
+
+def parse_date(value, user):
+    # None of the API's date fields are nullable
+    if value is None:
+        raise ApiError('Expected a date, got null')
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise ApiError('Invalid date {!r}, expected YYYY-MM-DD'.format(value))
+
+
+def parse_bool(value, user):
+    if not isinstance(value, bool):
+        raise ApiError('Expected true or false, got {!r}'.format(value))
+    return value
+
+
+def parse_text(max_length):
+    def parse(value, user):
+        if not isinstance(value, str) or len(value) > max_length:
+            raise ApiError('Expected text of at most {} characters'.format(max_length))
+        return value
+    return parse
+
+
+def parse_owned(model):
+    '''Returns a parser that resolves an id to one of the user's `model` rows'''
+    def parse(value, user):
+        try:
+            return model.objects.select_related(None).get(id=int(value), user=user)
+        except (TypeError, ValueError, model.DoesNotExist):
+            raise ApiError('No {} with id {!r}'.format(model._meta.verbose_name, value))
+    return parse
+
+
+class Resource(object):
+    '''A model exposed through the API. `fields` maps each field name
+    clients see to the model attribute it reads, `writable` maps the
+    fields clients may set to their parsers and `required` lists the
+    fields a create must include.'''
+    model = None
+    fields = {}
+    writable = {}
+    required = ()
+
+    def queryset(self, user):
+        return self.model.objects.select_related(None).filter(user=user)
+
+    def columns(self, names=None):
+        '''Returns the `(name, attribute)` pairs to serialize. Raises
+        ApiError if `names` includes a field that doesn't exist.'''
+        if not names:
+            return sorted(self.fields.items())
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise ApiError('Unknown fields: {}'.format(', '.join(sorted(unknown))))
+        return [(name, self.fields[name]) for name in names]
+
+    def serialize(self, obj, columns):
+        return dict((name, getattr(obj, attribute)) for name, attribute in columns)
+
+    def page(self, user, columns, cursor=None, limit=PAGE_SIZE):
+        '''Returns `(rows, next_cursor)` for one page of the user's rows,
+        in id order, starting after the id in `cursor`'''
+        queryset = self.queryset(user).order_by('id')
+        if cursor:
+            try:
+                queryset = queryset.filter(id__gt=int(cursor))
+            except ValueError:
+                raise ApiError('Invalid cursor')
+        attributes = set(attribute for name, attribute in columns) | {'id'}
+        rows = list(queryset.values(*attributes)[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1]['id'])
+        return [dict((name, row[attribute]) for name, attribute in columns) for row in rows], next_cursor
+
+    def get(self, user, pk):
+        try:
+            return self.queryset(user).get(id=pk)
+        except (ValueError, TypeError, self.model.DoesNotExist):
+            raise ApiError('Not found', 404)
+
+    def parse(self, user, data, creating=False):
+        '''Returns the parsed model values from a client's `data`'''
+        if not isinstance(data, dict):
+            raise ApiError('Expected a JSON object')
+        unknown = set(data) - set(self.writable)
+        if unknown:
+            raise ApiError('Fields can\'t be set: {}'.format(', '.join(sorted(unknown))))
+        if creating:
+            missing = set(self.required) - set(data)
+            if missing:
+                raise ApiError('Missing fields: {}'.format(', '.join(sorted(missing))))
+        return dict((name, self.writable[name](value, user)) for name, value in data.items())
+
+    def create(self, user, values):
+        return self.model.objects.create(user=user, **values)
+
+    def update(self, obj, values):
+        for name, value in values.items():
+            setattr(obj, name, value)
+        obj.save()
+        return obj
+
+    def delete(self, obj):
+        obj.delete()
+        versions.bump(obj.user_id)
+
+
+class WalletResource(Resource):
+    model = Wallet
+    fields = {'id': 'id', 'name': 'name', 'balance': 'balance', 'created_time': 'created_time'}
+    writable = {'name': parse_text(60), 'balance': parse_decimal}
+    required = ('name',)
+
+
+class CategoryResource(Resource):
+    model = BudgetCategory
+    fields = {'id': 'id', 'name': 'name', 'is_income': 'is_income'}
+    writable = {'name': parse_text(60), 'is_income': parse_bool}
+    required = ('name',)
+
+
+class BudgetResource(Resource):
+    model = Budget
+    fields = {'id': 'id', 'budget_id': 'budget_id', 'category': 'category_id', 'wallet': 'wallet_id',
+              'goal': 'goal', 'balance': 'balance', 'month': 'month'}
+    writable = {'category': parse_owned(BudgetCategory), 'wallet': parse_owned(Wallet),
+                'goal': parse_decimal, 'month': parse_date}
+    required = ('category', 'wallet', 'goal')
+
+    def create(self, user, values):
+        # Budgets start from their category's spending, like the Budgets page
+        values.setdefault('balance', rollups.category_total(values['category']))
+        with db_transaction.atomic():
+            return Budget.objects.create(user=user, budget_id=sequences.next_budget_id(user), **values)
+
+    def update(self, obj, values):
+        # The balance tracks the category, so it moves with it
+        if 'category' in values and values['category'].id != obj.category_id:
+            values['balance'] = rollups.category_total(values['category'])
+        return super(BudgetResource, self).update(obj, values)
+
+
+class TransactionResource(Resource):
+    model = Transaction
+    fields = {'id': 'id', 'amount': 'amount', 'category': 'category_id', 'wallet': 'wallet_id',
+              'description': 'description', 'created_time': 'created_time'}
+    writable = {'amount': parse_decimal, 'category': parse_owned(BudgetCategory), 'wallet': parse_owned(Wallet),
+                'description': parse_text(150), 'created_time': parse_date}
+    required = ('amount', 'category', 'wallet')
+
+    def create(self, user, values):
+        return balances.post_transaction(user=user, **values)
+
+    def update(self, obj, values):
+        return balances.update_transaction(obj, **values)
+
+    def delete(self, obj):
+        balances.delete_transaction(obj)
+
+
+class SavingsResource(Resource):
+    model = Savings
+    fields = {'id': 'id', 'name': 'name', 'goal': 'goal', 'balance': 'balance', 'due_date': 'due_date',
+              'completed': 'completed', 'hidden': 'hidden', 'notify_on_completion': 'notify_on_completion',
+              'delete_on_completion': 'delete_on_completion', 'created_time': 'created_time'}
+    writable = {'name': parse_text(100), 'goal': parse_decimal, 'due_date': parse_date, 'hidden': parse_bool,
+                'notify_on_completion': parse_bool, 'delete_on_completion': parse_bool}
+    required = ('name', 'goal', 'due_date')
+
+
+class NotificationResource(Resource):
+    model = Notification
+    fields = {'id': 'id', 'type': 'type', 'title': 'title', 'body': 'body', 'alert': 'alert',
+              'dismissed': 'dismissed', 'created_time': 'created_time'}
+    writable = {'dismissed': parse_bool}
+
+    def create(self, user, values):
+        raise ApiError('Notifications can\'t be created', 405)
+
+
+RESOURCES = {
+    'wallets': WalletResource(),
+    'categories': CategoryResource(),
+    'budgets': BudgetResource(),
+    'transactions': TransactionResource(),
+    'savings': SavingsResource(),
+    'notifications': NotificationResource(),
+}
+
+
+def resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise ApiError('Unknown resource {!r}'.format(name), 404)
+
+
+def run_batch(user, operations):
+    '''Applies a list of create, update and delete operations in one
+    database transaction and returns their results. If any operation
+    fails nothing is saved, and the ApiError says which one.'''
+    if not isinstance(operations, list):
+        raise ApiError('Expected a list of operations')
+    if len(operations) > MAX_BATCH_SIZE:
+        raise ApiError('A batch may hold at most {} operations'.format(MAX_BATCH_SIZE))
+
+    results = []
+    with db_transaction.atomic():
+        for index, operation in enumerate(operations):
+            try:
+                results.append(apply_operation(user, operation))
+            except ApiError as e:
+                raise ApiError('Operation {}: {}'.format(index, e), e.status)
+    return results
+
+
+def apply_operation(user, operation):
+    '''Applies one batch operation and returns its result'''
+    if not isinstance(operation, dict):
+        raise ApiError('Expected a JSON object')
+    res = resource(operation.get('resource'))
+    method = operation.get('method')
+    if method == 'create':
+        obj = res.create(user, res.parse(user, operation.get('data'), creating=True))
+        return res.serialize(obj, res.columns())
+    if method in ('update', 'delete'):
+        obj = res.get(user, operation.get('id'))
+        if method == 'delete':
+            pk = obj.id
+            res.delete(obj)
+            return {'id': pk, 'deleted': True}
+        obj = res.update(obj, res.parse(user, operation.get('data')))
+        return res.serialize(obj, res.columns())
+    raise ApiError('Unknown method {!r}'.format(method))
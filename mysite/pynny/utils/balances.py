@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+'''
+File: balances.py
+Author: Zachary King
+
+Posts Transactions to Wallet and Budget balances.
+
+Balances are changed with `F()` expressions, so the database applies
+each delta to the current value instead of Python writing back a value
+it read earlier, and every budget in a category is updated by a single
+UPDATE. Each operation runs inside `transaction.atomic`, so a Transaction
+row, the balances it affects, its monthly rollup and its wallet's daily
+balance history are always written together.
+
+Edits apply the net difference between the old and new Transaction, so
+rows whose balance doesn't change aren't written at all.
+'''
+
+import decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from ..models import Transaction, Wallet, Budget
+from . import rollups, versions, wallet_history
+from .dates import month_bounds
+
+CENTS = decimal.Decimal('0.01')
+MAX_AMOUNT = decimal.Decimal(10) ** 18
+
+_AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+
+
+def parse_amount(value):
+    '''Parses a form value into an exact `Decimal` rounded to cents.
+    Raises ValueError if `value` is not a finite number that fits
+    in an amount column.'''
+    try:
+        amount = decimal.Decimal(str(value).strip())
+    except decimal.InvalidOperation:
+        raise ValueError('Invalid amount: {!r}'.format(value))
+    # Amounts are stored with 20 digits, 2 of them cents
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        raise ValueError('Invalid amount: {!r}'.format(value))
+    return amount.quantize(CENTS, rounding=decimal.ROUND_HALF_UP)
+
+
+def wallet_delta(category, amount):
+    '''Returns how much a Transaction of `amount` in `category`
+    changes its wallet's balance'''
+    return amount if category.is_income else -amount
+
+
+def adjust_wallet(wallet_id, change):
+    '''Adds `change` to a Wallet's balance with a single UPDATE'''
+    if change:
+        Wallet.objects.filter(id=wallet_id).update(balance=F('balance') + change)
+
+
+def adjust_budgets(category_id, change):
+    '''Adds `change` to the balance of every Budget in a
+    category with a single UPDATE'''
+    if change:
+        Budget.objects.filter(category_id=category_id).update(balance=F('balance') + change)
+
+
+def apply_balance_deltas(wallet_id, category_id, wallet_change, budget_change):
+    '''Adds `wallet_change` to one Wallet and `budget_change` to every
+    Budget in a category, with one UPDATE statement per table'''
+    adjust_wallet(wallet_id, wallet_change)
+    adjust_budgets(category_id, budget_change)
+
+
+def _apply(trans, sign):
+    '''Adds (`sign=1`) or removes (`sign=-1`) the effects of `trans`
+    on its wallet, budgets, monthly rollup and balance history'''
+    change = wallet_delta(trans.category, trans.amount)
+    apply_balance_deltas(trans.wallet_id, trans.category_id, sign * change, sign * abs(trans.amount))
+    if sign > 0:
+        rollups.add_transaction(trans)
+    else:
+        rollups.remove_transaction(trans)
+    wallet_history.record(trans.user_id, trans.wallet_id, trans.created_time, sign * change)
+
+
+def post_transaction(**fields):
+    '''Creates a Transaction from `fields` and applies it to its
+    wallet and budgets. Returns the new Transaction.'''
+    with db_transaction.atomic():
+        trans = Transaction.objects.create(**fields)
+        _apply(trans, 1)
+    return trans
+
+
+def _lock(trans):
+    '''Re-reads `trans` with its row locked, so concurrent edits
+    and deletes reverse the stored amount exactly once'''
+    return Transaction.objects.select_related(None).select_for_update().get(id=trans.id)
+
+
+def delete_transaction(trans):
+    '''Reverts the effects of `trans` on its wallet and budgets and deletes it'''
+    with db_transaction.atomic():
+        trans = _lock(trans)
+        _apply(trans, -1)
+        trans.delete()
+        versions.bump(trans.user_id)
+
+
+def _merge(*changes):
+    '''Sums `(key, change)` pairs per key, dropping keys whose changes cancel out'''
+    merged = {}
+    for key, change in changes:
+        merged[key] = merged.get(key, 0) + change
+    return dict((key, change) for key, change in merged.items() if change)
+
+
+def adjust_wallets(changes):
+    '''Adds each `{wallet_id: change}` to its Wallet's balance
+    with a single UPDATE'''
+    if len(changes) == 1:
+        adjust_wallet(*list(changes.items())[0])
+    elif changes:
+        Wallet.objects.filter(id__in=list(changes)).update(balance=F('balance') + Case(
+            *[When(id=wallet_id, then=Value(change)) for wallet_id, change in changes.items()],
+            output_field=_AMOUNT))
+
+
+def adjust_category_budgets(changes):
+    '''Adds each `{category_id: change}` to the balance of every
+    Budget in the category with a single UPDATE'''
+    if len(changes) == 1:
+        adjust_budgets(*list(changes.items())[0])
+    elif changes:
+        Budget.objects.filter(category_id__in=list(changes)).update(balance=F('balance') + Case(
+            *[When(category_id=category_id, then=Value(change)) for category_id, change in changes.items()],
+            output_field=_AMOUNT))
+
+
+def _changed_fields(trans, fields):
+    '''Returns the names of the `fields` whose values differ from `trans`'s'''
+    changed = []
+    for name, value in fields.items():
+        field = Transaction._meta.get_field(name)
+        if field.is_relation:
+            old, value = getattr(trans, field.attname), getattr(value, 'pk', value)
+        else:
+            old = getattr(trans, name)
+        if old != value:
+            changed.append(name)
+    return changed
+
+
+def update_transaction(trans, **fields):
+    '''Updates `trans` with `fields` and applies the difference between
+    its old and new versions to the wallets, budgets, monthly rollups and
+    balance history. Only rows whose balance changes are written, with
+    one UPDATE per table, so editing just the description costs a single
+    UPDATE. Returns the updated Transaction.'''
+    with db_transaction.atomic():
+        trans = _lock(trans)
+        changed = _changed_fields(trans, fields)
+        if not changed:
+            return trans
+        if not set(changed) & {'amount', 'category', 'wallet', 'created_time'}:
+            for name in changed:
+                setattr(trans, name, fields[name])
+            trans.save(update_fields=changed)
+            return trans
+
+        old_category, old_wallet_id = trans.category, trans.wallet_id
+        old_amount, old_day = trans.amount, trans.created_time
+        old_change = wallet_delta(old_category, old_amount)
+        for name in changed:
+            setattr(trans, name, fields[name])
+        trans.save(update_fields=changed)
+        new_change = wallet_delta(trans.category, trans.amount)
+
+        adjust_wallets(_merge((old_wallet_id, -old_change), (trans.wallet_id, new_change)))
+        adjust_category_budgets(_merge((old_category.id, -abs(old_amount)), (trans.category_id, abs(trans.amount))))
+        old_rollup = (old_category.id, old_wallet_id, month_bounds(old_day)[0])
+        new_rollup = (trans.category_id, trans.wallet_id, month_bounds(trans.created_time)[0])
+        if old_rollup != new_rollup:
+            rollups.record(trans.user_id, *old_rollup, amount=-old_amount, count=-1)
+            rollups.record(trans.user_id, *new_rollup, amount=trans.amount, count=1)
+        elif trans.amount != old_amount:
+            rollups.record(trans.user_id, *new_rollup, amount=trans.amount - old_amount, count=0)
+        for (wallet_id, day), change in _merge(((old_wallet_id, old_day), -old_change),
+                                               ((trans.wallet_id, trans.created_time), new_change)).items():
+            wallet_history.record(trans.user_id, wallet_id, day, change)
+    return trans
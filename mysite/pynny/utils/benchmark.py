@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+'''
+File: benchmark.py
+Author: Zachary King
+
+Times every page in `pynny/urls.py` against synthetic data (see
+`utils/seeding.py`) at several data sizes, and compares the results
+with a stored baseline so views that get slower or run more queries as
+the data grows are caught before they are deployed.
+
+Each scale gets its own seeded user with that many Transactions. Every
+URL is requested once to warm caches and then `repeat` times; the
+median wall time and the query count of the last request are kept.
+'''
+
+import json
+import statistics
+import time
+
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Wallet, BudgetCategory, Budget, Transaction, Savings
+from .. import urls
+from . import seeding
+
+# Pages that change state on GET, have no GET view yet or are staff only
+SKIP = ('logout', 'renew_budgets', 'one_saving', 'metrics', 'slow_requests', 'job_status')
+
+# Time regressions below this many seconds are treated as noise
+MIN_SECONDS = 0.05
+
+
+def url_arguments(user):
+    '''Returns values for the URL parameters of `pynny/urls.py`,
+    naming rows that belong to `user`'''
+    transaction_id = Transaction.objects.filter(user=user).values_list('id', flat=True).first()
+    return {
+        'wallet_id': Wallet.objects.filter(user=user).values_list('id', flat=True).first(),
+        'budget_id': Budget.objects.filter(user=user).values_list('id', flat=True).first(),
+        'category_id': BudgetCategory.objects.filter(user=user).values_list('id', flat=True).first(),
+        'transaction_id': transaction_id,
+        'savings_id': Savings.objects.filter(user=user).values_list('id', flat=True).first(),
+        'resource': 'transactions',
+        'pk': transaction_id,
+    }
+
+
+def pages(user):
+    '''Returns `[(url_name, url)]` for every named page in `pynny/urls.py`'''
+    arguments = url_arguments(user)
+    result = []
+    for pattern in urls.urlpatterns:
+        if not pattern.name or pattern.name in SKIP:
+            continue
+        kwargs = dict((name, arguments[name]) for name in pattern.regex.groupindex)
+        result.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+    return result
+
+
+def measure(client, url, repeat=5):
+    '''Returns `{'status', 'seconds', 'queries'}` for GETs of `url`'''
+    client.get(url)
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - start)
+    return {'status': response.status_code, 'seconds': statistics.median(timings), 'queries': len(queries)}
+
+
+def run(scales, repeat=5, months=12, random_seed=0, log=None):
+    '''Seeds a user per scale and measures every page for each.
+    Returns `{scale: {url_name: measurement}}`, with string scales.'''
+    results = {}
+    for scale in scales:
+        user = seeding.seed(transactions=scale, months=months, prefix='bench{}_'.format(scale),
+                            random_seed=random_seed)[0]
+        client = Client()
+        client.force_login(user)
+        results[str(scale)] = {}
+        for name, url in pages(user):
+            results[str(scale)][name] = measure(client, url, repeat)
+            if log:
+                log('{:>9} {:<22} {status} {seconds:8.4f}s {queries:4} queries'.format(
+                    scale, name, **results[str(scale)][name]))
+    return results
+
+
+def compare(results, baseline, tolerance=2.0, min_seconds=MIN_SECONDS):
+    '''Returns a description of every regression from `baseline`: a
+    page that runs more queries, or takes over `tolerance` times as
+    long (and at least `min_seconds` longer), at the same scale'''
+    regressions = []
+    for scale, measurements in sorted(results.items(), key=lambda item: int(item[0])):
+        for name, current in sorted(measurements.items()):
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append('{} at {}: {} queries, baseline {}'.format(
+                    name, scale, current['queries'], previous['queries']))
+            limit = max(previous['seconds'] * tolerance, previous['seconds'] + min_seconds)
+            if current['seconds'] > limit:
+                regressions.append('{} at {}: {:.4f}s, baseline {:.4f}s'.format(
+                    name, scale, current['seconds'], previous['seconds']))
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+'''
+File: context.py
+Author: Zachary King
+
+Builds the datasets the Pynny pages share (the user's budgets,
+categories, wallets and savings) once per request.
+
+`user_data(request)` returns the request's `UserData`. Each dataset is
+a queryset created on first access and then reused for the rest of the
+request, so a view that checks `categories` and then renders a template
+that lists them runs one query, and a dataset the template never touches
+is never queried at all.
+'''
+
+from datetime import date
+
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from ..models import Budget, BudgetCategory, Wallet, Savings
+from . import forecasts
+from .dates import previous_month
+
+# The datasets each group of pages displays
+BUDGET_PAGES = ('budgets', 'budget_forecasts', 'last_month_budgets', 'categories', 'wallets')
+TRANSACTION_PAGES = ('categories', 'wallets')
+WALLET_PAGES = ('wallets',)
+CATEGORY_PAGES = ('categories',)
+SAVINGS_PAGES = ('savings',)
+
+
+class UserData(object):
+    '''Lazily built datasets for one user, for the duration of a request'''
+
+    def __init__(self, user, today=None):
+        self.user = user
+        self.today = today or date.today()
+
+    @cached_property
+    def budgets(self):
+        '''This month's Budgets, with what their forecasts need'''
+        return forecasts.with_forecast(Budget.objects.for_user(self.user).for_month(self.today), self.today)
+
+    @cached_property
+    def budget_forecasts(self):
+        '''Month-end projections of this month's Budgets, by Budget id'''
+        # Only projected (and the Budgets queried) if the page shows them
+        return SimpleLazyObject(lambda: forecasts.project(self.budgets, self.today))
+
+    @cached_property
+    def last_month_budgets(self):
+        '''Last month's Budgets, which can be renewed'''
+        return Budget.objects.for_user(self.user).for_month(previous_month(self.today))
+
+    @cached_property
+    def categories(self):
+        return BudgetCategory.objects.filter(user=self.user)
+
+    @cached_property
+    def wallets(self):
+        return Wallet.objects.filter(user=self.user)
+
+    @cached_property
+    def savings(self):
+        return Savings.objects.filter(user=self.user)
+
+    def context(self, names, **extra):
+        '''Returns a template context holding the datasets in `names`
+        plus any `extra` values'''
+        data = dict((name, getattr(self, name)) for name in names)
+        data.update(extra)
+        return data
+
+
+def user_data(request):
+    '''Returns the UserData for `request`, creating it on first use'''
+    try:
+        return request.pynny_data
+    except AttributeError:
+        request.pynny_data = UserData(request.user)
+        return request.pynny_data
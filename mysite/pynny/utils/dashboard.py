@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+'''
+File: dashboard.py
+Author: Zachary King
+
+Builds and caches everything shown on a user's dashboard: this
+month's Budgets with their forecasts, and the chart data.
+
+Each user's dashboard is stored in Django's cache under a key made of
+the user's data version (see `utils.versions`) and the day. The version
+is kept in the database and bumped whenever the user's data changes, so
+no server process reads a stale dashboard. Stale entries are never read
+again and expire after `PYNNY_DASHBOARD_CACHE_TIMEOUT` seconds.
+'''
+
+import random
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Budget, BudgetCategory
+from . import forecasts, versions
+from .dates import month_bounds
+
+CACHE_TIMEOUT = getattr(settings, 'PYNNY_DASHBOARD_CACHE_TIMEOUT', 300)
+COLORS = ['#ff4444', '#ffbb33', '#00C851', '#33b5e5', '#aa66cc', '#a1887f']
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _payload_key(user_id, version, day):
+    # Forecasts change with the day, not just the month
+    return 'pynny:dashboard:{}:{}:{}'.format(user_id, version, day.isoformat())
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    '''Returns the dashboard cache's hit and miss counts for this process'''
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def build_payload(user, day):
+    '''Computes the dashboard for `user` on `day`'''
+    colors = list(COLORS)
+    random.shuffle(colors)
+    color_index = 0
+    budgets = list(forecasts.with_forecast(Budget.objects.for_user(user).for_month(day), day))
+    payload = {
+        'budgets': budgets,
+        'budget_forecasts': forecasts.project(budgets, day),
+        'current_month': day.strftime('%B, %Y'),
+        'budget_categories': [],
+        'budget_colors': [],
+        'budget_goal_data': [],
+        'budget_balance_data': [],
+        'transactions_per_category_data': [],
+        'transactions_per_category_colors': [],
+        'transactions_per_category_labels': [],
+        'transactions_per_category_totals': [],
+    }
+
+    for budget in budgets:
+        payload['budget_categories'].append(budget.category.name)
+        payload['budget_goal_data'].append(budget.goal)
+        payload['budget_balance_data'].append(budget.balance)
+        payload['budget_colors'].append(colors[color_index])
+        color_index = (color_index + 1) % len(colors)
+
+    # Count and total every category's transactions in one grouped query
+    random.shuffle(colors)
+    month_start, next_month_start = month_bounds(day)
+    categories = BudgetCategory.objects.filter(user=user).with_transaction_totals(month_start, next_month_start)
+    for category in categories:
+        payload['transactions_per_category_labels'].append(category.name)
+        payload['transactions_per_category_data'].append(category.transaction_count)
+        payload['transactions_per_category_totals'].append(category.period_total)
+        payload['transactions_per_category_colors'].append(colors[color_index])
+        color_index = (color_index + 1) % len(colors)
+
+    return payload
+
+
+def dashboard_payload(user, day=None, version=None):
+    '''Returns the dashboard context for `user`, from the cache if
+    possible. Pass the user's data `version` if it's already known.'''
+    day = day or date.today()
+    if version is None:
+        version = versions.current(user.id)
+    key = _payload_key(user.id, version, day)
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+    _count('misses')
+    payload = build_payload(user, day)
+    cache.set(key, payload, CACHE_TIMEOUT)
+    return payload
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+'''
+File: dates.py
+Author: Zachary King
+
+Date helpers shared by the Pynny views.
+'''
+
+from datetime import date, timedelta
+
+
+def month_bounds(day):
+    '''Returns `(first, next_first)`: the first day of the month
+    containing `day` and the first day of the following month.
+    Use as a half-open range, `first <= d < next_first`.'''
+    first = date(day.year, day.month, 1)
+    if day.month == 12:
+        next_first = date(day.year + 1, 1, 1)
+    else:
+        next_first = date(day.year, day.month + 1, 1)
+    return first, next_first
+
+
+def previous_month(day):
+    '''Returns the first day of the month before the one containing `day`'''
+    first, _ = month_bounds(day)
+    return month_bounds(first - timedelta(days=1))[0]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+'''
+File: exporter.py
+Author: Zachary King
+
+Streams a user's Pynny data out as CSV or NDJSON (one JSON
+object per line). Rows are read with `values_list(...).iterator()`,
+so no model instances are built and the whole result set is never
+held in memory.
+'''
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import Transaction, Budget, Wallet, Savings
+
+FORMATS = ('csv', 'ndjson')
+
+# model, exported columns, field filtered by the date range,
+# field filtered by the wallet
+EXPORTS = {
+    'transactions': (
+        Transaction,
+        ('id', 'created_time', 'amount', 'category__name', 'category__is_income', 'wallet__name', 'description'),
+        'created_time',
+        'wallet_id',
+    ),
+    'budgets': (
+        Budget,
+        ('id', 'budget_id', 'month', 'category__name', 'wallet__name', 'goal', 'balance'),
+        'month',
+        'wallet_id',
+    ),
+    'wallets': (
+        Wallet,
+        ('id', 'name', 'balance', 'created_time'),
+        None,
+        'id',
+    ),
+    'savings': (
+        Savings,
+        ('id', 'name', 'goal', 'balance', 'due_date', 'completed', 'created_time'),
+        'due_date',
+        None,
+    ),
+}
+
+
+class _Echo(object):
+    '''File-like object that returns what is written to it,
+    so `csv.writer` can format one line at a time'''
+
+    def write(self, value):
+        return value
+
+
+def export_rows(user, kind='transactions', start=None, end=None, wallet_id=None):
+    '''Returns `(columns, rows)` for `user`'s data of `kind`, where `rows`
+    iterates over value tuples. `start` and `end` are inclusive dates and
+    `wallet_id` limits the rows to one Wallet, where those apply to `kind`.'''
+    model, columns, date_field, wallet_field = EXPORTS[kind]
+    queryset = model.objects.filter(user=user)
+    if date_field is not None:
+        if start is not None:
+            queryset = queryset.filter(**{date_field + '__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{date_field + '__lte': end})
+    if wallet_field is not None and wallet_id is not None:
+        queryset = queryset.filter(**{wallet_field: wallet_id})
+    rows = queryset.order_by('id').values_list(*columns).iterator()
+    return [column.replace('__', '_') for column in columns], rows
+
+
+def csv_lines(columns, rows):
+    '''Yields the header and each row as a line of CSV'''
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns, rows):
+    '''Yields each row as a line holding one JSON object'''
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def export_lines(file_format, columns, rows):
+    '''Returns an iterator over the lines of the export in `file_format`'''
+    if file_format == 'ndjson':
+        return ndjson_lines(columns, rows)
+    return csv_lines(columns, rows)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+'''
+File: forecasts.py
+Author: Zachary King
+
+Projects where each of this month's Budgets will end the month, so
+overruns show up while there is still time to avoid them.
+
+A Budget's projected balance is its current balance plus what is
+expected to be spent (or earned) in the rest of the month: the average
+of the spend rate so far this month carried to month end, and what the
+user usually spends in the category after this day of the month, over
+the last `HISTORY_MONTHS` months they have Transactions in.
+
+`with_forecast` annotates a Budget queryset with everything a projection
+needs, so all of a user's Budgets are projected from the one query that
+lists them: this month's spending comes from the MonthlyCategoryTotal
+rollups, which every posted Transaction updates in place, and the
+previous months' curves from date ranges over the `(category,
+created_time)` index.
+`project` then works out every projection in Python without querying.
+'''
+
+import decimal
+from datetime import date, timedelta
+
+from django.db.models import DateField, DecimalField, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import MonthlyCategoryTotal, Transaction
+from .dates import month_bounds, previous_month
+
+HISTORY_MONTHS = 3
+
+ZERO = decimal.Decimal('0.00')
+CENTS = decimal.Decimal('0.01')
+WARNING_RATIO = decimal.Decimal('0.8')
+
+_AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+
+
+def status(is_income, balance, goal):
+    '''Returns the Bootstrap class of a Budget with `balance`: for
+    expenses, 'danger' at or over the goal and 'warning' from 80% of
+    it; for income the other way round'''
+    if is_income:
+        if balance >= goal:
+            return 'success'
+        elif balance >= goal * WARNING_RATIO:
+            return 'warning'
+        return 'danger'
+
+    if balance >= goal:
+        return 'danger'
+    elif balance >= goal * WARNING_RATIO:
+        return 'warning'
+    return 'success'
+
+
+def months_spanned(first, last):
+    '''Returns how many months there are from `first` to `last`, inclusive'''
+    return (last.year - first.year) * 12 + last.month - first.month + 1
+
+
+def with_forecast(budgets, day=None):
+    '''Annotates Budgets with `spent_this_month`, their category's total
+    in the month of `day` so far, `usual_rest`, its total after the day
+    of the month of `day` in the previous months, and `history_start`,
+    the first of those months it has Transactions in'''
+    day = day or date.today()
+    month_start = month_bounds(day)[0]
+    months = []
+    for _ in range(HISTORY_MONTHS):
+        months.append(previous_month(months[-1] if months else month_start))
+
+    spent = (MonthlyCategoryTotal.objects
+             .filter(category_id=OuterRef('category_id'), month=month_start)
+             .order_by()
+             .values('category_id')
+             .annotate(total=Sum('total'))
+             .values('total'))
+    # A date range per month, rather than extracting the day of the
+    # month from every row, so each is a seek on the index
+    rest = Value(0, output_field=_AMOUNT)
+    for month in months:
+        after_day = (Transaction.objects
+                     .filter(category_id=OuterRef('category_id'),
+                             created_time__gte=month + timedelta(days=day.day), created_time__lt=month_bounds(month)[1])
+                     .order_by()
+                     .values('category_id')
+                     .annotate(total=Sum('amount'))
+                     .values('total'))
+        rest = rest + Coalesce(Subquery(after_day, output_field=_AMOUNT), Value(0))
+    first = (MonthlyCategoryTotal.objects
+             .filter(category_id=OuterRef('category_id'), month__gte=months[-1], month__lt=month_start)
+             .order_by()
+             .values('category_id')
+             .annotate(first=Min('month'))
+             .values('first'))
+    return budgets.annotate(
+        spent_this_month=Coalesce(Subquery(spent, output_field=_AMOUNT), Value(0)),
+        usual_rest=rest,
+        history_start=Subquery(first, output_field=DateField()),
+    )
+
+
+def project(budgets, day=None):
+    '''Returns `{budget_id: forecast}` for Budgets annotated by
+    `with_forecast` for the month of `day`. Each forecast is a dict with
+    the `projected` month-end balance, the `daily_rate` so far this
+    month, its `status` class and how far it is projected to go `over`
+    the goal.'''
+    day = day or date.today()
+    month_start, next_month_start = month_bounds(day)
+    days_left = (next_month_start - day).days - 1
+
+    forecasts = {}
+    for budget in budgets:
+        rate = decimal.Decimal(str(budget.spent_this_month)) / day.day
+        rest = rate * days_left
+        if budget.history_start is not None:
+            months = months_spanned(budget.history_start, previous_month(month_start))
+            rest = (rest + decimal.Decimal(str(budget.usual_rest)) / months) / 2
+        projected = (budget.balance + rest).quantize(CENTS)
+        is_income = budget.category.is_income
+        forecasts[budget.id] = {
+            'projected': projected,
+            'daily_rate': rate.quantize(CENTS),
+            'status': status(is_income, projected, budget.goal),
+            'over': ZERO if is_income else max(projected - budget.goal, ZERO),
+        }
+    return forecasts
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+'''
+File: importer.py
+Author: Zachary King
+
+Bulk imports Transactions from CSV and OFX files.
+
+Files are parsed as a stream and inserted with `bulk_create` in
+chunks, so memory use is bounded by the chunk size rather than the
+file size. Wallets and categories are resolved by name through an
+in-memory lookup, and balances are updated once per wallet and once
+per category (monthly rollups once per category, wallet and month, and
+balance history once per wallet and day) at the end of the import
+instead of once per row. Background imports (see `utils/jobs.py`)
+commit each chunk on its own instead, so they can carry on from the
+last chunk committed if their worker stops.
+
+CSV files need a header row with `date` (%Y-%m-%d), `amount`,
+`category` and `wallet` columns, and may have a `description` column.
+OFX files carry neither a wallet nor categories, so their rows go to
+the import's default wallet, with debits filed under the default
+category and credits under the default income category.
+'''
+
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction as db_transaction
+
+from ..models import Transaction, BudgetCategory, Wallet
+from . import balances, rollups, versions, wallet_history
+
+CHUNK_SIZE = 1000
+FORMATS = ('csv', 'ofx')
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class ImportFormatError(ValueError):
+    '''Raised when an import file can't be parsed. `line` is
+    the line number of the offending row, if known.'''
+
+    def __init__(self, message, line=None):
+        if line is not None:
+            message = 'Line {}: {}'.format(line, message)
+        super(ImportFormatError, self).__init__(message)
+        self.line = line
+
+
+def guess_format(filename):
+    '''Returns the import format for a file name, based on its extension'''
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else 'csv'
+
+
+def text_stream(fileobj, encoding='utf-8'):
+    '''Wraps a binary file (such as an upload) so it can be read as text'''
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+
+
+def _read(rows, line):
+    '''Yields from `rows`, raising ImportFormatError if the file isn't
+    text or isn't CSV. `line` returns the current line number.'''
+    iterator = iter(rows)
+    while True:
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            raise ImportFormatError('File is not UTF-8 text', line())
+        except csv.Error as e:
+            raise ImportFormatError(str(e), line())
+
+
+def parse_csv(stream):
+    '''Yields `(line, row)` pairs from a CSV stream, where
+    `row` is a dict of the row's fields'''
+    reader = csv.DictReader(stream)
+    required = {'date', 'amount', 'category', 'wallet'}
+    try:
+        fieldnames = set(name.strip().lower() for name in (reader.fieldnames or []))
+    except UnicodeDecodeError:
+        raise ImportFormatError('File is not UTF-8 text', 1)
+    except csv.Error as e:
+        raise ImportFormatError(str(e), 1)
+    if not required.issubset(fieldnames):
+        raise ImportFormatError('CSV header must include the columns: {}'.format(', '.join(sorted(required))), 1)
+
+    for row in _read(reader, lambda: reader.line_num + 1):
+        row = dict((key.strip().lower(), (value or '').strip()) for key, value in row.items() if key)
+        line = reader.line_num
+        try:
+            created_time = datetime.strptime(row['date'], '%Y-%m-%d').date()
+            amount = balances.parse_amount(row['amount'])
+        except ValueError as e:
+            raise ImportFormatError(str(e), line)
+        yield line, {
+            'created_time': created_time,
+            'amount': amount,
+            'category': row['category'],
+            'wallet': row['wallet'],
+            'description': row.get('description', '')[:150],
+        }
+
+
+def parse_ofx(stream, category, income_category, wallet):
+    '''Yields `(line, row)` pairs for each <STMTTRN> in an OFX stream'''
+    current = None
+    line = 0
+    for text in _read(stream, lambda: line + 1):
+        line += 1
+        for closing, tag, value in _OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current = {}
+                elif current is not None:
+                    yield line, _ofx_row(current, line, category, income_category, wallet)
+                    current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def _ofx_row(fields, line, category, income_category, wallet):
+    '''Converts the fields of one OFX <STMTTRN> into an import row'''
+    try:
+        created_time = datetime.strptime(fields['DTPOSTED'][:8], '%Y%m%d').date()
+        amount = balances.parse_amount(fields['TRNAMT'])
+    except KeyError as e:
+        raise ImportFormatError('Transaction is missing {}'.format(e.args[0]), line)
+    except ValueError as e:
+        raise ImportFormatError(str(e), line)
+    description = fields.get('NAME') or fields.get('MEMO', '')
+    return {
+        'created_time': created_time,
+        'amount': abs(amount),
+        'category': income_category if amount > 0 else category,
+        'is_income': amount > 0,
+        'wallet': wallet,
+        'description': description[:150],
+    }
+
+
+class TransactionImporter(object):
+    '''Imports rows for one user. Categories and wallets that don't
+    exist yet are created the first time a row names them.'''
+
+    def __init__(self, user, chunk_size=CHUNK_SIZE):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.categories = dict((c.name, c) for c in BudgetCategory.objects.filter(user=user))
+        self.wallets = dict((w.name, w) for w in Wallet.objects.filter(user=user))
+        self.wallet_changes = defaultdict(int)
+        self.budget_changes = defaultdict(int)
+        self.rollup_changes = defaultdict(lambda: [0, 0])
+        self.history_changes = defaultdict(int)
+        self.count = 0
+
+    def category(self, name, line, is_income=False):
+        if not name:
+            raise ImportFormatError('Missing category', line)
+        if name not in self.categories:
+            self.categories[name] = BudgetCategory.objects.create(name=name, is_income=is_income, user=self.user)
+        return self.categories[name]
+
+    def wallet(self, name, line):
+        if not name:
+            raise ImportFormatError('Missing wallet', line)
+        if name not in self.wallets:
+            self.wallets[name] = Wallet.objects.create(name=name, user=self.user)
+        return self.wallets[name]
+
+    def run(self, rows, skip=0, committed=None):
+        '''Imports `rows` in one database transaction and returns how many
+        Transactions were created. Nothing is imported if any row is invalid.
+
+        With `committed`, each chunk is instead committed on its own,
+        and `committed(count)` is called inside its transaction with the
+        number of rows imported so far; raising rolls back the chunk.
+        The first `skip` rows are taken to be imported already, so an
+        interrupted import can carry on where it stopped.'''
+        if committed is None:
+            with db_transaction.atomic():
+                self.add(rows)
+                self.apply()
+        else:
+            self.count = skip
+            chunk = []
+            for index, (line, row) in enumerate(rows):
+                if index < skip:
+                    continue
+                chunk.append((line, row))
+                if len(chunk) >= self.chunk_size:
+                    self.commit(chunk, committed)
+                    chunk = []
+            if chunk:
+                self.commit(chunk, committed)
+        # bulk_create doesn't send post_save, so record the change here
+        versions.bump(self.user.id)
+        return self.count
+
+    def commit(self, rows, committed):
+        with db_transaction.atomic():
+            self.add(rows)
+            self.apply()
+            committed(self.count)
+
+    def add(self, rows):
+        '''Inserts `rows` and adds up their balance changes'''
+        chunk = []
+        for line, row in rows:
+            category = self.category(row['category'], line, row.get('is_income', False))
+            wallet = self.wallet(row['wallet'], line)
+            amount = row['amount']
+            chunk.append(Transaction(category=category, wallet=wallet, amount=amount,
+                                     description=row['description'], created_time=row['created_time'],
+                                     user=self.user))
+            change = balances.wallet_delta(category, amount)
+            self.wallet_changes[wallet.id] += change
+            self.history_changes[(wallet.id, row['created_time'])] += change
+            self.budget_changes[category.id] += abs(amount)
+            rollup = self.rollup_changes[(category.id, wallet.id, row['created_time'].replace(day=1))]
+            rollup[0] += amount
+            rollup[1] += 1
+            if len(chunk) >= self.chunk_size:
+                self.flush(chunk)
+                chunk = []
+        self.flush(chunk)
+
+    def apply(self):
+        '''Applies the net change to each wallet and category once'''
+        for wallet_id, change in self.wallet_changes.items():
+            balances.adjust_wallet(wallet_id, change)
+        for category_id, change in self.budget_changes.items():
+            balances.adjust_budgets(category_id, change)
+        for (category_id, wallet_id, month), (total, count) in self.rollup_changes.items():
+            rollups.record(self.user.id, category_id, wallet_id, month, total, count)
+        for (wallet_id, day), change in self.history_changes.items():
+            wallet_history.record(self.user.id, wallet_id, day, change)
+        for changes in (self.wallet_changes, self.budget_changes, self.rollup_changes, self.history_changes):
+            changes.clear()
+
+    def flush(self, chunk):
+        if chunk:
+            Transaction.objects.bulk_create(chunk)
+            self.count += len(chunk)
+
+
+def parse(fileobj, file_format='csv', wallet=None, category='Uncategorized', income_category='Income'):
+    '''Returns the `(line, row)` pairs of the Transactions in `fileobj`.
+    `wallet`, `category` and `income_category` are the names used for
+    OFX rows.'''
+    stream = text_stream(fileobj)
+    if file_format == 'csv':
+        return parse_csv(stream)
+    elif file_format == 'ofx':
+        return parse_ofx(stream, category, income_category, wallet)
+    raise ImportFormatError('Unknown import format: {}'.format(file_format))
+
+
+def import_transactions(user, fileobj, file_format='csv', wallet=None, category='Uncategorized',
+                        income_category='Income', chunk_size=CHUNK_SIZE):
+    '''Imports the Transactions in `fileobj` for `user` and returns how
+    many were created. `wallet`, `category` and `income_category` are
+    the names used for OFX rows.'''
+    rows = parse(fileobj, file_format, wallet, category, income_category)
+    return TransactionImporter(user, chunk_size).run(rows)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+'''
+File: jobs.py
+Author: Zachary King
+
+A small job queue kept in the database, for work too slow to do while a
+request waits: deleting a Wallet or BudgetCategory with many
+Transactions, large imports, and the budget renewal and anomaly
+notification runs over every user.
+
+A request `enqueue`s a Job and returns at once; the `run_jobs` command
+runs the queued Jobs in order. Workers claim a Job by switching its
+status from queued to running with a conditional UPDATE, so any number
+of them can share the queue without a broker or row locks. Handlers
+report their progress on the Job, which the page that queued it polls
+through the `job_status` view. While a handler runs, a heartbeat thread
+marks its Job alive even if the handler never reports, and a Job whose
+worker died without finishing is queued again once its heartbeat is
+`STALE_SECONDS` old. Each run of a Job is told apart by its
+`started_at`, so a worker that lost its Job to another can no longer
+update it; handlers must be safe to run again after being interrupted.
+
+Handlers are registered with `@handler(kind)` and called with the Job
+and its arguments. They return a message for the user and raise to fail
+the Job.
+'''
+
+import io
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction as db_transaction
+from django.shortcuts import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from ..models import BudgetCategory, Job, Transaction, Wallet
+from . import anomalies, importer, renewal, versions
+
+logger = logging.getLogger(__name__)
+
+# Deletes and imports bigger than these run in the background
+BACKGROUND_ROWS = getattr(settings, 'PYNNY_BACKGROUND_ROWS', 2000)
+BACKGROUND_IMPORT_BYTES = getattr(settings, 'PYNNY_BACKGROUND_IMPORT_BYTES', 256 * 1024)
+
+CHUNK_SIZE = 500
+STALE_SECONDS = 600
+
+HANDLERS = {}
+
+
+def handler(kind):
+    '''Registers the decorated function as the handler of `kind` Jobs'''
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, user=None, payload=None, **arguments):
+    '''Queues a `kind` Job with `arguments` and returns it'''
+    if kind not in HANDLERS:
+        raise ValueError('Unknown job kind: {}'.format(kind))
+    return Job.objects.create(kind=kind, user=user, payload=payload, arguments=json.dumps(arguments))
+
+
+def is_heavy(queryset, limit=None):
+    '''Whether `queryset` has more rows than is worth handling in a request'''
+    limit = BACKGROUND_ROWS if limit is None else limit
+    return queryset.order_by()[limit:limit + 1].exists()
+
+
+def _owned(job):
+    '''The Job's row, if this run of it still owns it'''
+    return Job.objects.filter(id=job.id, status=Job.RUNNING, started_at=job.started_at)
+
+
+def report(job, progress, total=None):
+    '''Records a running Job's progress, which also shows it is alive.
+    Returns False if the Job was queued again and taken by another run.'''
+    job.progress = progress
+    if total is not None:
+        job.total = total
+    return bool(_owned(job).update(progress=job.progress, total=job.total, heartbeat=timezone.now()))
+
+
+def claim():
+    '''Marks the oldest queued Job as running and returns it,
+    or returns None if the queue is empty'''
+    while True:
+        job_id = Job.objects.filter(status=Job.QUEUED).order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        # Only one worker's UPDATE can still find the Job queued
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(status=Job.RUNNING, started_at=now,
+                                                                    heartbeat=now):
+            return Job.objects.get(id=job_id)
+
+
+def requeue_stale(seconds=STALE_SECONDS):
+    '''Queues again the running Jobs that haven't reported for `seconds`.
+    Returns how many there were.'''
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    # Progress is kept, so handlers can carry on from it
+    return Job.objects.filter(status=Job.RUNNING, heartbeat__lt=cutoff).update(status=Job.QUEUED)
+
+
+class _Heartbeat(threading.Thread):
+    '''Marks a running Job alive every `interval` seconds until stopped'''
+
+    def __init__(self, job, interval):
+        super(_Heartbeat, self).__init__(name='heartbeat-{}'.format(job.id), daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    _owned(self.job).update(heartbeat=timezone.now())
+                except DatabaseError:
+                    # The handler may hold the database's write lock
+                    logger.warning('Could not record the heartbeat of job #%s', self.job.id, exc_info=True)
+        finally:
+            # This thread has its own database connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run(job, heartbeat=STALE_SECONDS / 3):
+    '''Runs a claimed Job and records how it finished. Its heartbeat is
+    recorded every `heartbeat` seconds while it runs.'''
+    beat = _Heartbeat(job, heartbeat)
+    beat.start()
+    try:
+        message = HANDLERS[job.kind](job, **json.loads(job.arguments))
+        job.status, job.message = Job.DONE, message or ''
+    except Exception as e:
+        logger.exception('%s failed', job)
+        job.status, job.message = Job.FAILED, str(e) or e.__class__.__name__
+    finally:
+        beat.stop()
+    job.message = job.message[:255]
+    job.finished_at = job.heartbeat = timezone.now()
+    # Uploaded files are only kept until they're imported
+    job.payload = None
+    if not _owned(job).update(status=job.status, message=job.message, finished_at=job.finished_at,
+                              heartbeat=job.heartbeat, payload=None):
+        logger.warning('%s was queued again while it ran; its result was not recorded', job)
+    if job.user_id is not None:
+        versions.bump(job.user_id)
+    return job
+
+
+def work(burst=False, sleep=1.0, max_jobs=None, stale_after=STALE_SECONDS, log=None):
+    '''Runs queued Jobs until `max_jobs` have run, or with `burst`, until
+    the queue is empty. Returns how many Jobs ran.'''
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        requeue_stale(stale_after)
+        job = claim()
+        if job is None:
+            if burst:
+                break
+            time.sleep(sleep)
+            continue
+        run(job, stale_after / 3)
+        count += 1
+        if log:
+            log('{}: {}'.format(job, job.message))
+    return count
+
+
+def progress_alert(job, text):
+    '''Returns alert HTML saying `text` and showing the Job's progress'''
+    return format_html(
+        '{} <div class="progress job-progress" data-url="{}">'
+        '<div class="progress-bar progress-bar-striped" role="progressbar" style="width: 0%"></div></div>',
+        text, reverse('job_status', kwargs={'job_id': job.id}))
+
+
+def _delete_in_chunks(job, transactions):
+    '''Deletes `transactions` a chunk at a time, reporting progress'''
+    total = transactions.count()
+    deleted = 0
+    report(job, 0, total)
+    while True:
+        ids = list(transactions.order_by().values_list('id', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        with db_transaction.atomic():
+            Transaction.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        report(job, min(deleted, total))
+    return deleted
+
+
+@handler('delete_wallet')
+def delete_wallet(job, wallet_id):
+    wallet = Wallet.objects.filter(id=wallet_id, user_id=job.user_id).first()
+    if wallet is None:
+        return 'The wallet was already deleted'
+    _delete_in_chunks(job, Transaction.objects.filter(wallet=wallet))
+    wallet.delete()
+    return 'Your {} wallet was deleted'.format(wallet.name)
+
+
+@handler('delete_category')
+def delete_category(job, category_id):
+    category = BudgetCategory.objects.filter(id=category_id, user_id=job.user_id).first()
+    if category is None:
+        return 'The category was already deleted'
+    _delete_in_chunks(job, Transaction.objects.filter(category=category))
+    category.delete()
+    return 'Your {} Category was deleted'.format(category.name)
+
+
+class LostJob(Exception):
+    '''Raised by a handler whose Job was queued again and taken by another run'''
+
+
+@handler('import_transactions')
+def import_transactions(job, file_format, wallet=None):
+    # Parse the whole file first, so a bad row fails the
+    # import before anything is committed
+    rows = list(importer.parse(io.BytesIO(bytes(job.payload)), file_format, wallet=wallet))
+    report(job, job.progress, len(rows))
+
+    def committed(count):
+        # Inside each chunk's transaction, so the progress recorded
+        # always matches the rows imported
+        if not report(job, count):
+            raise LostJob('{} was taken by another run'.format(job))
+
+    # Rows up to the progress recorded were imported by an earlier run
+    count = importer.TransactionImporter(job.user, CHUNK_SIZE).run(rows, job.progress, committed)
+    return 'Imported {} Transactions'.format(count)
+
+
+@handler('renew_budgets')
+def renew_budgets(job, month=None, chunk_size=renewal.CHUNK_SIZE):
+    if month is not None:
+        month = datetime.strptime(month, '%Y-%m-%d').date()
+    users = [job.user] if job.user_id is not None else None
+    return 'Renewed {} budgets'.format(renewal.renew_budgets(month, users, chunk_size))
+
+
+@handler('detect_anomalies')
+def detect_anomalies(job, processes=None, lookback_days=anomalies.LOOKBACK_DAYS, threshold=anomalies.THRESHOLD):
+    scan = anomalies.run(processes, lookback_days, threshold)
+    return 'Scanned {} users, created {} notifications'.format(scan.users, scan.notifications)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+'''
+File: loadtest.py
+Author: Zachary King
+
+Load generation for sizing the gunicorn deployment (see the
+`loadtest_pynny` command).
+
+`GunicornServer` boots the app under the shipped `gunicorn_config.py`
+on a fresh SQLite database seeded with synthetic users. `run_clients`
+then drives it with concurrent logged in clients, each repeatedly
+picking an action from a weighted traffic mix (dashboard views,
+Transaction posts, budget renewals, ...), and returns a `Report` of the
+latency percentiles, throughput and error rate of every action.
+
+Only the standard library is used on the client side, so the tool runs
+wherever the app does.
+'''
+
+import binascii
+import http.cookiejar
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+
+from . import seeding
+
+GUNICORN_CONFIG = os.path.join(os.path.dirname(settings.BASE_DIR), 'gunicorn_config.py')
+PERCENTILES = (50, 95, 99)
+CSRF_TOKEN = re.compile(rb'name=["\']csrfmiddlewaretoken["\'] value=["\']([^"\']+)')
+
+# name -> [(action, weight)]
+MIXES = {
+    'default': [('dashboard', 40), ('transactions', 20), ('budgets', 10), ('wallets', 5),
+                ('post_transaction', 20), ('renew_budgets', 5)],
+    'read': [('dashboard', 50), ('transactions', 25), ('budgets', 15), ('wallets', 10)],
+    'write': [('dashboard', 20), ('post_transaction', 70), ('renew_budgets', 10)],
+}
+
+
+class Client(object):
+    '''A logged in user's browser session against `base_url`'''
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.token = ''
+        self.wallets = []
+        self.categories = []
+
+    def request(self, path, data=None):
+        '''GETs `path`, or POSTs the form `data` to it, and returns
+        `(status, body)`. Redirects are followed.'''
+        headers = {}
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.token)
+            data = urllib.parse.urlencode(data).encode('utf-8')
+            headers['Referer'] = self.base_url + path
+        request = urllib.request.Request(self.base_url + path, data, headers)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+
+        # CSRF tokens are kept in the session, so read them from the forms
+        match = CSRF_TOKEN.search(body)
+        if match:
+            self.token = match.group(1).decode('ascii')
+        return status, body
+
+    def login(self, username, password):
+        '''Logs in and loads the user's wallets and categories'''
+        self.request('/pynny/login/')
+        status, body = self.request('/pynny/login/', {'username': username, 'password': password})
+        if status != 200 or not any(cookie.name == 'sessionid' for cookie in self.cookies):
+            raise RuntimeError('Could not log in as {}'.format(username))
+        # Logging in rotates the CSRF token; pick up the new one
+        self.request('/pynny/transactions/create/')
+        self.wallets = self.ids('wallets')
+        self.categories = self.ids('categories')
+
+    def ids(self, resource):
+        status, body = self.request('/pynny/api/v1/{}/?fields=id&limit=500'.format(resource))
+        return [row['id'] for row in json.loads(body.decode('utf-8'))['results']]
+
+
+def dashboard(client, rng):
+    return client.request('/pynny/')[0]
+
+
+def transactions(client, rng):
+    return client.request('/pynny/transactions/')[0]
+
+
+def budgets(client, rng):
+    return client.request('/pynny/budgets/')[0]
+
+
+def wallets(client, rng):
+    return client.request('/pynny/wallets/')[0]
+
+
+def post_transaction(client, rng):
+    return client.request('/pynny/transactions/', {
+        'category': rng.choice(client.categories),
+        'wallet': rng.choice(client.wallets),
+        'amount': '{:.2f}'.format(rng.uniform(1, 150)),
+        'description': 'Load test',
+        'created_time': date.today().strftime('%Y-%m-%d'),
+    })[0]
+
+
+def renew_budgets(client, rng):
+    return client.request('/pynny/budgets/renew/')[0]
+
+
+ACTIONS = {
+    'dashboard': dashboard,
+    'transactions': transactions,
+    'budgets': budgets,
+    'wallets': wallets,
+    'post_transaction': post_transaction,
+    'renew_budgets': renew_budgets,
+}
+
+
+def percentile(values, pct):
+    '''Returns the `pct` percentile of sorted `values` (nearest rank)'''
+    if not values:
+        return 0.0
+    rank = max(int(-(-len(values) * pct // 100)), 1)
+    return values[rank - 1]
+
+
+class Report(object):
+    '''Latencies and errors per action, from one load test'''
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, action, seconds, ok):
+        with self.lock:
+            self.latencies[action].append(seconds)
+            if not ok:
+                self.errors[action] += 1
+
+    def summary(self):
+        '''Returns `{action: {'requests', 'errors', 'error_rate', 'rps',
+        'p50', 'p95', 'p99'}}`, including an `all` row'''
+        rows = {}
+        everything = []
+        for action, latencies in self.latencies.items():
+            everything.extend(latencies)
+            rows[action] = self._row(sorted(latencies), self.errors[action])
+        rows['all'] = self._row(sorted(everything), sum(self.errors.values()))
+        return rows
+
+    def _row(self, latencies, errors):
+        row = {
+            'requests': len(latencies),
+            'errors': errors,
+            'error_rate': errors / len(latencies) if latencies else 0.0,
+            'rps': len(latencies) / self.elapsed if self.elapsed else 0.0,
+        }
+        for pct in PERCENTILES:
+            row['p{}'.format(pct)] = percentile(latencies, pct)
+        return row
+
+    def format(self):
+        lines = ['{:<18} {:>8} {:>8} {:>7} {:>9} {:>9} {:>9}'.format(
+            'action', 'requests', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms')]
+        summary = self.summary()
+        for action in sorted(summary, key=lambda name: (name == 'all', name)):
+            row = summary[action]
+            lines.append('{:<18} {:>8} {:>8.1f} {:>6.1%} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+                action, row['requests'], row['rps'], row['error_rate'],
+                row['p50'] * 1000, row['p95'] * 1000, row['p99'] * 1000))
+        return '\n'.join(lines)
+
+
+def _client_loop(base_url, username, password, mix, deadline, report, rng):
+    actions = [name for name, weight in mix]
+    weights = [weight for name, weight in mix]
+    client = Client(base_url)
+    start = time.perf_counter()
+    try:
+        client.login(username, password)
+    except (OSError, ValueError, RuntimeError):
+        report.add('login', time.perf_counter() - start, False)
+        return
+    report.add('login', time.perf_counter() - start, True)
+    while time.time() < deadline:
+        action = seeding.weighted_choice(rng, actions, weights)
+        start = time.perf_counter()
+        try:
+            ok = ACTIONS[action](client, rng) < 400
+        except (OSError, ValueError):
+            ok = False
+        report.add(action, time.perf_counter() - start, ok)
+
+
+def run_clients(base_url, usernames, clients=10, duration=30, mix='default', password=seeding.PASSWORD,
+                random_seed=0):
+    '''Drives `base_url` with `clients` concurrent clients for `duration`
+    seconds, logging in as `usernames` in turn, and returns a Report'''
+    report = Report()
+    threads = []
+    deadline = time.time() + duration
+    for i in range(clients):
+        thread = threading.Thread(target=_client_loop, args=(
+            base_url, usernames[i % len(usernames)], password, MIXES[mix], deadline, report,
+            random.Random(random_seed + i)))
+        thread.daemon = True
+        threads.append(thread)
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+class GunicornServer(object):
+    '''Runs the app under `gunicorn_config.py` on a fresh SQLite
+    database seeded with `users` synthetic users, for use in a `with`
+    block. `workers` and `worker_class` override the config.'''
+
+    def __init__(self, bind='127.0.0.1:8765', workers=None, worker_class=None, users=10, transactions=1000,
+                 prefix='load', config=GUNICORN_CONFIG):
+        self.bind = bind
+        self.workers = workers
+        self.worker_class = worker_class
+        self.usernames = ['{}{}'.format(prefix, i) for i in range(1, users + 1)]
+        self.transactions = transactions
+        self.prefix = prefix
+        self.config = config
+        self.process = None
+
+    @property
+    def base_url(self):
+        return 'http://{}'.format(self.bind)
+
+    def __enter__(self):
+        self.directory = tempfile.TemporaryDirectory(prefix='pynny-load-')
+        env = dict(os.environ,
+                   DJANGO_DATABASE_NAME=os.path.join(self.directory.name, 'db.sqlite3'),
+                   # Every worker must sign sessions with the same key
+                   DJANGO_SECRET_KEY=os.environ.get('DJANGO_SECRET_KEY') or
+                   binascii.hexlify(os.urandom(32)).decode('ascii'),
+                   # The load is sent over plain HTTP
+                   DJANGO_SESSION_COOKIE_SECURE='',
+                   # Run as whoever runs the tool rather than the configured user
+                   GUNICORN_USER=str(os.getuid()), GUNICORN_GROUP=str(os.getgid()))
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        subprocess.check_call(manage + ['migrate', '--verbosity', '0'], env=env)
+        subprocess.check_call(manage + ['seed_pynny', '--users', str(len(self.usernames)),
+                                        '--transactions', str(self.transactions), '--prefix', self.prefix],
+                              env=env, stdout=subprocess.DEVNULL)
+
+        command = [sys.executable, '-m', 'gunicorn.app.wsgiapp', '--config', self.config, '--chdir', settings.BASE_DIR,
+                   '--bind', self.bind, '--access-logfile', os.devnull]
+        if self.workers:
+            command += ['--workers', str(self.workers)]
+        if self.worker_class:
+            command += ['--worker-class', self.worker_class]
+        self.process = subprocess.Popen(command + ['mysite.wsgi'], env=env)
+        try:
+            self.wait_until_ready()
+        except Exception:
+            self.__exit__(*sys.exc_info())
+            raise
+        return self
+
+    def wait_until_ready(self, timeout=30):
+        host, port = self.bind.rsplit(':', 1)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('gunicorn exited with status {}'.format(self.process.returncode))
+            try:
+                socket.create_connection((host, int(port)), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('gunicorn did not start listening on {}'.format(self.bind))
+
+    def __exit__(self, *exc_info):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.directory.cleanup()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+'''
+File: metrics.py
+Author: Zachary King
+
+In-process request metrics, recorded by `pynny.middleware.MetricsMiddleware`.
+
+Every request adds its wall time, database query count, database time
+and template render time to histograms kept per URL name (`index`,
+`transactions`, `one_budget`, ...). The histograms live in the memory
+of the process that served the request, so under gunicorn each worker
+keeps and reports its own, labelled with its pid; `render_prometheus`
+writes them in the Prometheus text format.
+
+Requests slower than `PYNNY_SLOW_REQUEST_SECONDS` are logged to the
+`pynny.slow_requests` logger with the SQL they ran, and the most recent
+ones are kept for `slow_requests()`.
+
+Template time is measured by the `TimedDjangoTemplates` backend. Queries
+run while a template renders (lazy querysets) count towards both the
+database and the template time.
+'''
+
+import collections
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template import TemplateDoesNotExist
+
+from . import dashboard
+
+SLOW_REQUEST_SECONDS = getattr(settings, 'PYNNY_SLOW_REQUEST_SECONDS', 1.0)
+SLOW_REQUEST_LOG_SIZE = getattr(settings, 'PYNNY_SLOW_REQUEST_LOG_SIZE', 50)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (help text, buckets)
+METRICS = collections.OrderedDict([
+    ('pynny_request_duration_seconds', ('Wall time spent handling a request', TIME_BUCKETS)),
+    ('pynny_request_queries', ('Database queries run by a request', QUERY_BUCKETS)),
+    ('pynny_request_db_seconds', ('Time a request spent in database queries', TIME_BUCKETS)),
+    ('pynny_request_template_seconds', ('Time a request spent rendering templates', TIME_BUCKETS)),
+])
+
+logger = logging.getLogger('pynny.slow_requests')
+
+_lock = threading.Lock()
+_histograms = {}
+_slow = collections.deque(maxlen=SLOW_REQUEST_LOG_SIZE)
+_local = threading.local()
+
+
+class Histogram(object):
+    '''Counts observations into cumulative `buckets`, Prometheus style'''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _observe(metric, view, value):
+    key = (metric, view)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = Histogram(METRICS[metric][1])
+    histogram.observe(value)
+
+
+def record(view, method, path, status, wall, queries):
+    '''Adds one request to the histograms of `view`. `queries` is the
+    list of `{'sql', 'time'}` dicts it ran. Slow requests are logged.'''
+    db_time = sum(float(query['time']) for query in queries)
+    template_time = template_seconds()
+    with _lock:
+        _observe('pynny_request_duration_seconds', view, wall)
+        _observe('pynny_request_queries', view, len(queries))
+        _observe('pynny_request_db_seconds', view, db_time)
+        _observe('pynny_request_template_seconds', view, template_time)
+
+    if wall >= SLOW_REQUEST_SECONDS:
+        entry = {
+            'view': view, 'method': method, 'path': path, 'status': status, 'wall': wall,
+            'db_time': db_time, 'template_time': template_time, 'queries': list(queries),
+            'time': time.time(),
+        }
+        with _lock:
+            _slow.append(entry)
+        logger.warning('Slow request %s %s (%s) took %.3fs: %d queries in %.3fs, templates %.3fs\n%s',
+                       method, path, view, wall, len(queries), db_time, template_time,
+                       '\n'.join('{}s {}'.format(query['time'], query['sql']) for query in queries))
+
+
+def slow_requests():
+    '''Returns the most recent slow requests, newest first'''
+    with _lock:
+        return list(reversed(_slow))
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _slow.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    '''Returns this process's metrics in the Prometheus text format'''
+    worker = os.getpid()
+    with _lock:
+        histograms = dict((key, (list(h.counts), h.sum, h.count)) for key, h in _histograms.items())
+
+    lines = []
+    for metric, (help_text, buckets) in METRICS.items():
+        lines.append('# HELP {} {}'.format(metric, help_text))
+        lines.append('# TYPE {} histogram'.format(metric))
+        views = sorted(view for name, view in histograms if name == metric)
+        for view in views:
+            counts, total, count = histograms[(metric, view)]
+            labels = 'view="{}",worker="{}"'.format(_label(view), worker)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, labels, bound, bucket_count))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(metric, labels, count))
+            lines.append('{}_sum{{{}}} {}'.format(metric, labels, _number(total)))
+            lines.append('{}_count{{{}}} {}'.format(metric, labels, count))
+
+    cache_stats = dashboard.stats()
+    for name in ('hits', 'misses'):
+        metric = 'pynny_dashboard_cache_{}_total'.format(name)
+        lines.append('# HELP {} Dashboard cache {}'.format(metric, name))
+        lines.append('# TYPE {} counter'.format(metric))
+        lines.append('{}{{worker="{}"}} {}'.format(metric, worker, cache_stats[name]))
+    return '\n'.join(lines) + '\n'
+
+
+def start_request():
+    '''Starts timing the templates rendered by the current request'''
+    _local.template_time = 0.0
+    _local.depth = 0
+
+
+def template_seconds():
+    return getattr(_local, 'template_time', 0.0)
+
+
+class TimedTemplate(Template):
+    '''A Django template that adds its render time to the current request's'''
+
+    def render(self, context=None, request=None):
+        # Templates rendered from inside another are already being timed
+        depth = getattr(_local, 'depth', 0)
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return super(TimedTemplate, self).render(context, request)
+        finally:
+            _local.depth = depth
+            if not depth:
+                _local.template_time = template_seconds() + time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    '''The Django template backend, timing each render'''
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -1,4 +1,51 @@
+#!/usr/bin/env python3
+'''
+File: notifications.py
+Author: Zachary King
+
+Creates Notifications and caches each user's undismissed ones. The
+cached list is keyed on the user's data version (see `utils.versions`),
+which every created or dismissed Notification bumps, so no server
+process reads a stale list.
+
+Looking the version up costs as much as querying the Notifications, so
+the cache is only used when the version is already known, as it is on
+every page served through `conditional_page`.
+'''
+
+from django.conf import settings
+from django.core.cache import cache
+
 from ..models import Notification
+from . import versions
+
+CACHE_TIMEOUT = getattr(settings, 'PYNNY_NOTIFICATIONS_CACHE_TIMEOUT', 300)
+
+
+def _cache_key(user_id, version):
+    return 'pynny:notifications:{}:{}'.format(user_id, version)
+
+
+def undismissed(user, version=None):
+    '''Returns a list of `user`'s undismissed Notifications, from the
+    cache if the user's data `version` is given'''
+    if version is None:
+        return list(Notification.objects.filter(user=user, dismissed=False))
+    key = _cache_key(user.id, version)
+    notices = cache.get(key)
+    if notices is None:
+        notices = list(Notification.objects.filter(user=user, dismissed=False))
+        cache.set(key, notices, CACHE_TIMEOUT)
+    return notices
+
+
+def create_many(notices):
+    '''Creates unsaved Notifications with a single `bulk_create`, which
+    sends no signals, and bumps the version of everyone notified.
+    Returns the list.'''
+    notices = Notification.objects.bulk_create(list(notices))
+    versions.bump_many(notice.user_id for notice in notices)
+    return notices
 
 
 def notify_saving_complete(saving):
@@ -9,4 +56,5 @@ def notify_saving_complete(saving):
         user=saving.user,
         alert='success'
     )
-    notification.save()
+    return notification
+
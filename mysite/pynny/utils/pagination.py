@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+'''
+File: pagination.py
+Author: Zachary King
+
+Implements keyset (cursor) pagination for Transaction ledgers.
+Pages are keyed on `(created_time, id)` so each page costs a
+single indexed range query, no matter how deep into a user's
+history the page is.
+'''
+
+from datetime import datetime
+
+from django.db.models import Q
+from django.shortcuts import render
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(transaction):
+    '''Returns the cursor string pointing just past `transaction`'''
+    return '{}_{}'.format(transaction.created_time.strftime('%Y-%m-%d'), transaction.id)
+
+
+def decode_cursor(cursor):
+    '''Returns the `(created_time, id)` pair for a cursor string,
+    or None if the cursor is missing or malformed'''
+    if not cursor:
+        return None
+    try:
+        created_time, transaction_id = cursor.split('_', 1)
+        return datetime.strptime(created_time, '%Y-%m-%d').date(), int(transaction_id)
+    except ValueError:
+        return None
+
+
+def ledger_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    '''Returns one page of the Transactions in `queryset`, newest first,
+    starting after `cursor`, along with the cursor for the next page
+    (None if this is the last page).'''
+    queryset = queryset.order_by('-created_time', '-id')
+    key = decode_cursor(cursor)
+    if key is not None:
+        created_time, transaction_id = key
+        queryset = queryset.filter(Q(created_time__lt=created_time) |
+                                   Q(created_time=created_time, id__lt=transaction_id))
+
+    # Fetch one extra row to know if there is another page
+    transactions = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(transactions) > page_size:
+        transactions = transactions[:page_size]
+        next_cursor = encode_cursor(transactions[-1])
+    return transactions, next_cursor
+
+
+def ledger_context(request, queryset):
+    '''Returns the template context for the requested page of a ledger'''
+    transactions, next_cursor = ledger_page(queryset, request.GET.get('cursor'), PAGE_SIZE)
+    return {'transactions': transactions, 'next_cursor': next_cursor}
+
+
+def render_ledger_rows(request, template, data):
+    '''Renders only the table rows of a ledger page, for infinite scrolling.
+    The cursor for the following page is sent in the `X-Next-Cursor` header.'''
+    response = render(request, template, context=data)
+    if data.get('next_cursor'):
+        response['X-Next-Cursor'] = data['next_cursor']
+    return response
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+'''
+File: renewal.py
+Author: Zachary King
+
+Renews last month's Budgets into the current month for every user.
+
+Users are processed in chunks: each chunk reads the previous month's
+Budgets and the new month's category totals with one query apiece and
+writes the renewed Budgets with a single `bulk_create`. Renewed Budgets
+keep their `budget_id` and are dated the first of the month, and
+`(user, budget_id, month)` is unique, so running the renewal again (or
+alongside a user clicking "Renew Budgets") never duplicates a Budget.
+'''
+
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Sum
+
+from ..models import Budget, MonthlyCategoryTotal
+from . import versions
+from .dates import month_bounds, previous_month
+
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size):
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _new_budgets(user_ids, month):
+    '''Returns the unsaved Budgets that renew last month's
+    Budgets of `user_ids` into `month`'''
+    first, next_first = month_bounds(month)
+    last_first = previous_month(month)
+    renewed = set(Budget.objects.select_related(None)
+                  .filter(user_id__in=user_ids, month__gte=first, month__lt=next_first)
+                  .values_list('user_id', 'budget_id'))
+    previous = (Budget.objects.select_related(None)
+                .filter(user_id__in=user_ids, month__gte=last_first, month__lt=first)
+                .order_by('id')
+                .values_list('user_id', 'budget_id', 'category_id', 'wallet_id', 'goal'))
+
+    # Seed each Budget with what was already spent in its category this month
+    spent = dict(MonthlyCategoryTotal.objects.filter(user_id__in=user_ids, month=first)
+                 .order_by()
+                 .values('category_id')
+                 .annotate(total=Sum('total'))
+                 .values_list('category_id', 'total'))
+
+    budgets = {}
+    for user_id, budget_id, category_id, wallet_id, goal in previous:
+        key = (user_id, budget_id)
+        if key not in renewed and key not in budgets:
+            budgets[key] = Budget(user_id=user_id, budget_id=budget_id, category_id=category_id,
+                                  wallet_id=wallet_id, goal=goal, month=first,
+                                  balance=spent.get(category_id, 0))
+    return list(budgets.values())
+
+
+def renew_chunk(user_ids, month):
+    '''Renews the Budgets of `user_ids` into `month`.
+    Returns how many Budgets were created.'''
+    try:
+        with db_transaction.atomic():
+            budgets = _new_budgets(user_ids, month)
+            Budget.objects.bulk_create(budgets)
+    except IntegrityError:
+        # Some of these Budgets were renewed since we looked; recompute
+        # the chunk, which now leaves those out
+        with db_transaction.atomic():
+            budgets = _new_budgets(user_ids, month)
+            Budget.objects.bulk_create(budgets)
+
+    versions.bump_many(budget.user_id for budget in budgets)
+    return len(budgets)
+
+
+def renew_budgets(month=None, users=None, chunk_size=CHUNK_SIZE):
+    '''Renews last month's Budgets into the month containing `month`
+    (this month by default) for `users`, or for every user if `users`
+    is None. Returns how many Budgets were created.'''
+    month = month or date.today()
+    if users is None:
+        user_ids = get_user_model().objects.order_by('id').values_list('id', flat=True).iterator()
+    else:
+        user_ids = [user.id for user in users]
+
+    renewed = 0
+    for chunk in _chunks(user_ids, chunk_size):
+        renewed += renew_chunk(chunk, month)
+    return renewed
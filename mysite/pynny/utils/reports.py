@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+'''
+File: reports.py
+Author: Zachary King
+
+Spending reports over any date range: totals by category, wallet and
+month, with month-over-month and year-over-year comparisons.
+
+A report reads compact `values_list` rows of `(month, category, wallet,
+total)`. Whole months come straight from the MonthlyCategoryTotal
+rollups, and only the partial months at either end of the range are
+grouped from Transactions, so a 5-year report reads a few thousand
+pre-aggregated rows however many Transactions are behind them. The
+rows are then summed per category, wallet and month in a single pass.
+'''
+
+import decimal
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Q
+
+from ..models import BudgetCategory, MonthlyCategoryTotal, Transaction, Wallet
+from . import rollups
+from .dates import month_bounds
+
+ZERO = decimal.Decimal('0.00')
+
+# Reports cover at most MAX_YEARS, between these years
+MIN_YEAR = 1900
+MAX_YEAR = 2100
+MAX_YEARS = 10
+
+
+def shift_year(day, years):
+    '''Returns `day` moved by `years` years (Feb 29 becomes Feb 28)'''
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+def in_range(start, end):
+    '''Whether a report can cover `start` to `end`'''
+    return (MIN_YEAR <= start.year and end.year <= MAX_YEAR and start <= end
+            and end < shift_year(start, MAX_YEARS))
+
+
+def months_between(start, end):
+    '''Returns the first day of every month from `start` to `end`'''
+    month, last = month_bounds(start)[0], month_bounds(end)[0]
+    months = []
+    while month <= last:
+        months.append(month)
+        month = month_bounds(month)[1]
+    return months
+
+
+def percent_change(current, previous):
+    '''Returns the change from `previous` to `current` in percent,
+    or None if there was nothing to compare with'''
+    if not previous:
+        return None
+    return ((current - previous) * 100 / previous).quantize(decimal.Decimal('0.1'))
+
+
+def monthly_rows(user, start, end):
+    '''Returns `[(month, category_id, wallet_id, total)]` for the user's
+    Transactions from `start` to `end`, inclusive'''
+    first_full = start if start.day == 1 else month_bounds(start)[1]
+    after_full = month_bounds(end + timedelta(days=1))[0]
+    if first_full >= after_full:
+        # No whole month in the range
+        first_full = after_full = end + timedelta(days=1)
+
+    rows = list(MonthlyCategoryTotal.objects
+                .filter(user=user, month__gte=first_full, month__lt=after_full)
+                .values_list('month', 'category_id', 'wallet_id', 'total'))
+
+    edges = Q()
+    if start < first_full:
+        edges |= Q(created_time__gte=start, created_time__lt=first_full)
+    if after_full <= end:
+        edges |= Q(created_time__gte=max(after_full, start), created_time__lte=end)
+    if edges:
+        transactions = Transaction.objects.filter(edges, user=user)
+        rows.extend(rollups.grouped_totals(transactions).values_list('month', 'category_id', 'wallet_id', 'total'))
+    return rows
+
+
+class SpendingReport(object):
+    '''A user's spending and income from `start` to `end`, compared
+    with the same dates a year earlier'''
+
+    def __init__(self, user, start, end):
+        self.user = user
+        self.start = start
+        self.end = end
+        self.categories = dict((pk, (name, is_income)) for pk, name, is_income in
+                               BudgetCategory.objects.filter(user=user).values_list('id', 'name', 'is_income'))
+        self.wallets = dict(Wallet.objects.filter(user=user).values_list('id', 'name'))
+        self.current = self._sum(monthly_rows(user, start, end))
+        self.previous = self._sum(monthly_rows(user, shift_year(start, -1), shift_year(end, -1)))
+
+    def _sum(self, rows):
+        '''Sums rows into `{'category': {id: total}, 'wallet': {id: [spent, earned]},
+        'month': {month: [spent, earned]}}`'''
+        by_category = defaultdict(lambda: ZERO)
+        by_wallet = defaultdict(lambda: [ZERO, ZERO])
+        by_month = defaultdict(lambda: [ZERO, ZERO])
+        for month, category_id, wallet_id, total in rows:
+            income = self.categories.get(category_id, (None, False))[1]
+            by_category[category_id] += total
+            by_wallet[wallet_id][income] += total
+            by_month[month][income] += total
+        return {'category': by_category, 'wallet': by_wallet, 'month': by_month}
+
+    def totals(self):
+        '''Returns the spent and earned totals, with last year's'''
+        spent, earned = self._totals(self.current)
+        last_spent, last_earned = self._totals(self.previous)
+        return {
+            'spent': spent, 'earned': earned, 'net': earned - spent,
+            'last_year_spent': last_spent, 'last_year_earned': last_earned,
+            'spent_change': percent_change(spent, last_spent),
+            'earned_change': percent_change(earned, last_earned),
+        }
+
+    def _totals(self, sums):
+        spent = sum((month[0] for month in sums['month'].values()), ZERO)
+        earned = sum((month[1] for month in sums['month'].values()), ZERO)
+        return spent, earned
+
+    def by_category(self):
+        '''Returns every category with activity in either period, largest first'''
+        rows = []
+        for category_id in set(self.current['category']) | set(self.previous['category']):
+            name, is_income = self.categories.get(category_id, ('Unknown', False))
+            total = self.current['category'].get(category_id, ZERO)
+            last_year = self.previous['category'].get(category_id, ZERO)
+            rows.append({'name': name, 'is_income': is_income, 'total': total, 'last_year': last_year,
+                         'change': percent_change(total, last_year)})
+        return sorted(rows, key=lambda row: (row['is_income'], -row['total'], row['name']))
+
+    def by_wallet(self):
+        '''Returns what was spent from and earned into each wallet'''
+        rows = []
+        for wallet_id, (spent, earned) in self.current['wallet'].items():
+            rows.append({'name': self.wallets.get(wallet_id, 'Unknown'), 'spent': spent, 'earned': earned,
+                         'net': earned - spent})
+        return sorted(rows, key=lambda row: row['name'])
+
+    def by_month(self):
+        '''Returns each month in the range with its change from the
+        previous month and from the same month last year'''
+        rows = []
+        previous_spent = None
+        for month in months_between(self.start, self.end):
+            spent, earned = self.current['month'].get(month, (ZERO, ZERO))
+            last_year_spent = self.previous['month'].get(shift_year(month, -1), (ZERO, ZERO))[0]
+            rows.append({
+                'month': month, 'spent': spent, 'earned': earned, 'net': earned - spent,
+                'month_change': percent_change(spent, previous_spent),
+                'last_year_spent': last_year_spent,
+                'year_change': percent_change(spent, last_year_spent),
+            })
+            previous_spent = spent
+        return rows
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+'''
+File: rollups.py
+Author: Zachary King
+
+Maintains the MonthlyCategoryTotal rollups: the total and count of
+Transactions per user, category, wallet and month. Transaction writes
+adjust a single rollup row with `F()` expressions; `rebuild` recomputes
+the rollups from scratch with one grouped query.
+'''
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from ..models import Transaction, MonthlyCategoryTotal
+from .dates import month_bounds
+
+
+def record(user_id, category_id, wallet_id, day, amount, count=1):
+    '''Adds `amount` and `count` to the rollup for the month containing `day`'''
+    key = {
+        'user_id': user_id,
+        'category_id': category_id,
+        'wallet_id': wallet_id,
+        'month': month_bounds(day)[0],
+    }
+    changes = {'total': F('total') + amount, 'count': F('count') + count}
+    if MonthlyCategoryTotal.objects.filter(**key).update(**changes):
+        return
+    try:
+        with db_transaction.atomic():
+            MonthlyCategoryTotal.objects.create(total=amount, count=count, **key)
+    except IntegrityError:
+        # Another request created the row first
+        MonthlyCategoryTotal.objects.filter(**key).update(**changes)
+
+
+def add_transaction(trans):
+    '''Counts `trans` in its rollup'''
+    record(trans.user_id, trans.category_id, trans.wallet_id, trans.created_time, trans.amount)
+
+
+def remove_transaction(trans):
+    '''Removes `trans` from its rollup'''
+    record(trans.user_id, trans.category_id, trans.wallet_id, trans.created_time, -trans.amount, -1)
+
+
+def grouped_totals(transactions):
+    '''Returns `transactions` grouped into rollup rows,
+    as dicts of MonthlyCategoryTotal fields'''
+    return (transactions.select_related(None)
+            .annotate(month=TruncMonth('created_time'))
+            .order_by()
+            .values('user_id', 'category_id', 'wallet_id', 'month')
+            .annotate(total=Sum('amount'), count=Count('id')))
+
+
+def rebuild(user=None, batch_size=1000):
+    '''Recomputes the rollups for `user`, or for everyone if `user` is None.
+    Returns how many rollup rows were written.'''
+    transactions = Transaction.objects.all()
+    rollups = MonthlyCategoryTotal.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    written = 0
+    with db_transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped_totals(transactions).iterator():
+            batch.append(MonthlyCategoryTotal(**row))
+            if len(batch) >= batch_size:
+                MonthlyCategoryTotal.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        MonthlyCategoryTotal.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def category_total(category):
+    '''Returns the sum of every Transaction amount in `category`'''
+    return MonthlyCategoryTotal.objects.filter(category=category).aggregate(
+        total=Coalesce(Sum('total'), Value(0)))['total']
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+'''
+File: search.py
+Author: Zachary King
+
+Full-text search over Transaction descriptions, combined with date,
+amount and wallet filters.
+
+Each database uses its own full-text index, installed by `install`
+(from migration 0007 and again after every `migrate`):
+
+    SQLite      an FTS5 table indexing pynny_transaction.description,
+                kept in sync by triggers on pynny_transaction
+    PostgreSQL  a GIN index on to_tsvector('english', description)
+    MySQL       a FULLTEXT index on description
+
+The PostgreSQL and MySQL indexes are maintained by the database itself,
+and the SQLite triggers fire for every write, including `bulk_create`
+and `QuerySet.update`, so the index is always in sync. Words are
+matched by prefix, so "groc" finds "Grocery store"; SQLite and
+PostgreSQL also stem them, so "groceries" does too. On an SQLite build
+without FTS5, search falls back to a LIKE scan. Whether the SQLite index
+exists is remembered on each connection, so searches don't look it up.
+'''
+
+import re
+from datetime import datetime
+
+from django.db import OperationalError, connection
+
+from ..models import Transaction
+from .balances import parse_amount
+
+FTS_TABLE = 'pynny_transaction_fts'
+
+SQLITE_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "description, content='pynny_transaction', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON pynny_transaction BEGIN "
+    "INSERT INTO {fts}(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON pynny_transaction BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF description ON pynny_transaction BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO {fts}(rowid, description) VALUES (new.id, new.description); END",
+)
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS {fts}_insert",
+    "DROP TRIGGER IF EXISTS {fts}_delete",
+    "DROP TRIGGER IF EXISTS {fts}_update",
+    "DROP TABLE IF EXISTS {fts}",
+)
+POSTGRES_INDEX = 'transaction_description_fts_idx'
+MYSQL_INDEX = 'transaction_description_ft'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def words(text):
+    '''Returns the words of a search, lowercased'''
+    return [word.lower() for word in _WORD.findall(text or '')]
+
+
+def _sqlite_has_fts(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+    return cursor.fetchone() is not None
+
+
+def install(conn=connection, rebuild=False):
+    '''Creates the full-text index for `conn`'s database if it doesn't
+    exist. With `rebuild`, the SQLite index is rebuilt from the table.
+    Returns False if the database can't index descriptions.'''
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            try:
+                created = not _sqlite_has_fts(cursor)
+                for statement in SQLITE_SCHEMA:
+                    cursor.execute(statement.format(fts=FTS_TABLE))
+            except OperationalError:
+                # This SQLite was built without FTS5
+                conn.pynny_has_fts = False
+                return False
+            if created or rebuild:
+                cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+            conn.pynny_has_fts = True
+        elif conn.vendor == 'postgresql':
+            cursor.execute("CREATE INDEX IF NOT EXISTS {} ON pynny_transaction "
+                           "USING gin (to_tsvector('english', description))".format(POSTGRES_INDEX))
+        elif conn.vendor == 'mysql':
+            cursor.execute("SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = DATABASE() "
+                           "AND table_name = 'pynny_transaction' AND index_name = %s", [MYSQL_INDEX])
+            if not cursor.fetchone()[0]:
+                cursor.execute('ALTER TABLE pynny_transaction ADD FULLTEXT INDEX {} (description)'.format(MYSQL_INDEX))
+        else:
+            return False
+    return True
+
+
+def uninstall(conn=connection):
+    '''Drops the full-text index'''
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for statement in SQLITE_DROP:
+                cursor.execute(statement.format(fts=FTS_TABLE))
+            conn.pynny_has_fts = False
+        elif conn.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS {}'.format(POSTGRES_INDEX))
+        elif conn.vendor == 'mysql':
+            cursor.execute('ALTER TABLE pynny_transaction DROP INDEX {}'.format(MYSQL_INDEX))
+
+
+def _fts_available():
+    if connection.vendor == 'sqlite':
+        try:
+            return connection.pynny_has_fts
+        except AttributeError:
+            with connection.cursor() as cursor:
+                connection.pynny_has_fts = _sqlite_has_fts(cursor)
+            return connection.pynny_has_fts
+    return connection.vendor in ('postgresql', 'mysql')
+
+
+def matching(queryset, text):
+    '''Filters a Transaction queryset to descriptions containing
+    every word of `text`'''
+    terms = words(text)
+    if not terms:
+        return queryset
+    if not _fts_available():
+        for term in terms:
+            queryset = queryset.filter(description__icontains=term)
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        query = ' '.join('"{}"*'.format(term) for term in terms)
+        where = 'pynny_transaction.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)'.format(fts=FTS_TABLE)
+    elif connection.vendor == 'postgresql':
+        query = ' & '.join('{}:*'.format(term) for term in terms)
+        where = "to_tsvector('english', pynny_transaction.description) @@ to_tsquery('english', %s)"
+    else:
+        query = ' '.join('+{}*'.format(term) for term in terms)
+        where = 'MATCH (pynny_transaction.description) AGAINST (%s IN BOOLEAN MODE)'
+    return queryset.extra(where=[where], params=[query])
+
+
+class SearchForm(object):
+    '''The ledger search and filters, parsed from a request's GET
+    parameters: `q`, `start`, `end` (YYYY-MM-DD), `min`, `max` and
+    `wallet`. `errors` lists the parameters that couldn't be parsed.'''
+    PARAMETERS = ('q', 'start', 'end', 'min', 'max', 'wallet')
+
+    def __init__(self, params):
+        self.values = dict((name, params.get(name, '').strip()) for name in self.PARAMETERS)
+        self.errors = []
+        self.text = self.values['q']
+        self.start = self._parse('start', lambda value: datetime.strptime(value, '%Y-%m-%d').date())
+        self.end = self._parse('end', lambda value: datetime.strptime(value, '%Y-%m-%d').date())
+        self.min_amount = self._parse('min', parse_amount)
+        self.max_amount = self._parse('max', parse_amount)
+        self.wallet_id = self._parse('wallet', int)
+
+    def _parse(self, name, parse):
+        if not self.values[name]:
+            return None
+        try:
+            return parse(self.values[name])
+        except ValueError:
+            self.errors.append(name)
+            return None
+
+    @property
+    def active(self):
+        '''Whether any search or filter was given'''
+        return any(self.values.values())
+
+    def filter(self, queryset):
+        '''Applies the search and filters to a Transaction queryset'''
+        if self.start is not None:
+            queryset = queryset.filter(created_time__gte=self.start)
+        if self.end is not None:
+            queryset = queryset.filter(created_time__lte=self.end)
+        if self.min_amount is not None:
+            queryset = queryset.filter(amount__gte=self.min_amount)
+        if self.max_amount is not None:
+            queryset = queryset.filter(amount__lte=self.max_amount)
+        if self.wallet_id is not None:
+            queryset = queryset.filter(wallet_id=self.wallet_id)
+        return matching(queryset, self.text)
+
+
+def search_transactions(user, params):
+    '''Returns `(form, transactions)`: the user's Transactions
+    matching the search in `params`'''
+    form = SearchForm(params)
+    return form, form.filter(Transaction.objects.for_user(user))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+'''
+File: seeding.py
+Author: Zachary King
+
+Generates realistic synthetic Pynny data for benchmarks and demos:
+users with wallets, categories, a budget per expense category per month,
+savings and any number of Transactions spread over the past months.
+
+Rows are written with `bulk_create` in batches and the derived data
+(wallet and budget balances, monthly rollups, daily wallet history and
+budget_id sequences) is computed once per user afterwards, so seeding a
+million Transactions takes minutes rather than hours. The output only
+depends on the arguments, including `random_seed`.
+'''
+
+import decimal
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+
+from ..models import Wallet, BudgetCategory, Budget, BudgetSequence, Transaction, Savings
+from . import rollups, versions, wallet_history
+from .dates import previous_month
+
+PASSWORD = 'pynny-seed'
+BATCH_SIZE = 1000
+
+WALLETS = (('Checking', 2500), ('Savings', 10000), ('Credit Card', 0), ('Cash', 150))
+# name, is_income, typical amount range, relative frequency
+CATEGORIES = (
+    ('Salary', True, (1500, 4000), 2),
+    ('Interest', True, (1, 40), 1),
+    ('Rent', False, (700, 1600), 1),
+    ('Groceries', False, (10, 180), 25),
+    ('Dining Out', False, (8, 90), 15),
+    ('Gas', False, (20, 70), 8),
+    ('Utilities', False, (40, 250), 2),
+    ('Entertainment', False, (5, 120), 6),
+    ('Shopping', False, (10, 400), 8),
+    ('Travel', False, (50, 1200), 1),
+    ('Health', False, (10, 300), 2),
+)
+DESCRIPTIONS = {
+    'Salary': ('Paycheck', 'Direct deposit'),
+    'Interest': ('Savings interest',),
+    'Rent': ('Rent', 'Rent payment'),
+    'Groceries': ('Grocery store', 'Farmers market', 'Corner shop', 'Supermarket'),
+    'Dining Out': ('Lunch', 'Coffee', 'Dinner with friends', 'Pizza', 'Takeout'),
+    'Gas': ('Gas station', 'Fuel'),
+    'Utilities': ('Electric bill', 'Water bill', 'Internet', 'Phone bill'),
+    'Entertainment': ('Movies', 'Concert tickets', 'Streaming subscription', 'Books'),
+    'Shopping': ('Clothes', 'Electronics', 'Home goods', 'Gift'),
+    'Travel': ('Flight', 'Hotel', 'Car rental'),
+    'Health': ('Pharmacy', 'Doctor visit', 'Gym membership'),
+}
+
+
+def months_before(day, months):
+    '''Returns the first day of each of the `months` months ending
+    with the month of `day`, oldest first'''
+    first = day.replace(day=1)
+    result = [first]
+    for _ in range(months - 1):
+        result.append(previous_month(result[-1]))
+    return result[::-1]
+
+
+def _money(rng, low, high):
+    return decimal.Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def seed_user(username, transactions=10000, months=12, rng=None, today=None, batch_size=BATCH_SIZE):
+    '''Creates a user named `username` with a full set of synthetic
+    data, including `transactions` Transactions spread over the last
+    `months` months. Returns the new user.'''
+    rng = rng or random.Random(0)
+    today = today or date.today()
+    month_starts = months_before(today, months)
+    first_day = month_starts[0]
+    days = (today - first_day).days
+
+    with db_transaction.atomic():
+        user = get_user_model().objects.create_user(username=username, password=PASSWORD,
+                                                    email='{}@example.com'.format(username))
+        wallets = [Wallet.objects.create(user=user, name=name, balance=balance) for name, balance in WALLETS]
+        categories = [BudgetCategory.objects.create(user=user, name=name, is_income=is_income)
+                      for name, is_income, amounts, weight in CATEGORIES]
+        spec = dict((c.name, s) for c, s in zip(categories, CATEGORIES))
+
+        budgets = []
+        for month in month_starts:
+            for category in categories:
+                if not category.is_income:
+                    low, high = spec[category.name][2]
+                    budgets.append(Budget(user=user, budget_id=len(budgets) + 1, category=category,
+                                          wallet=wallets[0], goal=_money(rng, low * 4, high * 6), month=month))
+        Budget.objects.bulk_create(budgets)
+        BudgetSequence.objects.create(user=user, last_id=len(budgets))
+
+        Savings.objects.bulk_create([
+            Savings(user=user, name='Emergency fund', goal=5000, balance=_money(rng, 0, 5000),
+                    due_date=today + timedelta(days=365)),
+            Savings(user=user, name='Vacation', goal=2000, balance=_money(rng, 0, 2000),
+                    due_date=today + timedelta(days=120)),
+        ])
+
+        weights = [s[3] for s in CATEGORIES]
+        wallet_changes = defaultdict(int)
+        budget_changes = defaultdict(int)
+        batch = []
+        for i in range(transactions):
+            category = weighted_choice(rng, categories, weights)
+            low, high = spec[category.name][2]
+            amount = _money(rng, low, high)
+            wallet = wallets[0] if category.is_income else rng.choice(wallets)
+            batch.append(Transaction(user=user, category=category, wallet=wallet, amount=amount,
+                                     description=rng.choice(DESCRIPTIONS[category.name]),
+                                     created_time=first_day + timedelta(days=rng.randint(0, days))))
+            wallet_changes[wallet.id] += amount if category.is_income else -amount
+            budget_changes[category.id] += amount
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+
+        # Apply the balances the Transactions would have posted
+        for wallet in wallets:
+            Wallet.objects.filter(id=wallet.id).update(balance=wallet.balance + wallet_changes[wallet.id])
+        for category_id, change in budget_changes.items():
+            Budget.objects.filter(category_id=category_id).update(balance=change)
+        rollups.rebuild(user, batch_size)
+        wallet_history.rebuild(user, batch_size)
+    versions.bump(user.id)
+    return user
+
+
+def weighted_choice(rng, items, weights):
+    # Like random.choices, which is new in Python 3.6
+    point = rng.uniform(0, sum(weights))
+    for item, weight in zip(items, weights):
+        point -= weight
+        if point <= 0:
+            return item
+    return items[-1]
+
+
+def seed(users=1, transactions=10000, months=12, prefix='seed', random_seed=0, today=None,
+         batch_size=BATCH_SIZE):
+    '''Creates `users` synthetic users named `<prefix>1`, `<prefix>2`,
+    ..., each with `transactions` Transactions. Returns the users.'''
+    rng = random.Random(random_seed)
+    return [seed_user('{}{}'.format(prefix, i), transactions, months, rng, today, batch_size)
+            for i in range(1, users + 1)]
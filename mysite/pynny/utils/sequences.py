@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+'''
+File: sequences.py
+Author: Zachary King
+
+Allocates `budget_id`s from a per-user BudgetSequence row.
+
+The next id is taken by incrementing the row with an `F()` expression,
+which locks it until the surrounding transaction ends, so concurrent
+requests are handed distinct ids without scanning the Budget table.
+'''
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Max
+
+from ..models import Budget, BudgetSequence
+
+
+def _start(user_id):
+    '''Creates a user's sequence, continuing after their highest budget_id'''
+    last_id = Budget.objects.filter(user_id=user_id).aggregate(last_id=Max('budget_id'))['last_id']
+    try:
+        with db_transaction.atomic():
+            BudgetSequence.objects.create(user_id=user_id, last_id=last_id or 0)
+    except IntegrityError:
+        # Another request created it first
+        pass
+
+
+def next_budget_id(user):
+    '''Returns a new `budget_id` for `user`'''
+    with db_transaction.atomic():
+        sequence = BudgetSequence.objects.filter(user_id=user.id)
+        if not sequence.update(last_id=F('last_id') + 1):
+            _start(user.id)
+            sequence.update(last_id=F('last_id') + 1)
+        return sequence.values_list('last_id', flat=True).get()
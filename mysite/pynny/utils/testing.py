@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+'''
+File: testing.py
+Author: Zachary King
+
+Shared helpers for the Pynny test suites.
+'''
+
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountTestMixin(object):
+    '''Mixin for `TestCase`s that need to bound how many
+    database queries a block of code runs.'''
+
+    @contextmanager
+    def assertMaxQueries(self, num, using='default'):
+        '''Fails if the wrapped block runs more than `num` queries'''
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > num:
+            queries = '\n'.join(
+                '{}. {}'.format(i, query['sql']) for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail('{} queries executed, at most {} expected\nCaptured queries were:\n{}'.format(
+                executed, num, queries))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+'''
+File: versions.py
+Author: Zachary King
+
+Keeps a version number for each user's data, bumped whenever one of
+their Transactions, Budgets, Wallets, BudgetCategories, Savings or
+Notifications changes (see `pynny.signals`), along with the time of the
+last change.
+
+The version keys cached data such as the dashboard, and gives pages and
+API responses an ETag and Last-Modified date: `conditional_page` answers
+a GET with 304 Not Modified when nothing the page shows has changed,
+after a single lookup of the user's DataVersion row.
+
+Versions are kept in the database rather than the cache, which is local
+to each server process by default: a change handled by one process must
+make every process's cached copies and ETags stale.
+'''
+
+import functools
+import hashlib
+from datetime import datetime, time as day_start
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from ..models import DataVersion
+
+
+def _lookup(user_id):
+    '''Returns `(version, modified)` for a user. A user whose data
+    never changed is at version 0, modified None.'''
+    row = DataVersion.objects.filter(user_id=user_id).values_list('version', 'modified').first()
+    return row or (0, None)
+
+
+def request_version(request):
+    '''Returns `(version, modified)` for the logged in user,
+    looked up at most once per request'''
+    if not hasattr(request, 'pynny_version'):
+        request.pynny_version = _lookup(request.user.id)
+    return request.pynny_version
+
+
+def current(user_id):
+    '''Returns the current version of a user's data'''
+    return _lookup(user_id)[0]
+
+
+def bump(user_id):
+    '''Records that a user's data changed'''
+    now = timezone.now()
+    rows = DataVersion.objects.filter(user_id=user_id)
+    if rows.update(version=F('version') + 1, modified=now):
+        return
+    try:
+        with db_transaction.atomic():
+            DataVersion.objects.create(user_id=user_id, version=1, modified=now)
+    except IntegrityError:
+        # Another request created it first
+        rows.update(version=F('version') + 1, modified=now)
+
+
+def bump_many(user_ids):
+    '''Records that the data of every user in `user_ids` changed'''
+    user_ids = set(user_ids)
+    now = timezone.now()
+    rows = DataVersion.objects.filter(user_id__in=user_ids)
+    if rows.update(version=F('version') + 1, modified=now) == len(user_ids):
+        return
+    for user_id in user_ids - set(rows.values_list('user_id', flat=True)):
+        bump(user_id)
+
+
+def start(user_id):
+    '''Creates a new user's DataVersion, so their first change
+    is a single UPDATE'''
+    DataVersion.objects.create(user_id=user_id)
+
+
+def page_etag(request, *args, **kwargs):
+    '''Returns the ETag of a page for the logged in user. Besides the
+    data version it covers what else changes the rendered page: the
+    session (whose CSRF token is in the page's forms), the current
+    date and whether only the rows fragment was requested.'''
+    if not request.user.is_authenticated():
+        return None
+    version, modified = request_version(request)
+    parts = [str(request.user.id), str(version), timezone.localdate().isoformat(),
+             getattr(request.session, 'session_key', None) or '', str(request.is_ajax())]
+    return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def page_last_modified(request, *args, **kwargs):
+    '''Returns when the logged in user's page last changed: their last
+    data change, today's midnight or their last login, whichever is latest'''
+    if not request.user.is_authenticated():
+        return None
+    version, modified = request_version(request)
+    latest = timezone.make_aware(datetime.combine(timezone.localdate(), day_start.min))
+    if modified is not None:
+        latest = max(latest, modified)
+    if request.user.last_login:
+        latest = max(latest, request.user.last_login)
+    return latest
+
+
+def conditional_page(view):
+    '''Decorates a view so GETs are answered with 304 Not Modified when
+    the client's copy is current. Responses must be revalidated on use
+    and are only cached by the user's own browser.'''
+    conditional_view = condition(etag_func=page_etag, last_modified_func=page_last_modified)(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+'''
+File: wallet_history.py
+Author: Zachary King
+
+Maintains each Wallet's balance history as DailyWalletBalance rows:
+the net change in the wallet's balance per day. Transaction writes
+adjust a single row with `F()` expressions, and `rebuild` recomputes
+the rows from scratch with one grouped query.
+
+The balance at the end of a day is the wallet's current balance less
+the changes of every later day, so `balance_series` charts a wallet
+from one row per day of activity instead of every Transaction, and
+`with_running_balance` annotates a ledger with the balance after each
+Transaction.
+
+Django 1.11 has no window expressions, so the running balance is
+computed in SQL with two correlated subqueries per row: one over the
+(few) later daily rows and one over the same day's later Transactions.
+'''
+
+import decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from ..models import Transaction, DailyWalletBalance
+
+MAX_POINTS = 366
+
+_AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+
+
+def record(user_id, wallet_id, day, change):
+    '''Adds `change` to a wallet's balance change on `day`'''
+    if not change:
+        return
+    key = {'wallet_id': wallet_id, 'day': day}
+    if DailyWalletBalance.objects.filter(**key).update(change=F('change') + change):
+        return
+    try:
+        with db_transaction.atomic():
+            DailyWalletBalance.objects.create(user_id=user_id, change=change, **key)
+    except IntegrityError:
+        # Another request created the row first
+        DailyWalletBalance.objects.filter(**key).update(change=F('change') + change)
+
+
+def signed_amount():
+    '''Expression for how much a Transaction changes its wallet's balance'''
+    return Case(When(category__is_income=True, then=F('amount')), default=F('amount') * -1, output_field=_AMOUNT)
+
+
+def rebuild(user=None, batch_size=1000):
+    '''Recomputes the daily balance changes for `user`, or for everyone
+    if `user` is None. Returns how many rows were written.'''
+    transactions = Transaction.objects.all()
+    history = DailyWalletBalance.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        history = history.filter(user=user)
+
+    rows = (transactions.select_related(None)
+            .order_by()
+            .values('user_id', 'wallet_id', 'created_time')
+            .annotate(change=Sum(signed_amount())))
+    written = 0
+    with db_transaction.atomic():
+        history.delete()
+        batch = []
+        for row in rows.iterator():
+            batch.append(DailyWalletBalance(user_id=row['user_id'], wallet_id=row['wallet_id'],
+                                            day=row['created_time'], change=row['change']))
+            if len(batch) >= batch_size:
+                DailyWalletBalance.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        DailyWalletBalance.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def balance_series(wallet, max_points=MAX_POINTS):
+    '''Returns `[(day, balance)]`: the wallet's balance at the end of each
+    day it changed, oldest first. Long histories are thinned to at most
+    `max_points` points, always keeping the latest.'''
+    changes = list(DailyWalletBalance.objects.filter(wallet=wallet).order_by('day').values_list('day', 'change'))
+    balance = wallet.balance - sum((change for day, change in changes), decimal.Decimal(0))
+    series = []
+    for day, change in changes:
+        balance += change
+        series.append((day, balance))
+
+    if len(series) > max_points:
+        step = -(-len(series) // max_points)
+        series = series[len(series) - 1::-step][::-1]
+    return series
+
+
+def with_running_balance(transactions, wallet):
+    '''Annotates a wallet's Transactions with `running_balance`,
+    the wallet's balance right after each Transaction'''
+    later_days = (DailyWalletBalance.objects
+                  .filter(wallet_id=OuterRef('wallet_id'), day__gt=OuterRef('created_time'))
+                  .order_by()
+                  .values('wallet_id')
+                  .annotate(total=Sum('change'))
+                  .values('total'))
+    later_same_day = (Transaction.objects
+                      .filter(wallet_id=OuterRef('wallet_id'), created_time=OuterRef('created_time'),
+                              id__gt=OuterRef('id'))
+                      .order_by()
+                      .values('wallet_id')
+                      .annotate(total=Sum(signed_amount()))
+                      .values('total'))
+    return transactions.annotate(
+        later_days=Coalesce(Subquery(later_days, output_field=_AMOUNT), Value(0)),
+        later_same_day=Coalesce(Subquery(later_same_day, output_field=_AMOUNT), Value(0)),
+    ).annotate(
+        running_balance=Value(wallet.balance, output_field=_AMOUNT) - F('later_days') - F('later_same_day'),
+    )
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+'''
+File: api_views.py
+Author: Zachary King
+
+Implements the versioned JSON API under /pynny/api/v1/.
+
+    GET    /api/v1/<resource>/         list, with ?fields=, ?cursor= and ?limit=
+    POST   /api/v1/<resource>/         create
+    GET    /api/v1/<resource>/<id>     one row, with ?fields=
+    PATCH  /api/v1/<resource>/<id>     update
+    DELETE /api/v1/<resource>/<id>     delete
+    POST   /api/v1/batch/              {"operations": [...]} in one transaction
+
+Requests are authenticated by the user's session. Errors are returned
+as `{"error": "..."}` with a 4xx status. GETs carry an ETag and
+Last-Modified date and are answered with 304 Not Modified when the
+user's data hasn't changed.
+'''
+
+import functools
+import json
+
+from django.db import IntegrityError
+from django.http import JsonResponse
+
+from ..utils import api
+from ..utils.versions import conditional_page
+
+
+def api_view(methods):
+    '''Decorates an API view: rejects anonymous users and other HTTP
+    methods, and turns ApiErrors into JSON error responses'''
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated():
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            if request.method not in methods:
+                response = JsonResponse({'error': 'Method not allowed'}, status=405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except api.ApiError as e:
+                return JsonResponse({'error': str(e)}, status=e.status)
+            except IntegrityError:
+                return JsonResponse({'error': 'Conflicts with an existing row'}, status=409)
+        return wrapper
+    return decorator
+
+
+def request_json(request):
+    '''Returns the decoded JSON body of `request`'''
+    try:
+        return json.loads(request.body.decode('utf-8') or '{}')
+    except ValueError:
+        raise api.ApiError('Request body must be JSON')
+
+
+def requested_fields(request):
+    '''Returns the field names in `?fields=`, or None for every field'''
+    fields = request.GET.get('fields')
+    return [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', api.PAGE_SIZE))
+    except ValueError:
+        raise api.ApiError('Invalid limit')
+    return max(1, min(limit, api.MAX_PAGE_SIZE))
+
+
+@api_view(['GET'])
+@conditional_page
+def api_root(request):
+    '''Lists the API's resources'''
+    return JsonResponse({'version': 'v1', 'resources': sorted(api.RESOURCES)})
+
+
+@api_view(['GET', 'POST'])
+@conditional_page
+def resource_list(request, resource):
+    '''Lists or creates rows of `resource`'''
+    res = api.resource(resource)
+    if request.method == 'POST':
+        obj = res.create(request.user, res.parse(request.user, request_json(request), creating=True))
+        return JsonResponse(res.serialize(obj, res.columns()), status=201)
+
+    columns = res.columns(requested_fields(request))
+    rows, next_cursor = res.page(request.user, columns, request.GET.get('cursor'), page_size(request))
+    return JsonResponse({'results': rows, 'next_cursor': next_cursor})
+
+
+@api_view(['GET', 'PATCH', 'PUT', 'DELETE'])
+@conditional_page
+def resource_detail(request, resource, pk):
+    '''Reads, updates or deletes one row of `resource`'''
+    res = api.resource(resource)
+    obj = res.get(request.user, pk)
+    if request.method == 'DELETE':
+        res.delete(obj)
+        return JsonResponse({'id': int(pk), 'deleted': True})
+    if request.method in ('PATCH', 'PUT'):
+        obj = res.update(obj, res.parse(request.user, request_json(request)))
+    return JsonResponse(res.serialize(obj, res.columns(requested_fields(request))))
+
+
+@api_view(['POST'])
+def batch(request):
+    '''Applies many creates, updates and deletes in one database transaction'''
+    operations = request_json(request)
+    if isinstance(operations, dict):
+        operations = operations.get('operations')
+    return JsonResponse({'results': api.run_batch(request.user, operations)})
@@ -8,104 +8,65 @@ Implements the views/handlers for Budget-related requests
 
 from django.shortcuts import render, redirect, reverse
 from django.contrib.auth.decorators import login_required
-import decimal
+from django.db import transaction as db_transaction
 from datetime import date
 
 from ..models import Budget, BudgetCategory, Wallet, Transaction
+from ..utils import renewal, rollups, sequences, versions
+from ..utils.context import BUDGET_PAGES, user_data
+from ..utils.pagination import ledger_context, render_ledger_rows
+from ..utils.versions import conditional_page
 
 
 @login_required(login_url='/pynny/login')
 def renew_budgets(request):
-    if request.user.is_authenticated():
-        all_budgets = Budget.objects.filter(user=request.user)
-        renewed = set()
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        last_month_budgets = Budget.objects.filter(user=request.user,
-                                                           month__contains=date.strftime(last_month, '%Y-%m'))
-        for budget in last_month_budgets:
-            if budget.budget_id not in renewed:
-                renewed_budget = Budget.objects.get(pk=budget.pk)
-                renewed_budget.pk = None
-                renewed_budget.month = date.today()
-                renewed_budget.balance = decimal.Decimal('0')
-                renewed_budget.save()
-                renewed.add(budget.budget_id)
+    '''Renews last month's Budgets for the user into this month'''
+    renewal.renew_budgets(users=[request.user])
     return budgets(request)
 
 
 @login_required(login_url='/pynny/login')
+@conditional_page
 def budgets(request):
     '''Display Budgets for a user'''
     # GET = display user's budgets
     if request.method == 'GET':
-        data = {}
-
-        # Get the wallets for this user
-        data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        data['last_month_budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(last_month, '%Y-%m'))
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
-
+        data = user_data(request).context(BUDGET_PAGES)
         return render(request, 'pynny/budgets/budgets.html', context=data)
     # POST = create a new Budget
     elif request.method == 'POST':
         # Get the form data from the request
         _category = int(request.POST['category'])
         _goal = float(request.POST['goal'])
-        _start_balance = decimal.Decimal(0.0)
         _wallet = int(request.POST['wallet'])
 
         category = BudgetCategory.objects.get(id=_category)
         wallet = Wallet.objects.get(id=_wallet)
 
-        # Calculate the starting balance
-        for transaction in Transaction.objects.filter(category=category):
-            _start_balance += transaction.amount
+        # Calculate the starting balance from the category's monthly rollups
+        _start_balance = rollups.category_total(category)
 
         # Check if the budget already exists
-        if Budget.objects.filter(user=request.user, category=category, wallet=wallet, month__contains=date.strftime(date.today(), '%Y-%m')):
-            data = {'alerts': {'errors': ['<strong>Oops!</strong> A Budget already exists for that Wallet and Category, for this month']}}
-            today = date.today()
-            last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-            data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                               month__contains=date.strftime(last_month, '%Y-%m'))
-            data['budgets'] = Budget.objects.filter(user=request.user,
-                                                    month__contains=date.strftime(date.today(), '%Y-%m'))
+        if Budget.objects.for_user(request.user).filter(category=category, wallet=wallet).for_month(date.today()):
+            data = user_data(request).context(BUDGET_PAGES, alerts={
+                'errors': ['<strong>Oops!</strong> A Budget already exists for that Wallet and Category, for this month']
+            })
             return render(request, 'pynny/budgets/new_budget.html', context=data)
 
         # Create the new Budget
-        try:
-            latest_budget = Budget.objects.latest('budget_id')
-        except Budget.DoesNotExist:
-            latest_budget = None
-
-        new_id = latest_budget.budget_id + 1 if latest_budget is not None else 0
-        Budget(category=category, wallet=wallet, goal=_goal, balance=_start_balance, user=request.user, budget_id=new_id).save()
-        data = {'alerts': {'success': ['<strong>Done!</strong> New Budget created successfully!']}}
-        data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                           month__contains=date.strftime(last_month, '%Y-%m'))
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        with db_transaction.atomic():
+            new_id = sequences.next_budget_id(request.user)
+            Budget(category=category, wallet=wallet, goal=_goal, balance=_start_balance, user=request.user, budget_id=new_id).save()
+        data = user_data(request).context(BUDGET_PAGES, alerts={
+            'success': ['<strong>Done!</strong> New Budget created successfully!']
+        })
         return render(request, 'pynny/budgets/budgets.html', context=data, status=201)
 
 
 @login_required(login_url='/pynny/login')
 def new_budget(request):
     '''Create a new Budget form'''
-    # Get the categories
-    data = {}
-    data['categories'] = BudgetCategory.objects.filter(user=request.user)
-    data['wallets'] = Wallet.objects.filter(user=request.user)
-    today = date.today()
-    last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-    data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                       month__contains=date.strftime(last_month, '%Y-%m'))
+    data = user_data(request).context(BUDGET_PAGES)
 
     # Check if they have any categories or wallets first
     if not data['categories']:
@@ -142,25 +103,15 @@ def one_budget(request, budget_id):
         budget = Budget.objects.get(id=budget_id)
     except Budget.DoesNotExist:
         # DNE
-        data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                           month__contains=date.strftime(last_month, '%Y-%m'))
-        data['wallets'] = Wallet.objects.filter(user=request.user)
-        data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Budget does not exist.']}
+        data = user_data(request).context(BUDGET_PAGES, alerts={
+            'errors': ['<strong>Oh snap!</strong> That Budget does not exist.']
+        })
         return render(request, 'pynny/budgets/budgets.html', context=data, status=404)
 
-    if budget.user != request.user:
-        data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                           month__contains=date.strftime(last_month, '%Y-%m'))
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
-        data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Budget isn\'t yours! You don\'t have permission to view it']}
+    if budget.user_id != request.user.id:
+        data = user_data(request).context(BUDGET_PAGES, alerts={
+            'errors': ['<strong>Oh snap!</strong> That Budget isn\'t yours! You don\'t have permission to view it']
+        })
         return render(request, 'pynny/budgets/budgets.html', context=data, status=403)
 
     if request.method == "POST":
@@ -170,26 +121,16 @@ def one_budget(request, budget_id):
         if action == 'delete':
             # Delete the Budget
             budget.delete()
+            versions.bump(budget.user_id)
 
             # And return them to the budgets page
-            data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            today = date.today()
-            last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-            data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                               month__contains=date.strftime(last_month, '%Y-%m'))
-            data['wallets'] = Wallet.objects.filter(user=request.user)
-            data['alerts'] = {'success': ['<strong>Done!</strong> Budget was deleted successfully']}
+            data = user_data(request).context(BUDGET_PAGES, alerts={
+                'success': ['<strong>Done!</strong> Budget was deleted successfully']
+            })
             return render(request, 'pynny/budgets/budgets.html', context=data)
         elif action == 'edit':
             # Render the edit_budget view
-            data['budget'] = budget
-            today = date.today()
-            last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-            data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                               month__contains=date.strftime(last_month, '%Y-%m'))
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data = user_data(request).context(BUDGET_PAGES, budget=budget)
             return render(request, 'pynny/budgets/edit_budget.html', context=data)
         elif action == 'edit_complete':
             # Get the form data from the request
@@ -206,23 +147,16 @@ def one_budget(request, budget_id):
             budget.goal = _goal
             budget.save()
 
-            data = {'alerts': {'success': ['<strong>Done!</strong> Budget updated successfully!']}}
-            today = date.today()
-            last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-            data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                               month__contains=date.strftime(last_month, '%Y-%m'))
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            data['wallets'] = Wallet.objects.filter(user=request.user)
-            data['budgets'] = Budget.objects.filter(user=request.user, month__contains=date.strftime(date.today(), '%Y-%m'))
+            data = user_data(request).context(BUDGET_PAGES, alerts={
+                'success': ['<strong>Done!</strong> Budget updated successfully!']
+            })
             return render(request, 'pynny/budgets/budgets.html', context=data)
     elif request.method == 'GET':
         # Show the specific Budget data
+        data.update(ledger_context(request, Transaction.objects.filter(category=budget.category)))
+        if request.is_ajax():
+            data['show_id'] = True
+            return render_ledger_rows(request, 'pynny/transactions/ledger_rows.html', data)
         data['budget'] = budget
-        today = date.today()
-        last_month = date(today.year, today.month - 1 if today.month > 1 else 12, today.day)
-        data['last_month_budgets'] = Budget.objects.filter(user=request.user,
-                                                           month__contains=date.strftime(last_month, '%Y-%m'))
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
-        data['transactions'] = Transaction.objects.filter(category=budget.category).order_by('-created_time')
+        data.update(user_data(request).context(BUDGET_PAGES))
         return render(request, 'pynny/budgets/one_budget.html', context=data)
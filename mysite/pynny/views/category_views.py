@@ -9,9 +9,13 @@ Implements the views/handlers for BudgetCategory-related requests
 import logging
 from django.shortcuts import redirect, render, reverse
 from django.contrib.auth.decorators import login_required
+from django.utils.html import format_html
 from datetime import date
 
 from ..models import BudgetCategory, Budget, Transaction
+from ..utils import jobs, versions
+from ..utils.context import CATEGORY_PAGES, user_data
+from ..utils.pagination import ledger_context, render_ledger_rows
 
 
 logger = logging.getLogger('category_views')
@@ -26,7 +30,7 @@ def budget_categories(request):
         data = {}
 
         # Get the wallets for this user
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
+        data.update(user_data(request).context(CATEGORY_PAGES))
 
         return render(request, 'pynny/categories/categories.html', context=data)
     # POST = create a new BudgetCategory
@@ -45,7 +49,7 @@ def budget_categories(request):
         # Create the new BudgetCategory
         BudgetCategory(name=name, is_income=is_income, user=request.user).save()
         data = {'alerts': {'success': ['<strong>Done!</strong> New Category created successfully!']}}
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
+        data.update(user_data(request).context(CATEGORY_PAGES))
         return render(request, 'pynny/categories/categories.html', context=data, status=201)
 
 
@@ -65,12 +69,12 @@ def one_category(request, category_id):
         category = BudgetCategory.objects.get(id=category_id)
     except BudgetCategory.DoesNotExist:
         # DNE
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
+        data.update(user_data(request).context(CATEGORY_PAGES))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Category does not exist.']}
         return render(request, 'pynny/categories/categories.html', context=data, status=404)
 
-    if category.user != request.user:
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
+    if category.user_id != request.user.id:
+        data.update(user_data(request).context(CATEGORY_PAGES))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Category does not exist.']}
         return render(request, 'pynny/categories/categories.html', context=data, status=403)
 
@@ -79,11 +83,21 @@ def one_category(request, category_id):
         action = request.POST['action'].lower()
 
         if action == 'delete':
+            if jobs.is_heavy(Transaction.objects.filter(category=category)):
+                # Too many Transactions to delete while the request waits
+                job = jobs.enqueue('delete_category', request.user, category_id=category.id)
+                alert = jobs.progress_alert(job, format_html(
+                    '<strong>On it!</strong> Your <em>{}</em> Category is being deleted.', category.name))
+                data.update(user_data(request).context(CATEGORY_PAGES))
+                data['alerts'] = {'info': [alert]}
+                return render(request, 'pynny/categories/categories.html', context=data, status=202)
+
             # Delete the Category
             category.delete()
+            versions.bump(category.user_id)
 
             # And return them to the categories page
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
+            data.update(user_data(request).context(CATEGORY_PAGES))
             data['alerts'] = {'info': ['<strong>Done!</strong> Your <em>' + category.name + '</em> Category was deleted successfully']}
             return render(request, 'pynny/categories/categories.html', context=data)
         elif action == 'edit':
@@ -104,11 +118,13 @@ def one_category(request, category_id):
             category.save()
 
             data = {'alerts': {'success': ['<strong>Done!</strong> Category updated successfully!']}}
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
+            data.update(user_data(request).context(CATEGORY_PAGES))
             return render(request, 'pynny/categories/categories.html', context=data)
     elif request.method == 'GET':
         # Show the specific Category data
+        data.update(ledger_context(request, Transaction.objects.filter(category=category)))
+        if request.is_ajax():
+            return render_ledger_rows(request, 'pynny/transactions/ledger_rows.html', data)
         data['category'] = category
-        data['budgets'] = Budget.objects.filter(category=category, month__contains=date.strftime(date.today(), '%Y-%m'))
-        data['transactions'] = Transaction.objects.filter(category=category).order_by('-created_time')
+        data['budgets'] = Budget.objects.filter(category=category).for_month(date.today())
         return render(request, 'pynny/categories/one_category.html', context=data)
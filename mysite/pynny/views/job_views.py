@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+'''
+File: job_views.py
+Author: Zachary King
+
+Progress of the background Jobs a user queued (see `utils/jobs.py`),
+polled by the pages that queued them.
+'''
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from ..models import Job
+
+
+@login_required(login_url='/pynny/login')
+def job_status(request, job_id):
+    """A Job's status and progress, as JSON"""
+    job = Job.objects.filter(id=job_id, user_id=request.user.id).first()
+    if job is None:
+        return JsonResponse({'error': 'No such job'}, status=404)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'message': job.message,
+    })
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+'''
+File: metrics_views.py
+Author: Zachary King
+
+Staff-only views of the request metrics kept by this server process
+(see `utils/metrics.py`).
+'''
+
+import functools
+import time
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from ..utils import metrics
+
+
+def staff_only(view):
+    '''Raises PermissionDenied unless the logged in user is staff'''
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required(login_url='/pynny/login')
+@staff_only
+def metrics_view(request):
+    """The request histograms, in the Prometheus text format"""
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required(login_url='/pynny/login')
+@staff_only
+def slow_requests(request):
+    """The most recent slow requests and the SQL they ran"""
+    lines = []
+    for entry in metrics.slow_requests():
+        lines.append('{} {} {} ({}) -> {} in {:.3f}s: {} queries in {:.3f}s, templates {:.3f}s'.format(
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time'])), entry['method'], entry['path'],
+            entry['view'], entry['status'], entry['wall'], len(entry['queries']), entry['db_time'],
+            entry['template_time']))
+        for query in entry['queries']:
+            lines.append('    {}s {}'.format(query['time'], query['sql']))
+        lines.append('')
+    return HttpResponse('\n'.join(lines), content_type='text/plain; charset=utf-8')
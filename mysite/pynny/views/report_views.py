@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''
+File: report_views.py
+Author: Zachary King
+
+Implements the spending report views for the Pynny web app.
+'''
+
+import json
+from datetime import date, datetime
+
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from ..utils import reports
+from ..utils.dates import month_bounds
+from ..utils.versions import conditional_page
+
+
+def default_range(today):
+    '''Returns the range reports cover unless asked otherwise: the
+    first day of the month eleven months ago, through today'''
+    start = reports.shift_year(month_bounds(today)[0], -1)
+    return month_bounds(start)[1], today
+
+
+@login_required(login_url='/pynny/login')
+@conditional_page
+def spending_report(request):
+    '''Spending by category, wallet and month over a date range'''
+    data = {}
+    start, end = default_range(date.today())
+    try:
+        if request.GET.get('start'):
+            start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+        if request.GET.get('end'):
+            end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+    except ValueError:
+        data['alerts'] = {'errors': ['<strong>Oops!</strong> Dates must look like 2017-08-31.']}
+    if start > end:
+        start, end = end, start
+    if not reports.in_range(start, end):
+        data['alerts'] = {'errors': ['<strong>Oops!</strong> Reports cover at most {} years, from {} to {}.'.format(
+            reports.MAX_YEARS, reports.MIN_YEAR, reports.MAX_YEAR)]}
+        start, end = default_range(date.today())
+
+    report = reports.SpendingReport(request.user, start, end)
+    months = report.by_month()
+    data.update({
+        'start': start,
+        'end': end,
+        'totals': report.totals(),
+        'months': months,
+        'categories': report.by_category(),
+        'wallets': report.by_wallet(),
+        'chart_data': json.dumps([
+            {'key': 'Spent', 'values': [{'x': row['month'].strftime('%b %Y'), 'y': float(row['spent'])} for row in months]},
+            {'key': 'Spent last year', 'values': [{'x': row['month'].strftime('%b %Y'), 'y': float(row['last_year_spent'])}
+                                                  for row in months]},
+        ]),
+    })
+    return render(request, 'pynny/reports/spending.html', context=data)
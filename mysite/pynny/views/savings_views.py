@@ -13,7 +13,8 @@ from django.contrib.auth.decorators import login_required
 import decimal
 
 from ..models import Wallet, Budget, Transaction, Savings
-from ..utils import notifications
+from ..utils import notifications, versions
+from ..utils.context import SAVINGS_PAGES, user_data
 
 
 @login_required(login_url='/pynny/login')
@@ -23,7 +24,7 @@ def savings(request):
     data = dict()
     if request.method == 'GET':
         # Get the savings for this user
-        data['savings'] = Savings.objects.filter(user=request.user)
+        data.update(user_data(request).context(SAVINGS_PAGES))
 
         return render(request, 'pynny/savings/savings.html', context=data)
     # POST = update a Saving
@@ -40,7 +41,7 @@ def savings(request):
         # Check if the Saving name exists already
         if Savings.objects.filter(user=request.user, name=name):
             data['alerts'] = {'errors': ['A Saving already exists with that name']}
-            data['savings'] = Savings.objects.filter(user=request.user)
+            data.update(user_data(request).context(SAVINGS_PAGES))
             return render(request, 'pynny/savings/savings.html', context=data)
 
         # Create the new Saving
@@ -53,7 +54,7 @@ def savings(request):
         if notify:
             data['alerts']['info'] = [
                 '<strong>Nice!</strong> Since you asked to be notified, you\'ll receive an email when this Saving is fulfilled']
-        data['savings'] = Savings.objects.filter(user=request.user)
+        data.update(user_data(request).context(SAVINGS_PAGES))
         return render(request, 'pynny/savings/savings.html', context=data, status=201)
 
 
@@ -66,11 +67,11 @@ def one_saving(request, savings_id):
         saving = Savings.objects.get(id=savings_id)
     except Savings.DoesNotExist:
         data['alerts'] = {'errors': ['<strong>Oh Snap!</strong> That Saving does not exist']}
-        data['savings'] = Savings.objects.filter(user=request.user)
+        data.update(user_data(request).context(SAVINGS_PAGES))
         return render(request, 'pynny/savings/savings.html', context=data, status=404)
 
-    if saving.user != request.user:
-        data['savings'] = Savings.objects.filter(user=request.user)
+    if saving.user_id != request.user.id:
+        data.update(user_data(request).context(SAVINGS_PAGES))
         data['alerts'] = {'errors': ['<strong>Oh Snap!</strong> That Saving does not exist']}
         return render(request, 'pynny/savings/savings.html', context=data, status=403)
 
@@ -92,7 +93,7 @@ def one_saving(request, savings_id):
             # Make sure the new name doesn't already exist
             if name != saving.name and Savings.objects.filter(user=request.user, name=name):
                 data['alerts'] = {'errors': ['<strong>Oh Snap!</strong> A Saving already exists with that name']}
-                data['savings'] = Savings.objects.filter(user=request.user)
+                data.update(user_data(request).context(SAVINGS_PAGES))
                 return render(request, 'pynny/savings/savings.html', context=data, status=200)
 
             # Data is fine, update the Saving
@@ -108,12 +109,14 @@ def one_saving(request, savings_id):
             else:
                 saving.save()
 
-            data['savings'] = Savings.objects.filter(user=request.user)
+            data.update(user_data(request).context(SAVINGS_PAGES))
             return render(request, 'pynny/savings/savings.html', context=data, status=200)
 
         elif action == 'delete':
             saving.delete()
+            versions.bump(saving.user_id)
             data['alerts'] = {'success': ['<strong>Done!</strong> Saving deleted successfully']}
+            data.update(user_data(request).context(SAVINGS_PAGES))
             return render(request, 'pynny/savings/savings.html', context=data)
 
 
@@ -125,3 +128,4 @@ def complete_saving(saving):
         notifications.notify_saving_complete(saving)
     if saving.delete_on_completion:
         saving.delete()
+        versions.bump(saving.user_id)
@@ -7,21 +7,38 @@ Implements the views/handlers for Transaction-related requetss
 '''
 
 from datetime import date, datetime
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, redirect, reverse
+from django.utils.html import format_html
+from django.utils.http import urlencode
 from django.contrib.auth.decorators import login_required
-import decimal
 
-from ..models import Transaction, BudgetCategory, Wallet, Budget
+from ..models import Transaction, BudgetCategory, Wallet
+from ..utils import balances, exporter, importer, jobs, search
+from ..utils.context import TRANSACTION_PAGES, WALLET_PAGES, user_data
+from ..utils.pagination import ledger_context, render_ledger_rows
+from ..utils.versions import conditional_page
 
 
 @login_required(login_url='/pynny/login')
+@conditional_page
 def transactions(request):
     '''View transactions for a user'''
     data = {}
     if request.method == 'GET':
-        data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        form, matches = search.search_transactions(request.user, request.GET)
+        data.update(ledger_context(request, matches))
+        data['search'] = form
+        if form.active:
+            # Keep the search when loading more rows
+            data['ledger_query'] = urlencode(sorted((k, v) for k, v in form.values.items() if v))
+        if form.errors:
+            data['alerts'] = {'errors': ['<strong>Oops!</strong> Ignored the invalid {} filter.'.format(
+                ', '.join(form.errors))]}
+        if request.is_ajax():
+            # Infinite scroll only needs the next page of rows
+            return render_ledger_rows(request, 'pynny/transactions/transaction_rows.html', data)
+        data.update(user_data(request).context(TRANSACTION_PAGES))
         data['default_date'] = date.strftime(date.today(), '%Y-%m-%d')
         return render(request, 'pynny/transactions/transactions.html', context=data)
     # POST = create a new Transaction
@@ -29,7 +46,7 @@ def transactions(request):
         # Get the form data from the request
         _category = int(request.POST['category'])
         _wallet = int(request.POST['wallet'])
-        _amount = float(request.POST['amount'])
+        _amount = balances.parse_amount(request.POST['amount'])
         _description = request.POST['description']
         _created_time = request.POST['created_time'] # %Y-%m-%d date
         _created_time = datetime.strptime(_created_time, '%Y-%m-%d').date()
@@ -37,38 +54,21 @@ def transactions(request):
         category = BudgetCategory.objects.get(id=_category)
         wallet = Wallet.objects.get(id=_wallet)
 
-        # Create the new Transaction
-        Transaction(category=category, wallet=wallet, amount=_amount, description=_description, created_time=_created_time, user=request.user).save()
-
-        # Update the balance of appropriate budgets
-        budgets = Budget.objects.filter(category=category)
-        amount = abs(_amount)
-
-        for budget in budgets:
-            budget.balance += decimal.Decimal(amount)
-            budget.save()
-
-        # Update the wallet balance
-        if category.is_income:
-            wallet.balance += decimal.Decimal(_amount)
-        else:
-            wallet.balance -= decimal.Decimal(_amount)
-        wallet.save()
+        # Create the new Transaction and update the wallet and budget balances
+        balances.post_transaction(category=category, wallet=wallet, amount=_amount, description=_description,
+                                  created_time=_created_time, user=request.user)
 
         # Render the transactions
         data = {'alerts': {'success': ['<strong>Done!</strong> New Transaction recorded successfully!']}}
-        data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
+        data.update(user_data(request).context(TRANSACTION_PAGES))
         return render(request, 'pynny/transactions/transactions.html', context=data, status=201)
 
 
 @login_required(login_url='/pynny/login')
 def new_transaction(request):
     '''View for creating a new transaction'''
-    data = {}
-    data['categories'] = BudgetCategory.objects.filter(user=request.user)
-    data['wallets'] = Wallet.objects.filter(user=request.user)
+    data = user_data(request).context(TRANSACTION_PAGES)
 
     # Check if they have any categories or wallets first
     if not data['categories']:
@@ -96,6 +96,74 @@ def new_transaction(request):
     return render(request, 'pynny/transactions/new_transaction.html', context=data)
 
 
+@login_required(login_url='/pynny/login')
+def import_transactions(request):
+    '''Bulk import Transactions from a CSV or OFX file'''
+    data = user_data(request).context(WALLET_PAGES, formats=importer.FORMATS)
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            data['alerts'] = {'errors': ['<strong>Oops!</strong> Choose a file to import']}
+            return render(request, 'pynny/transactions/import_transactions.html', context=data, status=400)
+
+        file_format = request.POST.get('format') or importer.guess_format(upload.name)
+        wallet = None
+        if request.POST.get('wallet'):
+            try:
+                wallet = Wallet.objects.get(id=int(request.POST['wallet']), user=request.user).name
+            except (ValueError, Wallet.DoesNotExist):
+                data['alerts'] = {'errors': ['<strong>Oops!</strong> Choose one of your wallets']}
+                return render(request, 'pynny/transactions/import_transactions.html', context=data, status=400)
+
+        if upload.size > jobs.BACKGROUND_IMPORT_BYTES:
+            # Large files are imported in the background
+            job = jobs.enqueue('import_transactions', request.user, payload=upload.read(),
+                               file_format=file_format, wallet=wallet)
+            alert = jobs.progress_alert(job, format_html(
+                '<strong>On it!</strong> <em>{}</em> is being imported.', upload.name))
+            data = {'alerts': {'info': [alert]}}
+            data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
+            data.update(user_data(request).context(TRANSACTION_PAGES))
+            return render(request, 'pynny/transactions/transactions.html', context=data, status=202)
+
+        try:
+            count = importer.import_transactions(request.user, upload.file, file_format, wallet=wallet)
+        except importer.ImportFormatError as e:
+            data['alerts'] = {'errors': [format_html('<strong>Oh snap!</strong> Nothing was imported. {}', e)]}
+            return render(request, 'pynny/transactions/import_transactions.html', context=data, status=400)
+
+        data = {'alerts': {'success': ['<strong>Done!</strong> Imported {} Transactions'.format(count)]}}
+        data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
+        data.update(user_data(request).context(TRANSACTION_PAGES))
+        return render(request, 'pynny/transactions/transactions.html', context=data, status=201)
+
+    return render(request, 'pynny/transactions/import_transactions.html', context=data)
+
+
+@login_required(login_url='/pynny/login')
+def export_transactions(request):
+    '''Stream a user's Transactions, Budgets, Wallets or Savings as CSV or NDJSON'''
+    kind = request.GET.get('data', 'transactions')
+    file_format = request.GET.get('format', 'csv')
+    if kind not in exporter.EXPORTS or file_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Unknown export')
+
+    try:
+        start = request.GET.get('start')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = request.GET.get('end')
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        wallet_id = int(request.GET['wallet']) if request.GET.get('wallet') else None
+    except ValueError:
+        return HttpResponseBadRequest('Invalid export filters')
+
+    columns, rows = exporter.export_rows(request.user, kind, start, end, wallet_id)
+    content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(exporter.export_lines(file_format, columns, rows), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="pynny-{}.{}"'.format(kind, file_format)
+    return response
+
+
 @login_required(login_url='/pynny/login')
 def one_transaction(request, transaction_id):
     '''View for a single Transaction'''
@@ -106,12 +174,12 @@ def one_transaction(request, transaction_id):
         transaction = Transaction.objects.get(id=transaction_id)
     except Transaction.DoesNotExist:
         # DNE
-        data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
+        data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Transaction does not exist.']}
         return render(request, 'pynny/transactions/transactions.html', context=data, status=404)
 
-    if transaction.user != request.user:
-        data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
+    if transaction.user_id != request.user.id:
+        data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That Transaction does not exist.']}
         return render(request, 'pynny/transactions/transactions.html', context=data, status=403)
 
@@ -119,103 +187,43 @@ def one_transaction(request, transaction_id):
         # What kind of POST was this?
         action = request.POST['action'].lower()
         if action == 'delete':
-            # Update the balance of appropriate budgets
-            budgets = Budget.objects.filter(category=transaction.category)
-            amount = abs(transaction.amount)
-
-            for budget in budgets:
-                budget.balance -= decimal.Decimal(amount)
-                budget.save()
-
-            # Update Wallet
-            if transaction.category.is_income:
-                transaction.wallet.balance -= decimal.Decimal(transaction.amount)
-            else:
-                transaction.wallet.balance += decimal.Decimal(transaction.amount)
-            transaction.wallet.save()
-
-            # Delete the Transaction
-            transaction.delete()
+            # Revert the wallet and budget balances and delete the Transaction
+            balances.delete_transaction(transaction)
 
             # And return them to the Transactions page
-            data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
+            data.update(user_data(request).context(TRANSACTION_PAGES))
             data['alerts'] = {'info': ['<strong>Done!</strong> Transaction was deleted successfully']}
             return render(request, 'pynny/transactions/transactions.html', context=data)
         elif action == 'edit':
             # Render the edit_transaction view
             data['transaction'] = transaction
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data.update(user_data(request).context(TRANSACTION_PAGES))
             return render(request, 'pynny/transactions/edit_transaction.html', context=data)
         elif action == 'edit_complete':
             # Get the form data from the request
             _category = int(request.POST['category'])
             _wallet = int(request.POST['wallet'])
-            _amount = float(request.POST['amount'])
+            _amount = balances.parse_amount(request.POST['amount'])
             _description = request.POST['description']
             _created_time = request.POST['created_time'] # %Y-%m-%d date
             _created_time = datetime.strptime(_created_time, '%Y-%m-%d').date()
 
             new_category = BudgetCategory.objects.get(id=_category)
-
-            # Undo the last version of the transaction
-            # print('balance before undo: ' + str(transaction.wallet.balance))
-            undo_transaction(transaction)
-            # print('balance after undo: ' + str(transaction.wallet.balance))
-
-            # Now carry out the effects of the revised transaction
-            # Update the balance of appropriate budgets
-            budgets = Budget.objects.filter(category=new_category)
-            amount = abs(_amount)
-            for budget in budgets:
-                budget.balance += decimal.Decimal(amount)
-                budget.save()
-
-            # Update the wallet balance
             new_wallet = Wallet.objects.get(id=_wallet)
-            # print('balance before update: ' + str(new_wallet.balance))
-            if new_category.is_income:
-                new_wallet.balance += decimal.Decimal(_amount)
-            else:
-                new_wallet.balance -= decimal.Decimal(_amount)
-            new_wallet.save()
-            # print('balance after update: ' + str(new_wallet.balance))
-
-            # And update the transaction itself
-            transaction.category = new_category
-            transaction.wallet = new_wallet
-            transaction.amount = _amount
-            transaction.description = _description
-            transaction.created_time = _created_time
-            transaction.save()
+
+            # Move the effects of the old version of the Transaction
+            # onto the wallet and budgets of the revised one
+            balances.update_transaction(transaction, category=new_category, wallet=new_wallet, amount=_amount,
+                                        description=_description, created_time=_created_time)
 
             data = {'alerts': {'success': ['<strong>Done!</strong> Transaction updated successfully!']}}
-            data['transactions'] = Transaction.objects.filter(user=request.user).order_by('-created_time')
-            data['categories'] = BudgetCategory.objects.filter(user=request.user)
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data.update(ledger_context(request, Transaction.objects.for_user(request.user)))
+            data.update(user_data(request).context(TRANSACTION_PAGES))
             return render(request, 'pynny/transactions/transactions.html', context=data)
     elif request.method == 'GET':
         # Show the specific Transaction data
         data['transaction'] = transaction
-        data['categories'] = BudgetCategory.objects.filter(user=request.user)
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        data.update(user_data(request).context(TRANSACTION_PAGES))
         return render(request, 'pynny/transactions/one_transaction.html', context=data)
 
-
-def undo_transaction(trans):
-    '''Reverts the effects of a Transaction on budgets and its wallet'''
-    amount = trans.amount
-    
-    # Replace the money in the category
-    for budget in Budget.objects.filter(category=trans.category):
-        budget.balance -= amount
-        budget.save()
-    
-    # Replace the money in the wallet
-    if trans.category.is_income:
-        trans.wallet.balance -= trans.amount
-    else:
-        trans.wallet.balance += trans.amount
-    trans.wallet.save()
@@ -6,14 +6,22 @@ Author: Zachary King
 Implements views/handlers for Wallet-related requests
 '''
 
+import json
+
 from django.shortcuts import render, reverse, redirect
 from datetime import date
 from django.contrib.auth.decorators import login_required
+from django.utils.html import format_html
 
 from ..models import Wallet, Budget, Transaction
+from ..utils import jobs, versions, wallet_history
+from ..utils.context import WALLET_PAGES, user_data
+from ..utils.pagination import ledger_context, render_ledger_rows
+from ..utils.versions import conditional_page
 
 
 @login_required(login_url='/pynny/login')
+@conditional_page
 def wallets(request):
     '''Display Wallets for a user'''
     # GET = display user's wallets
@@ -21,7 +29,7 @@ def wallets(request):
         data = {}
 
         # Get the wallets for this user
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        data.update(user_data(request).context(WALLET_PAGES))
 
         return render(request, 'pynny/wallets/wallets.html', context=data)
     # POST = create a new Wallet
@@ -39,7 +47,7 @@ def wallets(request):
         # Create the new Wallet
         Wallet(name=name, balance=start_balance, user=request.user).save()
         data = {'alerts': {'success': ['<strong>Done!</strong> New wallet created successfully!']}}
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        data.update(user_data(request).context(WALLET_PAGES))
         return render(request, 'pynny/wallets/wallets.html', context=data, status=201)
 
 
@@ -59,12 +67,12 @@ def one_wallet(request, wallet_id):
         wallet = Wallet.objects.get(id=wallet_id)
     except:
         # DNE
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+        data.update(user_data(request).context(WALLET_PAGES))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That wallet does not exist.']}
         return render(request, 'pynny/wallets/wallets.html', context=data, status=404)
 
-    if wallet.user != request.user:
-        data['wallets'] = Wallet.objects.filter(user=request.user)
+    if wallet.user_id != request.user.id:
+        data.update(user_data(request).context(WALLET_PAGES))
         data['alerts'] = {'errors': ['<strong>Oh snap!</strong> That wallet does not exist.']}
         return render(request, 'pynny/wallets/wallets.html', context=data, status=403)
 
@@ -73,11 +81,21 @@ def one_wallet(request, wallet_id):
         action = request.POST['action'].lower()
 
         if action == 'delete':
+            if jobs.is_heavy(Transaction.objects.filter(wallet=wallet)):
+                # Too many Transactions to delete while the request waits
+                job = jobs.enqueue('delete_wallet', request.user, wallet_id=wallet.id)
+                alert = jobs.progress_alert(job, format_html(
+                    '<strong>On it!</strong> Your <em>{}</em> wallet is being deleted.', wallet.name))
+                data.update(user_data(request).context(WALLET_PAGES))
+                data['alerts'] = {'info': [alert]}
+                return render(request, 'pynny/wallets/wallets.html', context=data, status=202)
+
             # Delete the wallet
             wallet.delete()
+            versions.bump(wallet.user_id)
 
             # And return them to the wallets page
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data.update(user_data(request).context(WALLET_PAGES))
             data['alerts'] = {'info': ['<strong>Done!</strong> Your <em>' + wallet.name + '</em> wallet was successfully deleted']}
             return render(request, 'pynny/wallets/wallets.html', context=data)
         elif action == 'edit':
@@ -93,11 +111,17 @@ def one_wallet(request, wallet_id):
             wallet.save()
 
             data = {'alerts': {'success': ['<strong>Done!</strong> Wallet updated successfully!']}}
-            data['wallets'] = Wallet.objects.filter(user=request.user)
+            data.update(user_data(request).context(WALLET_PAGES))
             return render(request, 'pynny/wallets/wallets.html', context=data)
     elif request.method == 'GET':
         # Show the specific Wallet data
+        ledger = wallet_history.with_running_balance(Transaction.objects.filter(wallet=wallet), wallet)
+        data.update(ledger_context(request, ledger))
+        data['show_balance'] = True
+        if request.is_ajax():
+            return render_ledger_rows(request, 'pynny/transactions/ledger_rows.html', data)
         data['wallet'] = wallet
-        data['budgets'] = Budget.objects.filter(wallet=wallet, month__contains=date.strftime(date.today(), '%Y-%m'))
-        data['transactions'] = Transaction.objects.filter(wallet=wallet).order_by('-created_time')
+        data['budgets'] = Budget.objects.filter(wallet=wallet).for_month(date.today())
+        data['balance_history'] = json.dumps([{'x': day.isoformat(), 'y': float(balance)}
+                                              for day, balance in wallet_history.balance_series(wallet)])
         return render(request, 'pynny/wallets/one_wallet.html', context=data)